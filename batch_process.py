@@ -16,6 +16,7 @@ from base_data_project.utils import create_components
 from src.config import CONFIG, PROJECT_NAME
 from src.services.example_service import ExampleService
 from src.models import DataContainer
+from src.frame_store import enable_copy_on_write
 
 # Set up logger
 logger = setup_logger(PROJECT_NAME, log_level=CONFIG.get('log_level', 'INFO'))
@@ -152,6 +153,8 @@ def batch_process(use_db, no_tracking, algorithm):
     
     try:
         logger.info("Starting the Batch Process")
+        if CONFIG.get('copy_on_write', False):
+            enable_copy_on_write()
         click.echo("Initializing components...")
         
         # Create spinner for initialization
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the calendar helper kernels.
+Compares the vectorized helpers against the previous row-by-row implementations
+on synthetic calendars, checking that both produce identical output.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the path so we can import modules
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+from src.helpers import create_m0_0t, func_turnos
+from src.func_inicializa_helpers import adjust_horario_by_admission
+
+
+def make_calendar(n_employees: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic wide calendar (Dia and TURNO header rows plus one row per employee).
+
+    Args:
+        n_employees: Number of employee rows
+        n_days: Number of days in the horizon
+        seed: Random seed
+
+    Returns:
+        Schedule matrix DataFrame in the reshaped_final_3 layout
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-01-01', periods=n_days, freq='D').strftime('%Y-%m-%d')
+    dia_row = ['Dia'] + [d for d in dates for _ in range(2)]
+    turno_row = ['TURNO'] + ['M', 'T'] * n_days
+    codes = np.array(['M', 'T', 'T1', 'T2', 'L', 'V', '-', 'MoT', 'P', 'A'], dtype=object)
+    cells = rng.choice(codes, size=(n_employees, n_days))
+    rows = [dia_row, turno_row]
+    for i in range(n_employees):
+        rows.append([str(i).zfill(10)] + list(np.repeat(cells[i], 2)))
+    return pd.DataFrame(rows, columns=range(len(dia_row)))
+
+
+def make_matriz2(n_employees: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic long calendar (one row per employee, day and shift) as used by func_inicializa.
+
+    Args:
+        n_employees: Number of employees
+        n_days: Number of days in the horizon
+        seed: Random seed
+
+    Returns:
+        DataFrame with COLABORADOR, DATA, TIPO_TURNO, HORARIO, DIA_TIPO and data_admissao columns
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-01-01', periods=n_days, freq='D')
+    employees = [str(i).zfill(10) for i in range(n_employees)]
+    n_rows = n_employees * n_days * 2
+    horario = rng.choice(np.array(['H', 'L', 'V', '-', 'F', 'A'], dtype=object), size=n_rows)
+    # A quarter of the employees is admitted during the horizon
+    admission = pd.Series(pd.NaT, index=employees, dtype='datetime64[ns]')
+    late = rng.random(n_employees) < 0.25
+    admission[late] = dates[rng.integers(0, n_days, late.sum())]
+    matriz2 = pd.DataFrame({
+        'COLABORADOR': np.repeat(employees, n_days * 2),
+        'DATA': np.tile(np.repeat(dates, 2), n_employees),
+        'TIPO_TURNO': np.tile(['M', 'T'], n_employees * n_days),
+        'HORARIO': horario,
+    })
+    matriz2['DIA_TIPO'] = np.where(matriz2['DATA'].dt.dayofweek == 6, 'domYf', matriz2['DATA'].dt.day_name().str[:3])
+    matriz2['data_admissao'] = matriz2['COLABORADOR'].map(admission)
+    return matriz2
+
+
+def make_split_shifts(n_employees: int, n_days: int, share: float = 0.3, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic long calendar where a share of the employee days are MoT/P split shifts.
+
+    Args:
+        n_employees: Number of employees
+        n_days: Number of days in the horizon
+        share: Share of employee days with a MoT or P cell (both M and T rows)
+        seed: Random seed
+
+    Returns:
+        DataFrame with COLABORADOR, DATA and TIPO_TURNO columns plus a ROW column with the row position
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-01-01', periods=n_days, freq='D').strftime('%Y-%m-%d')
+    employees = [str(i).zfill(10) for i in range(n_employees)]
+    cells = rng.choice(np.array(['M', 'T', 'L', 'V', '-'], dtype=object), size=(n_employees, n_days))
+    split = rng.random((n_employees, n_days)) < share
+    cells[split] = rng.choice(np.array(['MoT', 'P'], dtype=object), size=split.sum())
+    matriz2 = pd.DataFrame({
+        'COLABORADOR': np.repeat(employees, n_days * 2),
+        'DATA': np.tile(np.repeat(dates, 2), n_employees),
+        'TIPO_TURNO': np.repeat(cells.ravel(), 2),
+    })
+    matriz2['ROW'] = np.arange(len(matriz2))
+    return matriz2
+
+
+def _create_m0_0t_loop(reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
+    """Previous create_m0_0t implementation (nested loops over every cell), kept as reference."""
+    for i in range(1, reshaped_final_3.shape[1] - 1, 2):
+        for j in range(2, len(reshaped_final_3)):
+            current_val = str(reshaped_final_3.iloc[j, i])
+            if current_val == "M":
+                reshaped_final_3.iloc[j, i + 1] = 0
+            elif current_val in ["T", "T1", "T2"]:
+                reshaped_final_3.iloc[j, i] = 0
+    return reshaped_final_3
+
+
+def _adjust_horario_apply(matriz2: pd.DataFrame) -> pd.Series:
+    """Previous adjust_horario implementation (row-wise apply), kept as reference."""
+    def adjust_horario(row):
+        admission_date = row['data_admissao'] if pd.notna(row['data_admissao']) else pd.Timestamp('1900-01-01')
+        if row['DATA'] >= admission_date:
+            return row['HORARIO']
+        elif row['DATA'] < admission_date and row['DIA_TIPO'] == 'domYf':
+            return 'L_'
+        else:
+            return 'NL'
+
+    return matriz2.apply(adjust_horario, axis=1)
+
+
+def _func_turnos_apply(matriz2: pd.DataFrame, tipo: str) -> pd.DataFrame:
+    """Previous func_turnos implementation (groupby.apply, relabelled rows moved to the end), kept as reference."""
+    matriz2_filtered = matriz2[matriz2['TIPO_TURNO'] == tipo].copy()
+    if len(matriz2_filtered) > 0:
+        def assign_shift_type(group):
+            group = group.copy()
+            group.loc[group.index[0], 'TIPO_TURNO'] = 'M'
+            if len(group) > 1:
+                group.loc[group.index[1], 'TIPO_TURNO'] = 'T'
+            return group
+
+        matriz2_filtered = (matriz2_filtered
+                           .groupby(['COLABORADOR', 'DATA'])
+                           .apply(assign_shift_type)
+                           .reset_index(drop=True))
+    matriz2_rest = matriz2[matriz2['TIPO_TURNO'] != tipo].copy()
+    return pd.concat([matriz2_rest, matriz2_filtered], ignore_index=True)
+
+
+def _timed(func, *args):
+    """Run func(*args) and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _same_frame(df1: pd.DataFrame, df2: pd.DataFrame) -> bool:
+    """Check that two calendars hold the same cells (values and types)."""
+    if df1.shape != df2.shape:
+        return False
+    return all(
+        type(a) is type(b) and a == b
+        for a, b in zip(df1.to_numpy(dtype=object).ravel(), df2.to_numpy(dtype=object).ravel())
+    )
+
+
+def bench_create_m0_0t(sizes=((50, 90), (100, 180), (300, 365))):
+    """Benchmark create_m0_0t scaling in employees x days."""
+    print("\n=== create_m0_0t ===")
+    print(f"{'employees':>10} {'days':>6} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8} {'identical':>10}")
+    for n_employees, n_days in sizes:
+        calendar = make_calendar(n_employees, n_days)
+        expected, t_loop = _timed(_create_m0_0t_loop, calendar.copy())
+        result, t_vec = _timed(create_m0_0t, calendar.copy())
+        print(f"{n_employees:>10} {n_days:>6} {t_loop:>10.3f} {t_vec:>15.4f} "
+              f"{t_loop / max(t_vec, 1e-9):>8.0f} {str(_same_frame(expected, result)):>10}")
+
+
+def bench_adjust_horario(sizes=((100, 365), (500, 365))):
+    """Benchmark the admission date adjustment of HORARIO (row-wise apply vs np.select)."""
+    print("\n=== adjust_horario ===")
+    print(f"{'employees':>10} {'days':>6} {'rows':>8} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>8} {'identical':>10}")
+    for n_employees, n_days in sizes:
+        matriz2 = make_matriz2(n_employees, n_days)
+        expected, t_apply = _timed(_adjust_horario_apply, matriz2)
+        result, t_vec = _timed(adjust_horario_by_admission, matriz2)
+        print(f"{n_employees:>10} {n_days:>6} {len(matriz2):>8} {t_apply:>10.3f} {t_vec:>15.4f} "
+              f"{t_apply / max(t_vec, 1e-9):>8.0f} {str(expected.equals(result)):>10}")
+
+
+def bench_func_turnos(sizes=((100, 365), (500, 365)), share: float = 0.3):
+    """Benchmark the MoT/P relabelling of func_turnos (groupby.apply vs cumcount)."""
+    print(f"\n=== func_turnos ({share:.0%} MoT/P) ===")
+    print(f"{'employees':>10} {'days':>6} {'rows':>8} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>8} {'identical':>10}")
+    for n_employees, n_days in sizes:
+        matriz2 = make_split_shifts(n_employees, n_days, share)
+        start = time.perf_counter()
+        expected = _func_turnos_apply(_func_turnos_apply(matriz2, 'MoT'), 'P')
+        t_apply = time.perf_counter() - start
+        start = time.perf_counter()
+        result = func_turnos(func_turnos(matriz2, 'MoT'), 'P')
+        t_vec = time.perf_counter() - start
+        # The previous implementation moved the relabelled rows to the end, compare by original row
+        expected = expected.sort_values('ROW', ignore_index=True)
+        identical = expected.equals(result) and result['ROW'].is_monotonic_increasing
+        print(f"{n_employees:>10} {n_days:>6} {len(matriz2):>8} {t_apply:>10.3f} {t_vec:>15.4f} "
+              f"{t_apply / max(t_vec, 1e-9):>8.0f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    print("Starting helper benchmarks...")
+
+    bench_create_m0_0t()
+    bench_adjust_horario()
+    bench_func_turnos()
@@ -18,6 +18,7 @@ from base_data_project.process_management.manager import ProcessManager
 # Import project-specific components
 from src.config import CONFIG, PROJECT_NAME
 from src.services.example_service import AlgoritmoGDService
+from src.frame_store import enable_copy_on_write
 
 # Set up logger
 logger = setup_logger(PROJECT_NAME, log_level=logging.INFO)
@@ -25,7 +26,8 @@ logger = setup_logger(PROJECT_NAME, log_level=logging.INFO)
 @click.group()
 def cli():
     """Interactive command-line interface for the my_new_project project."""
-    pass
+    if CONFIG.get('copy_on_write', False):
+        enable_copy_on_write()
 
 # Rest of your code remains the same
 @cli.command(help="Run the interactive process")
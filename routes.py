@@ -19,10 +19,15 @@ from base_data_project.utils import create_components
 # Import project-specific components
 from src.config import CONFIG, PROJECT_NAME
 from src.services.example_service import ExampleService
+from src.frame_store import enable_copy_on_write
 
 # Set up logger
 logger = setup_logger(PROJECT_NAME, log_level=logging.INFO)
 
+# pandas copy-on-write for the whole server process (see src.frame_store)
+if CONFIG.get('copy_on_write', False):
+    enable_copy_on_write()
+
 # Create Flask app
 app = Flask(__name__)
 
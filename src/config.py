@@ -27,6 +27,19 @@ CONFIG = {
     'data_dir': os.path.join(ROOT_DIR, 'data'),
     'output_dir': os.path.join(ROOT_DIR, 'data', 'output'),
     'log_dir': os.path.join(ROOT_DIR, 'logs'),
+    # Local archive of past schedules (df_calendario_passado), empty to always query the database.
+    # Off by default: archived days are served from disk, so later corrections in the database are
+    # only picked up once the archive expires (schedule_archive_max_age_days, None to never expire)
+    'schedule_archive_dir': '',
+    'schedule_archive_max_age_days': 7,
+    # Cache of the func_inicializa step outputs: None, 'memory' or 'disk' (stored in func_inicializa_cache_dir)
+    'func_inicializa_cache': None,
+    'func_inicializa_cache_dir': os.path.join(ROOT_DIR, 'data', 'func_inicializa_cache'),
+    # Report the peak memory of each func_inicializa step (tracemalloc, slows the run down)
+    'func_inicializa_track_memory': False,
+    # pandas copy-on-write for the whole process, set by the entry points at startup (off by default).
+    # When on, frames in the model data dicts share unchanged columns instead of deep copies
+    'copy_on_write': False,
     
     # File paths for CSV data sources
     'dummy_data_filepaths': {
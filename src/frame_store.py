@@ -0,0 +1,177 @@
+"""
+Copy-on-write storage for the DescansosDataModel data dicts (raw_data, auxiliary_data, medium_data).
+When the entry point enables pandas copy-on-write (CONFIG['copy_on_write']), frames handed between
+the dicts and the processing steps share their unchanged columns instead of being deep copied. The
+memory held by the dicts can be reported per posto.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Hashable, Optional
+
+# Local stuff
+from src.config import PROJECT_NAME
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+
+def enable_copy_on_write(enabled: bool = True) -> bool:
+    """
+    Turn the pandas copy-on-write mode on (or off) for the process.
+
+    Args:
+        enabled: Whether copy-on-write should be used
+
+    Returns:
+        True if copy-on-write is active after the call
+    """
+    try:
+        pd.set_option('mode.copy_on_write', bool(enabled))
+    except (KeyError, pd.errors.OptionError) as e:
+        logger.warning(f"pandas {pd.__version__} has no copy-on-write mode, frames will be deep copied: {str(e)}")
+    return copy_on_write_enabled()
+
+
+def copy_on_write_enabled() -> bool:
+    """Whether the pandas copy-on-write mode is active."""
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except (KeyError, pd.errors.OptionError):
+        return False
+
+
+def share(value: Any) -> Any:
+    """
+    Copy of a DataFrame/Series for a new owner.
+
+    With copy-on-write the copy is shallow and every column stays shared until one of the
+    owners writes to it; without it the copy is deep. Other values are returned as is.
+
+    Args:
+        value: Value to hand over
+
+    Returns:
+        Independent copy of the frame (or the value itself)
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not copy_on_write_enabled())
+    return value
+
+
+class FrameStore(dict):
+    """
+    Dict of model data that owns the frames stored in it.
+
+    Ownership rules:
+    - With copy-on-write, storing a DataFrame/Series stores share(value), a lazy copy, so the
+      caller can keep changing its frame without changing the stored one. Without it the frame
+      itself is stored (no deep copy per store), so the caller must not change it afterwards.
+    - Frames read from the store still belong to the store: take share(store[key]) before
+      changing one in place. With copy-on-write this costs nothing until a column is written,
+      and only the written columns are copied.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        super().__setitem__(key, share(value) if copy_on_write_enabled() else value)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self) -> 'FrameStore':
+        return FrameStore(self)
+
+
+def _buffer_key(column: pd.Series) -> Hashable:
+    """Identity of the memory holding the values of a column (the same for columns shared between frames)."""
+    values = column.array
+    if isinstance(values, pd.Categorical):
+        values = values.codes
+    elif isinstance(column.dtype, np.dtype):
+        values = column.to_numpy()
+    else:
+        # Extension arrays are shared as objects
+        return ('array', id(values))
+    return ('buffer', values.__array_interface__['data'][0], values.nbytes, values.dtype.str)
+
+
+def frame_memory(stores: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Memory held by the frames of a set of model dicts.
+
+    nominal_mb is the deep size of each frame as if it owned all its data (what a deep copy
+    per variant costs); stored_mb only counts the columns not already counted for an earlier
+    frame, so the sum of stored_mb is the memory actually held.
+
+    Args:
+        stores: Model dicts by name, e.g. {'raw_data': ..., 'medium_data': ...}
+
+    Returns:
+        DataFrame with store, key, rows, columns, nominal_mb and stored_mb (one row per frame)
+    """
+    seen = set()
+    records = []
+    for store_name, store in stores.items():
+        for key, value in store.items():
+            if isinstance(value, pd.Series):
+                value = value.to_frame()
+            if not isinstance(value, pd.DataFrame):
+                continue
+            nominal = int(value.index.memory_usage(deep=True))
+            stored = 0
+            if ('index', id(value.index)) not in seen:
+                seen.add(('index', id(value.index)))
+                stored = nominal
+            for position in range(value.shape[1]):
+                column = value.iloc[:, position]
+                size = int(column.memory_usage(index=False, deep=True))
+                nominal += size
+                buffer = _buffer_key(column)
+                if buffer not in seen:
+                    seen.add(buffer)
+                    stored += size
+            records.append({
+                'store': store_name,
+                'key': key,
+                'rows': len(value),
+                'columns': value.shape[1],
+                'nominal_mb': nominal / 1024 ** 2,
+                'stored_mb': stored / 1024 ** 2,
+            })
+    return pd.DataFrame(records, columns=['store', 'key', 'rows', 'columns', 'nominal_mb', 'stored_mb'])
+
+
+def log_frame_memory(stores: Dict[str, Dict[str, Any]], label: Optional[str] = None) -> pd.DataFrame:
+    """
+    Log the memory held by a set of model dicts (per dict and total, with the savings from shared columns).
+
+    Args:
+        stores: Model dicts by name
+        label: Context of the report (e.g. the posto)
+
+    Returns:
+        The frame_memory report
+    """
+    report = frame_memory(stores)
+    prefix = f"Memory {label}" if label else "Memory"
+    totals = report.groupby('store', sort=False)[['nominal_mb', 'stored_mb']].sum()
+    for store_name, row in totals.iterrows():
+        logger.info(f"{prefix} - {store_name}: {row['stored_mb']:.1f} MB stored, {row['nominal_mb']:.1f} MB nominal")
+    nominal = report['nominal_mb'].sum()
+    stored = report['stored_mb'].sum()
+    saved = nominal - stored
+    saved_pct = 100 * saved / nominal if nominal > 0 else 0.0
+    logger.info(f"{prefix} - total: {stored:.1f} MB stored, {nominal:.1f} MB nominal, "
+                f"{saved:.1f} MB ({saved_pct:.0f}%) shared between frames")
+    return report
@@ -0,0 +1,847 @@
+"""
+Steps of DescansosDataModel.func_inicializa.
+Each step takes its inputs as keyword arguments and returns a dict with its outputs, so that
+func_inicializa can run them through a StepPipeline (timed, and cached between runs).
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, List
+
+# Local stuff
+from src.config import PROJECT_NAME
+from src.helpers import func_turnos, adjusted_isoweeks, custom_round, calcular_folgas_semanas
+from src.shift_codes import shift_code_dtype, encode_shift_codes
+from src.step_pipeline import PipelineStep
+from src.frame_store import share
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+# Share of the worked holidays (fest_h) that must stay worked, by dyf_max_t
+MIN_FEST_H_RATIOS = {33: 0.6, 22: 0.5, 5: 0.3}
+
+
+def adjust_matrizB_dates(matrizB_og: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Copy the demand matrix and raise min_turno to max_turno on the Christmas/New Year dates.
+
+    Args:
+        matrizB_og: Demand estimates (df_estimativas)
+
+    Returns:
+        Dict with matrizB_ini
+    """
+    # Get year from matrizB_og
+    ano = pd.to_datetime(matrizB_og['data'].min()).year
+
+    # Adjust minTurno for specific dates
+    special_dates = [f'{ano}-12-23', f'{ano}-12-24', f'{ano}-12-30', f'{ano}-12-31']
+    friday_dates = [f'{ano}-12-22', f'{ano}-12-29']
+
+    matrizB_ini = share(matrizB_og)
+    matrizB_ini.loc[matrizB_ini['data'].isin(special_dates), 'min_turno'] = matrizB_ini['max_turno']
+    mask_friday = (matrizB_ini['data'].isin(friday_dates)) & (matrizB_ini['turno'] == 'M')
+    matrizB_ini.loc[mask_friday, 'min_turno'] = matrizB_ini.loc[mask_friday, 'max_turno']
+
+    return {'matrizB_ini': matrizB_ini}
+
+
+def adjust_horario_by_admission(matriz2: pd.DataFrame) -> pd.Series:
+    """
+    Mark the days before each employee's admission: 'L_' on Sundays/holidays (domYf), 'NL' otherwise.
+
+    Args:
+        matriz2: Long calendar with DATA, HORARIO, DIA_TIPO and data_admissao columns
+
+    Returns:
+        Object Series with the adjusted HORARIO (same index as matriz2)
+    """
+    admission_date = matriz2['data_admissao'].fillna(pd.Timestamp('1900-01-01'))
+    before_admission = (matriz2['DATA'] < admission_date).to_numpy()
+    is_dom_fes = (matriz2['DIA_TIPO'] == 'domYf').to_numpy()
+
+    horario = np.select(
+        [~before_admission, is_dom_fes],
+        [matriz2['HORARIO'].to_numpy(dtype=object), 'L_'],
+        default='NL'
+    )
+    return pd.Series(horario, index=matriz2.index, dtype=object)
+
+
+def build_matriz2(matriz2_og: pd.DataFrame, matriz2_long: pd.DataFrame, matrizA_og: pd.DataFrame, start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Build the long calendar (matriz2) with HORARIO, date columns and DIA_TIPO.
+
+    Args:
+        matriz2_og: Wide calendar (df_calendario)
+        matriz2_long: Long calendar built by load_calendario_transformations (None to melt matriz2_og)
+        matrizA_og: Employee data (df_colaborador)
+        start_date: Start date string
+        end_date: End date string
+
+    Returns:
+        Dict with matriz2, tipos_de_turno and shift_dtype
+    """
+    #CRIAR MATRIZ_2--------------------------------------------------
+
+    unwanted_colaboradors = ['Dia', 'maxTurno', 'mediaTurno', 'minTurno', 'sdTurno', 'TURNO']
+
+    if matriz2_long is not None and len(matriz2_long) > 0:
+        # Long calendar built natively by load_calendario_transformations
+        matriz2 = matriz2_long[
+            (matriz2_long['DATA'] >= pd.to_datetime(start_date)) &
+            (matriz2_long['DATA'] <= pd.to_datetime(end_date)) &
+            ~matriz2_long['COLABORADOR'].isin(unwanted_colaboradors)
+        ][['COLABORADOR', 'DATA', 'TIPO_TURNO']].copy()
+    else:
+        # Reshape matriz2_og (equivalent to R melt)
+        matriz2_og = share(matriz2_og)
+        turno_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'TURNO'].index[0]
+        dia_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'Dia'].index[0]
+
+        # Create column names
+        dia_values = matriz2_og.iloc[dia_row_idx, 1:].values
+        turno_values = matriz2_og.iloc[turno_row_idx, 1:].values
+        new_columns = [f"{dia}_{turno}" for dia, turno in zip(dia_values, turno_values)]
+        new_columns.insert(0, 'DIA_TURNO')
+
+        # Rename columns
+        matriz2_og.columns = new_columns
+
+        # Melt the dataframe
+        matriz2_ini = pd.melt(matriz2_og, id_vars='DIA_TURNO', 
+                            var_name='DATA', value_name='TIPO_TURNO')
+        matriz2_ini.columns = ['COLABORADOR', 'DATA', 'TIPO_TURNO']
+
+        # Parse the dates as the native long path does ('<dia>_<turno>' -> first 10 characters)
+        matriz2_ini['DATA'] = pd.to_datetime(matriz2_ini['DATA'].astype(str).str[:10], errors='coerce')
+
+        # Filter by date range and out unwanted rows
+        matriz2 = matriz2_ini[
+            (matriz2_ini['DATA'] >= pd.to_datetime(start_date)) &
+            (matriz2_ini['DATA'] <= pd.to_datetime(end_date)) &
+            ~matriz2_ini['COLABORADOR'].isin(unwanted_colaboradors)
+        ][['COLABORADOR', 'DATA', 'TIPO_TURNO']].copy()
+
+    # Encode the cell codes as int8 categoricals (decoded when stored in medium_data)
+    shift_dtype = shift_code_dtype(matriz2['TIPO_TURNO'])
+    matriz2['TIPO_TURNO'] = encode_shift_codes(matriz2['TIPO_TURNO'], shift_dtype)
+
+    # Add HORARIO column
+    matriz2['HORARIO'] = matriz2['TIPO_TURNO'].mask(
+        matriz2['TIPO_TURNO'].isin(['M', 'T', 'MoT', 'P']), 'H'
+    )
+
+    # Get unique shift types
+    tipos_de_turno = matriz2['TIPO_TURNO'].unique().tolist()
+
+    # Process MoT and P shifts if they exist
+    if 'MoT' in tipos_de_turno:
+        matriz2 = func_turnos(matriz2, 'MoT')
+    if 'P' in tipos_de_turno:
+        matriz2 = func_turnos(matriz2, 'P')
+
+    # Add date-related columns
+    matriz2['DATA'] = pd.to_datetime(matriz2['DATA'])
+    matriz2['WDAY'] = matriz2['DATA'].dt.dayofweek + 1  # Convert to 1-7 scale
+    matriz2['ID'] = range(len(matriz2))
+    matriz2['WW'] = adjusted_isoweeks(matriz2['DATA'])
+    matriz2['WD'] = matriz2['DATA'].dt.day_name().str[:3]
+
+    # Calculate DIA_TIPO from a per-date feature table, joined back on DATA
+    dia_features = (matriz2.assign(is_feriado=matriz2['TIPO_TURNO'] == 'F',
+                                   not_feriado_horario=matriz2['HORARIO'] != 'F')
+                    .groupby('DATA', sort=False)
+                    .agg(has_feriado=('is_feriado', 'any'),
+                         any_not_feriado_horario=('not_feriado_horario', 'any'),
+                         WD=('WD', 'first')))
+    dia_features['is_sunday'] = dia_features['WD'] == 'Sun'
+    dia_features['DIA_TIPO'] = np.where(
+        (dia_features['has_feriado'] | dia_features['is_sunday']) & dia_features['any_not_feriado_horario'],
+        'domYf',
+        dia_features['WD']
+    )
+
+    matriz2['DIA_TIPO'] = matriz2['DATA'].map(dia_features['DIA_TIPO'])
+
+    # Merge with employee admission/dismissal dates
+    emp_dates = matrizA_og[['emp', 'data_admissao', 'data_demissao']].copy()
+    emp_dates = pd.concat([
+        emp_dates,
+        pd.DataFrame({'emp': ['TIPO_DIA'], 'data_admissao': [pd.NaT], 'data_demissao': [pd.NaT]})
+    ])
+
+    matriz2 = matriz2.merge(emp_dates, left_on='COLABORADOR', right_on='emp', how='left')
+
+    # Filter by dismissal date and adjust HORARIO based on admission date
+    matriz2 = matriz2[
+        matriz2['DATA'] <= matriz2['data_demissao'].fillna(pd.Timestamp('2100-01-01'))
+    ]
+
+    matriz2['HORARIO'] = encode_shift_codes(adjust_horario_by_admission(matriz2), shift_dtype)
+
+    return {'matriz2': matriz2, 'tipos_de_turno': tipos_de_turno, 'shift_dtype': shift_dtype}
+
+
+def count_sunday_holidays(matriz2: pd.DataFrame, matrizA_og: pd.DataFrame, fer: pd.DataFrame, convenio_bd: str) -> Dict[str, Any]:
+    """
+    Count the Sundays/holidays and vacation days already off per employee (total_dom_fes, total_fes, total_holidays).
+
+    Args:
+        matriz2: Long calendar
+        matrizA_og: Employee data
+        fer: Holiday data
+        convenio_bd: Convention of the unit ('BD' or SABECO)
+
+    Returns:
+        Dict with matrizA_og
+    """
+    #CRIAR MATRIZ_A--------------------------------------------------
+
+    # Extract festivos (holidays)
+    dom_e_fes = matriz2[
+        (matriz2['HORARIO'] == 'F') & 
+        (matriz2['COLABORADOR'] == 'TIPO_DIA')
+    ]['DATA'].unique()
+
+    # Filter matrizA_og
+    matrizA_og = matrizA_og[matrizA_og['matricula'] != ''].copy()
+
+    # Precomputed boolean columns for the employees of matrizA_og
+    tipo_by_emp = matrizA_og.drop_duplicates('matricula').set_index('matricula')['tipo_contrato']
+    rows = matriz2[matriz2['COLABORADOR'].isin(tipo_by_emp.index)]
+    fer_tipo3 = fer[fer['tipo'] == 3]['data'] if 'tipo' in fer.columns else []
+
+    is_rest = rows['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']).to_numpy()
+    is_monday = (rows['WDAY'] == 1).to_numpy()
+    is_dom_fes = rows['DATA'].isin(dom_e_fes).to_numpy()
+    is_closed = rows['DATA'].isin(fer_tipo3).to_numpy()
+    zeros = np.zeros(len(rows), dtype=np.int64)
+
+    if convenio_bd == 'BD':  # Assuming BD convention
+        is_45d = rows['COLABORADOR'].map(tipo_by_emp).isin([4, 5]).to_numpy()
+        # 4/5 day contracts: rest Mondays minus closed days that fell on them, rest holidays
+        # minus closed days on other weekdays, and vacation days
+        # Other contract types: rest Mondays/holidays minus rest closed days
+        count_dom_fes = np.where(
+            is_45d,
+            (is_rest & is_monday).astype(np.int64) - (is_rest & is_closed & is_monday),
+            (is_rest & (is_monday | is_dom_fes)).astype(np.int64) - (is_rest & is_closed)
+        )
+        count_fes = np.where(
+            is_45d,
+            (is_rest & is_dom_fes).astype(np.int64) - (is_rest & is_closed & ~is_monday),
+            zeros
+        )
+        count_holidays = np.where(is_45d, (rows['HORARIO'] == 'V').to_numpy(), zeros)
+    else:
+        # SABECO convention
+        count_dom_fes = (
+            (rows['HORARIO'] != 'NL').to_numpy() &
+            rows['HORARIO'].str.contains('^L|DFS', case=False, na=False).to_numpy() &
+            (is_monday | is_dom_fes)
+        ).astype(np.int64)
+        count_fes = zeros
+        count_holidays = zeros
+
+    # One grouped aggregation for the three counters
+    df_merge_count = (pd.DataFrame({
+        'matricula': rows['COLABORADOR'].to_numpy(),
+        'total_dom_fes': count_dom_fes,
+        'total_fes': count_fes,
+        'total_holidays': count_holidays.astype(np.int64),
+    })
+        .groupby('matricula', sort=False).sum()
+        .reindex(tipo_by_emp.index, fill_value=0)
+        .rename_axis('matricula')
+        .reset_index())
+
+    matrizA_og = matrizA_og.merge(df_merge_count, on='matricula', how='left')
+
+    # Divide by 2 (as in R code)
+    matrizA_og['total_dom_fes'] = matrizA_og['total_dom_fes'] / 2
+    matrizA_og['total_fes'] = matrizA_og['total_fes'] / 2
+    matrizA_og['total_holidays'] = matrizA_og['total_holidays'] / 2
+
+    # Adjust for contract type 3
+    matrizA_og.loc[matrizA_og['tipo_contrato'] == 3, 'total_dom_fes'] = 0
+    matrizA_og.loc[matrizA_og['tipo_contrato'] == 3, 'dyf_max_t'] = 0
+
+    # Add DESCANSOS_ATRB column
+    matrizA_og['descansos_atrb'] = 0
+
+    return {'matrizA_og': matrizA_og}
+
+
+def rest_pattern_counts(matriz2: pd.DataFrame, matrizA_og: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count the rest days already assigned per employee: LD_at, LQ_at, LRES_at and CXX_at
+    (4/5-day contracts get no LD_at, 6-day contracts no LRES_at) and the weekend patterns
+    C2D_at (rest Sun+Mon or Sat+Sun only) and C3D_at (rest Fri..Sun or Sat..Mon).
+
+    The calendar is laid out once as an employees x days matrix (one cell per employee and
+    day, first non-missing HORARIO of the day), so the previous/next day conditions are
+    array shifts and each counter is a row sum.
+
+    Args:
+        matriz2: Long calendar with COLABORADOR, DATA, WDAY, HORARIO and DIA_TIPO columns
+        matrizA_og: Employee data (matricula, tipo_contrato)
+
+    Returns:
+        DataFrame with COLABORADOR, LD_at, LQ_at, LRES_at, CXX_at, C2D_at and C3D_at for the
+        4/5 and 6-day contract employees
+    """
+    # One row per employee and day
+    days = (matriz2[matriz2['COLABORADOR'].isin(matrizA_og['matricula'])]
+            .groupby(['COLABORADOR', 'DATA'])[['WDAY', 'HORARIO', 'DIA_TIPO']]
+            .first())
+    emp_codes, employees = pd.factorize(days.index.get_level_values('COLABORADOR'))
+    positions = days.groupby(level='COLABORADOR', sort=False).cumcount().to_numpy()
+    n_days = int(positions.max()) + 1 if len(positions) > 0 else 0
+
+    # Dense matrices with two padding days on each side (missing days are not rest and have no weekday)
+    def dense(values, fill):
+        matrix = np.full((len(employees), n_days + 4), fill, dtype=np.asarray(values).dtype)
+        matrix[emp_codes, positions + 2] = values
+        return matrix
+
+    horario = days['HORARIO']
+    is_rest = dense(horario.str.contains('^L', case=False, na=False).to_numpy(), False)
+    is_l = dense((horario == 'L').to_numpy(), False)
+    wday = dense(days['WDAY'].fillna(0).to_numpy(dtype=np.int64), 0)
+
+    cur = slice(2, -2)
+    rest, rest_prev, rest_next, rest_next2 = is_rest[:, cur], is_rest[:, 1:-3], is_rest[:, 3:-1], is_rest[:, 4:]
+    wd, wd_prev, wd_next, wd_next2 = wday[:, cur], wday[:, 1:-3], wday[:, 3:-1], wday[:, 4:]
+    l_prev = is_l[:, 1:-3]
+    not_dom_fes = dense((days['DIA_TIPO'] != 'domYf').to_numpy(), False)[:, cur]
+    is_ld = dense((horario == 'LD').to_numpy(), False)[:, cur]
+    is_lq = dense((horario == 'LQ').to_numpy(), False)[:, cur]
+
+    # Rest days counters
+    base = not_dom_fes & rest
+    tue_sun = (wd >= 2) & (wd <= 7)
+    tue_sat = (wd >= 2) & (wd <= 6)
+    single = tue_sun & ~rest_next & ~l_prev
+    ld_at = (base & ~is_lq & single).sum(axis=1)
+    lq_at = (base & ~is_ld & single).sum(axis=1)
+    lres_at = (base & tue_sat & ~rest_prev & ~rest_next).sum(axis=1)
+    cxx_at = (base & tue_sat & rest_prev).sum(axis=1)
+
+    # Consecutive day patterns (C2D and C3D)
+    sun_mon_rest = (wd == 7) & (wd_next == 1) & rest_next
+    fri_sat_sun = (wd_prev == 6) & rest_prev & rest & sun_mon_rest
+    sat_sun_mon = rest & sun_mon_rest & (wd_next2 == 2) & rest_next2
+    sat_sun_only = rest & sun_mon_rest & (wd_next2 == 2) & ~rest_next2 & (wd_prev == 6) & ~rest_prev
+    sun_mon_only = ~rest & sun_mon_rest & (wd_next2 == 2) & rest_next2
+    c2d_at = (sat_sun_only.sum(axis=1) + sun_mon_only.sum(axis=1)).astype(float)
+    c3d_at = (sat_sun_mon.sum(axis=1) + fri_sat_sun.sum(axis=1)).astype(float)
+
+    # One row per 4/5-day contract employee, then per 6-day contract employee
+    colabs_45d = matrizA_og[matrizA_og['tipo_contrato'].isin([4, 5])]['matricula'].tolist()
+    colabs_6d = matrizA_og[matrizA_og['tipo_contrato'] == 6]['matricula'].tolist()
+    colabs = colabs_45d + colabs_6d
+    # Employees without calendar rows point to a trailing 0
+    idx = pd.Index(employees).get_indexer(colabs)
+    is_6d = np.arange(len(colabs)) >= len(colabs_45d)
+
+    def per_colab(counts, mask=None):
+        values = np.append(counts, 0)[idx]
+        return values if mask is None else np.where(mask, values, 0)
+
+    return pd.DataFrame({
+        'COLABORADOR': colabs,
+        'LD_at': per_colab(ld_at, is_6d).astype(np.int64),
+        'LQ_at': per_colab(lq_at).astype(np.int64),
+        'LRES_at': per_colab(lres_at, ~is_6d).astype(np.int64),
+        'CXX_at': per_colab(cxx_at).astype(np.int64),
+        'C2D_at': per_colab(c2d_at).astype(float),
+        'C3D_at': per_colab(c3d_at).astype(float),
+    })
+
+
+def count_rest_days(matriz2: pd.DataFrame, matrizA_og: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Count the rest days already assigned per employee (LD/LQ/LRES/CXX and the C2D/C3D patterns).
+
+    Args:
+        matriz2: Long calendar
+        matrizA_og: Employee data with the Sunday/holiday counters
+
+    Returns:
+        Dict with matrizA_og
+    """
+    # CALCULA LIBRANÇAS ------------------------------------------------------------
+
+    count_ldt = rest_pattern_counts(matriz2, matrizA_og)
+
+    # Merge with matrizA_og
+    matrizA_og = matrizA_og.merge(count_ldt, left_on='matricula', right_on='COLABORADOR', how='left').fillna(0)
+
+    return {'matrizA_og': matrizA_og}
+
+
+def adjust_rest_targets(matrizA_og: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Subtract the rest days already assigned from the targets and select the matrizA columns.
+
+    Args:
+        matrizA_og: Employee data with the rest day counters
+
+    Returns:
+        Dict with matrizA
+    """
+    # Store original matrizA_og
+    matrizA_og_ed = share(matrizA_og)
+
+    # Adjust C2D logic (C2D = C2D + C3D)
+    matrizA_og['C2D_at'] = matrizA_og['C2D_at'] + matrizA_og['C3D_at']
+
+    # Log the column names of matrizA_og
+    logger.info(f"Columns in matrizA_og after processing: {matrizA_og.columns.tolist()}")
+
+    # Calculate adjusted values
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['LD_at']
+    matrizA_og['ld'] = np.maximum(matrizA_og['ld'] - matrizA_og['LD_at'], 0)
+    matrizA_og['l_dom'] = matrizA_og['l_dom'] - matrizA_og['total_dom_fes'] - matrizA_og['total_fes']
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['total_dom_fes']
+
+    # Handle holidays based on contract type
+    holiday_adjustment = np.where(
+        matrizA_og['tipo_contrato'] == 4,
+        2 * matrizA_og['total_holidays'].apply(custom_round) / 7,
+        matrizA_og['total_holidays'].apply(custom_round) / 7
+    )
+    matrizA_og['l_total'] = matrizA_og['l_total'] - holiday_adjustment
+
+    # Handle C2D and C3D
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['C2D_at']
+    matrizA_og['c2d'] = np.maximum(matrizA_og['c2d'] - matrizA_og['C2D_at'], 0)
+
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['C3D_at']
+    matrizA_og['c3d'] = np.maximum(matrizA_og['c3d'] - matrizA_og['C3D_at'], 0)
+
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['LQ_at']
+    matrizA_og['lq'] = np.maximum(matrizA_og['lq'] - matrizA_og['LQ_at'], 0)
+
+    # Handle CXX
+    matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['CXX_at']
+    matrizA_og['cxx'] = np.maximum(matrizA_og['cxx'] - matrizA_og['CXX_at'], 0)
+
+    # Create matrizA with selected columns
+    matrizA = matrizA_og[[
+        'unidade', 'secao', 'posto', 'fk_colaborador', 'matricula', 'out',
+        'tipo_contrato', 'ciclo', 'l_total', 'l_dom', 'ld', 'lq', 'q', 
+        'c2d', 'c3d', 'cxx', 'descansos_atrb', 'dyf_max_t', 'LRES_at', 'lq_og'
+    ]].copy()
+
+    return {'matrizA': matrizA}
+
+
+def process_short_contracts(matriz2: pd.DataFrame, matrizA: pd.DataFrame, shift_dtype: pd.CategoricalDtype, semanas_restantes: int) -> Dict[str, Any]:
+    """
+    Handle the 2/3-day contracts (NL2D/NL3D weeks, l_total) and finish the matrizA targets.
+
+    Args:
+        matriz2: Long calendar
+        matrizA: Employee targets
+        shift_dtype: Shift code dtype of matriz2
+        semanas_restantes: Remaining weeks of the year
+
+    Returns:
+        Dict with matriz2 and matrizA
+    """
+    # CONTRATOS 2/3DIAS Processing -----------------------------------------------
+
+    # Create matriz2_3D for 2/3 day contracts
+    contract_23_employees = matrizA[matrizA['tipo_contrato'].isin([2, 3])]['matricula'].tolist()
+
+    if len(contract_23_employees) > 0:
+        matriz2_3d = matriz2[matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
+
+        # Merge with contract type information
+        contract_info = matrizA[matrizA['tipo_contrato'].isin([2, 3])][['matricula', 'tipo_contrato']]
+        matriz2_3d = matriz2_3d.merge(contract_info, left_on='COLABORADOR', right_on='matricula', how='left')
+
+        # Filter out unwanted HORARIO types and group by week/employee
+        matriz2_3d = matriz2_3d[~matriz2_3d['HORARIO'].isin(['-', 'V', 'F'])].copy()
+
+        # Count work days per week per employee (divide by 2 for morning/afternoon)
+        week_counts = (matriz2_3d.groupby(['COLABORADOR', 'WW'])
+                    .size()
+                    .reset_index(name='count'))
+        week_counts['count'] = week_counts['count'] / 2
+
+        # Merge back with matriz2_3d
+        matriz2_3d = matriz2_3d.merge(week_counts, on=['COLABORADOR', 'WW'], how='left')
+
+        # Update HORARIO based on count and contract type
+        horario_3d = np.select(
+            [(matriz2_3d['count'] == 3) & (matriz2_3d['tipo_contrato'] == 3),
+             (matriz2_3d['count'] == 2) & (matriz2_3d['tipo_contrato'] == 2)],
+            ['NL3D', 'NL2D'],
+            default=matriz2_3d['HORARIO'].to_numpy(dtype=object)
+        )
+        matriz2_3d['HORARIO'] = encode_shift_codes(pd.Series(horario_3d, index=matriz2_3d.index, dtype=object), shift_dtype)
+
+        # Remove unnecessary columns
+        matriz2_3d = matriz2_3d.drop(['count', 'tipo_contrato_y'], axis=1, errors='ignore')
+
+        # Merge back with main matriz2
+        # First remove the employees that were processed
+        matriz2 = matriz2[~matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
+        # Then add back the processed data
+        matriz2 = pd.concat([matriz2, matriz2_3d], ignore_index=True)
+
+    # Convert DATA back to string
+    matriz2['DATA'] = matriz2['DATA'].astype(str)
+
+    # Calculate work weeks for 2/3 day contract employees
+    if len(contract_23_employees) > 0:
+        matriz3d = matriz2[matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
+
+        # Filter work days and count weeks
+        matriz3d = matriz3d[~matriz3d['HORARIO'].isin(['-', 'V', 'F', 'NL3D', 'NL2D'])].copy()
+
+        work_weeks = (matriz3d.groupby('COLABORADOR')['WW']
+                    .nunique()
+                    .reset_index(name='count'))
+        work_weeks.columns = ['matricula', 'count']
+
+        # Merge with matrizA
+        matrizA = matrizA.merge(work_weeks, on='matricula', how='left')
+
+        # Update L_TOTAL for 2/3 day contracts
+        matrizA.loc[matrizA['tipo_contrato'].isin([2, 3]), 'l_total'] = (
+            matrizA.loc[matrizA['tipo_contrato'].isin([2, 3]), 'count']
+        )
+    else:
+        matrizA['count'] = 0
+
+    matrizA = matrizA.fillna(0)
+    matrizA = matrizA.drop('count', axis=1, errors='ignore')
+    # Apply clip to all numeric columns explicitly
+    numeric_cols = matrizA.select_dtypes(include=['number']).columns
+    matrizA[numeric_cols] = matrizA[numeric_cols].clip(lower=0)
+
+    # Add L_RES column
+    matrizA['l_res'] = 0
+
+    # Calculate auxiliary columns
+    matrizA['aux'] = matrizA['l_dom'] + matrizA['ld'] + matrizA['lq'] + matrizA['c2d'] + matrizA['c3d'] + matrizA['cxx']
+    matrizA['aux2'] = matrizA['l_total'] - matrizA['aux']
+
+    # Adjust LD if aux2 is negative
+    matrizA.loc[matrizA['aux2'] < 0, 'ld'] = matrizA['ld'] + matrizA['aux2']
+    matrizA = matrizA.drop(['aux', 'aux2'], axis=1)
+
+    # Set L_RES for contract type 3
+    matrizA.loc[matrizA['tipo_contrato'] == 3, 'l_res'] = matrizA.loc[matrizA['tipo_contrato'] == 3, 'l_total']
+
+    # Rename columns to match R output
+    matrizA = matrizA.rename(columns={
+        'ld': 'l_d',
+        'lq': 'l_q', 
+        'q': 'l_qs'
+    })
+
+    # Add VZ (empty days) for 4-day contracts
+    matrizA['vz'] = np.where(matrizA['tipo_contrato'] == 4, semanas_restantes - 4, 0)
+
+    return {'matriz2': matriz2, 'matrizA': matrizA}
+
+
+def build_backups(matriz2: pd.DataFrame, matrizA: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Build the backup matrices (matrizA_bk_og, matrizA_bk, matriz2_bk) and fix TIPO_TURNO by week.
+
+    Args:
+        matriz2: Long calendar
+        matrizA: Employee targets
+
+    Returns:
+        Dict with matriz2_bk, matrizA_bk, matrizA_bk_og and matriz_data_turno_bk
+    """
+    # Update HORARIO: change 'L' to 'L_'
+    matriz2.loc[matriz2['HORARIO'] == 'L', 'HORARIO'] = 'L_'
+
+    # Create backup matrices
+    matrizA_bk_og = share(matrizA)
+    matrizA_bk_og['l_res'] = (matrizA_bk_og['l_total'] - matrizA_bk_og['l_dom'] - 
+                            matrizA_bk_og['l_d'] - matrizA_bk_og['l_q'] - 
+                            matrizA_bk_og['l_qs'] - matrizA_bk_og['c2d'] - 
+                            matrizA_bk_og['c3d'] - matrizA_bk_og['cxx'] - 
+                            matrizA_bk_og['vz'] - matrizA_bk_og['LRES_at'])
+    matrizA_bk_og['l_total'] = matrizA_bk_og['l_total'] - matrizA_bk_og['LRES_at']
+    matrizA_bk_og = matrizA_bk_og.drop('LRES_at', axis=1)
+    matrizA_bk_og.loc[matrizA_bk_og['l_res'] < 0, 'vz'] = matrizA_bk_og['vz'] + matrizA_bk_og['l_res']
+
+    matrizA_bk = share(matrizA)
+    matrizA_bk['l_res'] = (matrizA_bk['l_total'] - matrizA_bk['l_dom'] - 
+                        matrizA_bk['l_d'] - matrizA_bk['l_q'] - 
+                        matrizA_bk['l_qs'] - matrizA_bk['c2d'] - 
+                        matrizA_bk['c3d'] - matrizA_bk['cxx'] - 
+                        matrizA_bk['vz'] - matrizA_bk['LRES_at'])
+    matrizA_bk['l_total'] = matrizA_bk['l_total'] - matrizA_bk['LRES_at']
+    matrizA_bk = matrizA_bk.drop('LRES_at', axis=1)
+    matrizA_bk.loc[matrizA_bk['l_res'] < 0, 'vz'] = matrizA_bk['vz'] + matrizA_bk['l_res']
+
+    # Sort by L_TOTAL descending and clip negative values
+    matrizA_bk = matrizA_bk.sort_values('l_total', ascending=False)
+    # Before clipping, identify numeric columns
+    numeric_cols = matrizA_bk.select_dtypes(include=['number']).columns
+    # Apply clip only to numeric columns
+    matrizA_bk[numeric_cols] = matrizA_bk[numeric_cols].clip(lower=0)
+
+    # Create backup for matriz_data_turno (placeholder)
+    matriz_data_turno_bk = pd.DataFrame({'COLUNA': [np.nan]})
+
+    # Dev TIPO TURNO FIX ---------------------------------------------------------------------
+    # Fix TIPO_TURNO for consistency
+    matriz2_tipo_turno_fix = (matriz2[matriz2['HORARIO'].isin(['H', 'DFS'])]
+                            [['WW', 'TIPO_TURNO']]
+                            .drop_duplicates('WW')
+                            .rename(columns={'TIPO_TURNO': 'TIPO_TURNO_FIX'}))
+
+    matriz2 = matriz2.merge(matriz2_tipo_turno_fix, on='WW', how='left')
+    matriz2.loc[matriz2['TIPO_TURNO'] == 'NL', 'TIPO_TURNO'] = matriz2['TIPO_TURNO_FIX']
+    matriz2 = matriz2.drop('TIPO_TURNO_FIX', axis=1, errors='ignore')
+
+    matriz2_bk = share(matriz2)
+
+    return {'matriz2_bk': matriz2_bk, 'matrizA_bk': matrizA_bk, 'matrizA_bk_og': matrizA_bk_og, 'matriz_data_turno_bk': matriz_data_turno_bk}
+
+
+def process_employees(matrizA_bk: pd.DataFrame, matriz2_bk: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Adjust the targets of each employee by contract type and cycle.
+
+    Args:
+        matrizA_bk: Employee targets
+        matriz2_bk: Long calendar
+
+    Returns:
+        Dict with matrizA_bk, matriz2_bk and logs
+    """
+    # Individual Employee Processing Loop ----------------------------------------
+    # One row per employee (the first one if repeated), updated column-wise by contract type and cycle
+
+    matrizA_bk = matrizA_bk.drop_duplicates('matricula').reset_index(drop=True)
+    n_rows = len(matrizA_bk)
+    tipo_contrato = matrizA_bk['tipo_contrato']
+    ciclo = matrizA_bk['ciclo'] if 'ciclo' in matrizA_bk.columns else pd.Series('', index=matrizA_bk.index)
+    dyf_max_t = matrizA_bk['dyf_max_t'] if 'dyf_max_t' in matrizA_bk.columns else pd.Series(0, index=matrizA_bk.index)
+
+    is_23d = tipo_contrato.isin([2, 3]).to_numpy()
+    # Employee doesn't work any Sunday - force all Sundays with L
+    no_dyf = ~is_23d & (dyf_max_t == 0).to_numpy() & (ciclo != 'COMPLETO').to_numpy()
+    # Special cycle: only assign Sundays and LD
+    sin_dyf = ~is_23d & ~no_dyf & (ciclo == 'SIN DYF').to_numpy()
+    completo = (ciclo == 'COMPLETO').to_numpy()
+    with_cxx = (tipo_contrato.isin([4, 5]) & (matrizA_bk['cxx'] > 0) & ~ciclo.isin(['SIN DYF', 'COMPLETO'])).to_numpy()
+
+    # Process 2/3-day contracts: L_RES/L_DOM per week (calcular_folgas_semanas), summed per employee
+    tipo_by_colab = matrizA_bk.loc[is_23d].set_index('matricula')['tipo_contrato']
+    calendar_23d = matriz2_bk[matriz2_bk['COLABORADOR'].isin(tipo_by_colab.index)]
+    calendar_23d = calendar_23d.sort_values(['COLABORADOR', 'DATA', 'TIPO_TURNO'], ascending=[True, True, False])
+
+    # Remove duplicates by keeping first occurrence per COLABORADOR/DATA
+    days_23d = calendar_23d.groupby(['COLABORADOR', 'DATA']).first().reset_index()
+    days_23d['tipo_contrato'] = days_23d['COLABORADOR'].map(tipo_by_colab)
+
+    folgas = calcular_folgas_semanas(days_23d).groupby('COLABORADOR')[['L_RES', 'L_DOM']].sum()
+    folgas_l_res = folgas['L_RES'].to_dict()
+    folgas_l_dom = folgas['L_DOM'].to_dict()
+
+    if folgas_l_res:
+        with_folgas = matrizA_bk['matricula'].isin(list(folgas_l_res)).to_numpy()
+        total_l_res = matrizA_bk.loc[with_folgas, 'matricula'].map(folgas_l_res)
+        total_l_dom = matrizA_bk.loc[with_folgas, 'matricula'].map(folgas_l_dom)
+        matrizA_bk.loc[with_folgas, 'l_res'] = total_l_res
+        matrizA_bk.loc[with_folgas, 'l_dom'] = total_l_dom
+        matrizA_bk.loc[with_folgas, 'l_total'] = total_l_res + total_l_dom
+
+    if no_dyf.any():
+        matrizA_bk.loc[no_dyf, 'l_total'] = matrizA_bk.loc[no_dyf, 'l_total'] - matrizA_bk.loc[no_dyf, 'l_dom']
+        matrizA_bk.loc[no_dyf, 'l_dom'] = 0
+
+    if sin_dyf.any():
+        c2d = matrizA_bk.loc[sin_dyf, 'c2d'] - matrizA_bk.loc[sin_dyf, 'c3d']
+        matrizA_bk.loc[sin_dyf, 'c2d'] = c2d
+        matrizA_bk.loc[sin_dyf, 'l_total'] = (matrizA_bk.loc[sin_dyf, 'l_dom'] + matrizA_bk.loc[sin_dyf, 'l_d'] +
+                                              c2d + matrizA_bk.loc[sin_dyf, 'cxx'])
+        matrizA_bk.loc[sin_dyf, ['l_q', 'l_qs', 'c3d', 'l_res', 'vz']] = 0
+
+    # Handle COMPLETO cycle - reset all columns from position 9 onwards to 0
+    if completo.any():
+        matrizA_bk.loc[completo, matrizA_bk.columns[8:]] = 0
+
+    # Handle CXX for 4/5 day contracts
+    l_res2 = np.zeros(n_rows)
+    l_res2[with_cxx] = matrizA_bk.loc[with_cxx, 'l_res'] - matrizA_bk.loc[with_cxx, 'cxx']
+    matrizA_bk['l_res2'] = l_res2
+    if with_cxx.any():
+        matrizA_bk.loc[with_cxx, 'l_res'] = matrizA_bk.loc[with_cxx, 'cxx']
+
+    # Update calendar matrix with domYfes with L, applied once for every employee without Sundays
+    no_dyf_colabs = matrizA_bk.loc[no_dyf, 'matricula']
+    if len(no_dyf_colabs) > 0:
+        colab_order = matriz2_bk['COLABORADOR'].map(pd.Series(np.arange(1, len(no_dyf_colabs) + 1), index=no_dyf_colabs.to_numpy()))
+        matriz2_bk.loc[colab_order.notna() & (matriz2_bk['DIA_TIPO'] == 'domYf') &
+                       (matriz2_bk['HORARIO'] != 'V'), 'HORARIO'] = 'L_DOM'
+        # Their rows go to the end of the calendar, in employee order
+        matriz2_bk = matriz2_bk.iloc[np.argsort(colab_order.fillna(0).to_numpy(), kind='stable')].reset_index(drop=True)
+
+    # Final cleanup of matrizA_bk
+    matrizA_bk = matrizA_bk.drop('dyf_max_t', axis=1, errors='ignore')
+    matrizA_bk = matrizA_bk.reset_index(drop=True)
+
+    # Initialize logs
+    logs = None
+
+    # Update matriz2_bk HORARIO: L_ -> L_DOM for domYf
+    matriz2_bk.loc[(matriz2_bk['DIA_TIPO'] == 'domYf') & 
+                (matriz2_bk['HORARIO'] == 'L_'), 'HORARIO'] = 'L_DOM'
+
+    return {'matrizA_bk': matrizA_bk, 'matriz2_bk': matriz2_bk, 'logs': logs}
+
+
+def build_matrizB(matriz2_bk: pd.DataFrame, matrizB_ini: pd.DataFrame, param_pess_obj: float) -> Dict[str, Any]:
+    """
+    Add the scheduled coverage (+H), target people and diff to the demand matrix.
+
+    Args:
+        matriz2_bk: Long calendar
+        matrizB_ini: Demand estimates
+        param_pess_obj: Coefficient of variation threshold to round the target people up
+
+    Returns:
+        Dict with matrizB_bk
+    """
+    #CRIAR MATRIZ_B--------------------------------------------------
+
+    # Calculate +H (working hours) for morning and afternoon shifts
+    # Per employee and day: works the M / T shift (HORARIO with H or NL)
+    employees = matriz2_bk[matriz2_bk['COLABORADOR'] != 'TIPO_DIA']
+    works = employees['HORARIO'].str.contains('H|NL', case=False, na=False)
+    works_shift = pd.DataFrame({
+        'DATA': employees['DATA'],
+        'COLABORADOR': employees['COLABORADOR'],
+        'M': works & (employees['TIPO_TURNO'] == 'M'),
+        'T': works & (employees['TIPO_TURNO'] == 'T'),
+    }).groupby(['DATA', 'COLABORADOR'], sort=False)[['M', 'T']].any()
+
+    # Weight: 1 if the employee only works that shift, 0.5 if both M and T, 0 otherwise
+    both = works_shift['M'] & works_shift['T']
+    weights = pd.DataFrame({
+        'M': np.where(both, 0.5, works_shift['M'].astype(float)),
+        'T': np.where(both, 0.5, works_shift['T'].astype(float)),
+    }, index=works_shift.index)
+    coverage = (weights.groupby(level='DATA', sort=False).sum()
+                .reindex(pd.unique(matriz2_bk['DATA']), fill_value=0.0))
+    trab = (coverage.rename_axis('DATA').reset_index()
+            .melt(id_vars='DATA', var_name='TURNO', value_name='+H'))
+
+    # Merge +H with matrizB (morning rows, then afternoon rows)
+    matrizB_ini = pd.concat([matrizB_ini[matrizB_ini['turno'] == 'M'],
+                             matrizB_ini[matrizB_ini['turno'] == 'T']], ignore_index=True)
+    matrizB_ini = matrizB_ini.merge(trab, left_on=['data', 'turno'],
+                                    right_on=['DATA', 'TURNO'], how='left')
+    matrizB_ini = matrizB_ini.drop(['DATA', 'TURNO'], axis=1, errors='ignore')
+
+    # Calculate objective function and diff
+    matrizB_ini['max_turno'] = pd.to_numeric(matrizB_ini['max_turno'], errors='coerce')
+    matrizB_ini['min_turno'] = pd.to_numeric(matrizB_ini['min_turno'], errors='coerce')
+    matrizB_ini['sd_turno'] = pd.to_numeric(matrizB_ini['sd_turno'], errors='coerce')
+    matrizB_ini['media_turno'] = pd.to_numeric(matrizB_ini['media_turno'], errors='coerce')
+    matrizB_ini['+H'] = pd.to_numeric(matrizB_ini['+H'], errors='coerce').fillna(0)
+
+    # Calculate aux (coefficient of variation)
+    matrizB_ini['aux'] = np.where(
+        matrizB_ini['media_turno'] != 0,
+        matrizB_ini['sd_turno'] / matrizB_ini['media_turno'],
+        0
+    )
+
+    # Calculate pessObj (target people)
+    matrizB_ini['pess_obj'] = np.where(
+        matrizB_ini['aux'] >= param_pess_obj,
+        np.ceil(matrizB_ini['media_turno']),
+        np.round(matrizB_ini['media_turno'])
+    )
+
+    # Calculate diff (difference between actual and target)
+    matrizB_ini['diff'] = matrizB_ini['+H'] - matrizB_ini['pess_obj']
+
+    # Ensure min_turno is at least 1
+    matrizB_ini['min_turno'] = np.where(matrizB_ini['min_turno'] == 0, 1, matrizB_ini['min_turno'])
+
+    # Create final matrizB
+    matrizB = share(matrizB_ini)
+
+    # Add weekday
+    matrizB['data'] = pd.to_datetime(matrizB['data'])
+    matrizB['WDAY'] = matrizB['data'].dt.dayofweek + 1
+
+    # Create backup
+    matrizB_bk = share(matrizB)
+
+    return {'matrizB_bk': matrizB_bk}
+
+
+def compute_fest_h(matriz2_bk: pd.DataFrame, matrizA_bk: pd.DataFrame, matrizA_bk_og: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compute the holiday work statistics (fest_h, min_fest_h) per employee.
+
+    Args:
+        matriz2_bk: Long calendar
+        matrizA_bk: Employee targets
+        matrizA_bk_og: Employee targets before the per-employee adjustments (with dyf_max_t)
+
+    Returns:
+        Dict with matrizA_bk
+    """
+    # Calculate festH (holiday work hours): domYf days (WDAY != 1) the employee works (H/NL, OUT or DFS)
+    fest_days = matriz2_bk[(matriz2_bk['DIA_TIPO'] == 'domYf') & (matriz2_bk['WDAY'] != 1)]
+    works = (fest_days['HORARIO'].str.contains('H|NL', case=False, na=False) |
+             fest_days['HORARIO'].isin(['OUT', 'DFS']))
+    fest_h = (works.groupby([fest_days['COLABORADOR'], fest_days['DATA']]).any()
+              .groupby(level=0).sum())
+
+    matrizA_bk = matrizA_bk.reset_index(drop=True)
+    matrizA_bk['fest_h'] = matrizA_bk['matricula'].map(fest_h).fillna(0).astype(np.int64)
+
+    # Calculate minFestH based on DyF_MAX_T (dropped from matrizA_bk by process_employees)
+    dyf_max_t = matrizA_bk['matricula'].map(
+        matrizA_bk_og.drop_duplicates('matricula').set_index('matricula')['dyf_max_t'])
+    min_fest_h_ratio = dyf_max_t.map(MIN_FEST_H_RATIOS).fillna(0)
+    matrizA_bk['min_fest_h'] = np.round(matrizA_bk['fest_h'] * min_fest_h_ratio).astype(np.int64)
+    matrizA_bk['obj_fes'] = matrizA_bk['fest_h'] - matrizA_bk['min_fest_h']
+
+    # Drop intermediate columns
+    matrizA_bk = matrizA_bk.drop(['fest_h', 'obj_fes'], axis=1, errors='ignore')
+
+    return {'matrizA_bk': matrizA_bk}
+
+
+def func_inicializa_steps() -> List[PipelineStep]:
+    """
+    Steps of func_inicializa, in execution order.
+
+    Returns:
+        List of PipelineStep
+    """
+    return [
+        PipelineStep('adjust_matrizB_dates', adjust_matrizB_dates, ['matrizB_og'], ['matrizB_ini']),
+        PipelineStep('build_matriz2', build_matriz2, ['matriz2_og', 'matriz2_long', 'matrizA_og', 'start_date', 'end_date'], ['matriz2', 'tipos_de_turno', 'shift_dtype']),
+        PipelineStep('count_sunday_holidays', count_sunday_holidays, ['matriz2', 'matrizA_og', 'fer', 'convenio_bd'], ['matrizA_og']),
+        PipelineStep('count_rest_days', count_rest_days, ['matriz2', 'matrizA_og'], ['matrizA_og']),
+        PipelineStep('adjust_rest_targets', adjust_rest_targets, ['matrizA_og'], ['matrizA']),
+        PipelineStep('process_short_contracts', process_short_contracts, ['matriz2', 'matrizA', 'shift_dtype', 'semanas_restantes'], ['matriz2', 'matrizA']),
+        PipelineStep('build_backups', build_backups, ['matriz2', 'matrizA'], ['matriz2_bk', 'matrizA_bk', 'matrizA_bk_og', 'matriz_data_turno_bk']),
+        PipelineStep('process_employees', process_employees, ['matrizA_bk', 'matriz2_bk'], ['matrizA_bk', 'matriz2_bk', 'logs']),
+        PipelineStep('build_matrizB', build_matrizB, ['matriz2_bk', 'matrizB_ini', 'param_pess_obj'], ['matrizB_bk']),
+        PipelineStep('compute_fest_h', compute_fest_h, ['matriz2_bk', 'matrizA_bk', 'matrizA_bk_og'], ['matrizA_bk']),
+    ]
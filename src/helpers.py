@@ -12,6 +12,7 @@ from typing import List, Dict, Any, Optional, Tuple
 # Local stuff
 from src.oracle_config import ORACLE_CONFIG
 from src.config import PROJECT_NAME
+from src.schedule_matrix import ScheduleMatrix
 from base_data_project.log_config import get_logger
 
 # Set up logger
@@ -24,196 +25,94 @@ def get_oracle_url_cx():
             f"{ORACLE_CONFIG['host']}:{ORACLE_CONFIG['port']}/"
             f"?service_name={ORACLE_CONFIG['service_name']}")
 
-def insert_feriados(df_feriados: pd.DataFrame, reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
+def create_m0_0t(reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
     """
-    Convert R insert_feriados function to Python.
-    Insert holidays into the schedule matrix.
+    Convert R create_M0_0T function to Python.
+    Assign 0 after M shift and before T shift to indicate free periods.
     
     Args:
-        df_feriados: DataFrame with holiday data (columns: data, tipo)
         reshaped_final_3: Schedule matrix DataFrame
         
     Returns:
-        Updated schedule matrix with holidays inserted
+        Updated schedule matrix with 0s for free periods
     """
     try:
-        # Create new row for TIPO_DIA
-        new_row = ['-'] * reshaped_final_3.shape[1]
-        new_row[0] = "TIPO_DIA"
+        # Each date has two columns (M and T), starting at column 1
+        n_pairs = len(range(1, reshaped_final_3.shape[1] - 1, 2))
+        if n_pairs == 0 or len(reshaped_final_3) <= 2:
+            return reshaped_final_3
         
-        # Split matrix into upper and lower parts
-        upper_bind = reshaped_final_3.iloc[[0]].copy()
-        lower_bind = reshaped_final_3.iloc[1:].copy()
+        values = reshaped_final_3.to_numpy(dtype=object, copy=True)
         
-        # Create new row DataFrame
-        new_row_df = pd.DataFrame([new_row], columns=reshaped_final_3.columns)
+        # Employee rows (starting from row 2, index 2), as views over the M and T columns
+        block = values[2:, 1:1 + 2 * n_pairs]
+        morning = block[:, 0::2]
+        afternoon = block[:, 1::2]
         
-        # Combine parts
-        reshaped_final_3 = pd.concat([upper_bind, new_row_df, lower_bind], ignore_index=True)
+        # Masks computed for all employees and dates at once, from the morning slot value
+        morning_str = morning.astype(str)
+        is_m = morning_str == "M"
+        is_t = np.isin(morning_str, ["T", "T1", "T2"])
         
-        # Process each holiday
-        for _, holiday_row in df_feriados.iterrows():
-            temp = str(holiday_row['data'])
-            data = temp[:10]  # Extract date (YYYY-MM-DD format)
-            val = holiday_row['tipo']
-            
-            # Find column indices for this date
-            col_indices = []
-            for col_idx, col_data in reshaped_final_3.items():
-                if data in col_data.values:
-                    col_indices.append(col_idx)
-            
-            if len(col_indices) >= 2:
-                if val == 2:
-                    # Open holiday - mark both shifts as F
-                    reshaped_final_3.iloc[1, col_indices[0]:col_indices[1]+1] = "F"
-                elif val == 3:
-                    # Closed holiday - mark day type and all employees as F
-                    reshaped_final_3.iloc[1, col_indices[0]:col_indices[1]+1] = "F"
-                    reshaped_final_3.iloc[3:, col_indices[0]] = "F"
-                    reshaped_final_3.iloc[3:, col_indices[1]] = "F"
+        # Morning shift - set afternoon to 0
+        afternoon[is_m] = 0
+        # Afternoon/Evening shift - set morning to 0
+        morning[is_t] = 0
         
-        return reshaped_final_3
+        return pd.DataFrame(values, index=reshaped_final_3.index, columns=reshaped_final_3.columns)
         
     except Exception as e:
-        logger.error(f"Error in insert_feriados: {str(e)}")
+        logger.error(f"Error in create_m0_0t: {str(e)}")
         return reshaped_final_3
 
-def insert_closed_days(closed_days: pd.DataFrame, reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
-    """
-    Convert R insert_closedDays function to Python.
-    Insert closed days into the schedule matrix.
-    
-    Args:
-        closed_days: DataFrame with closed day data
-        reshaped_final_3: Schedule matrix DataFrame
-        
-    Returns:
-        Updated schedule matrix with closed days inserted
-    """
-    try:
-        # Process each closed day
-        for _, closed_day_row in closed_days.iterrows():
-            temp = str(closed_day_row.iloc[0])
-            data = temp[:10]  # Extract date (YYYY-MM-DD format)
-            
-            # Find column indices for this date
-            col_indices = []
-            for col_idx, col_data in reshaped_final_3.items():
-                if data in col_data.values:
-                    col_indices.append(col_idx)
-            
-            if len(col_indices) >= 2:
-                # Mark all employees as L (closed) for both shifts
-                reshaped_final_3.iloc[3:, col_indices[0]] = "L"
-                reshaped_final_3.iloc[3:, col_indices[1]] = "L"
-        
-        return reshaped_final_3
-        
-    except Exception as e:
-        logger.error(f"Error in insert_closed_days: {str(e)}")
-        return reshaped_final_3
+# Rotation templates per (seq_turno, semana_1): shift of the first week and the
+# sequence of 14-slot (one week, M and T columns) blocks repeated afterwards
+MT_MTT_CYCLE_TEMPLATES = {
+    ('MT', 'T'): ('T', ['T', 'M']),
+    ('MT', 'T1'): ('T', ['T', 'M']),
+    ('MT', 'M'): ('M', ['T', 'M']),
+    ('MT', 'M1'): ('M', ['T', 'M']),
+    ('MTT', 'M'): ('M', ['T', 'T', 'M']),
+    ('MTT', 'M1'): ('M', ['T', 'T', 'M']),
+    ('MTT', 'T1'): ('T', ['T', 'M', 'T']),
+    ('MTT', 'T2'): ('T', ['M', 'T', 'T']),
+    ('MMT', 'M1'): ('M', ['M', 'T', 'M']),
+    ('MMT', 'M2'): ('M', ['T', 'M', 'M']),
+    ('MMT', 'T'): ('T', ['M', 'M', 'T']),
+    ('MMT', 'T1'): ('T', ['M', 'M', 'T']),
+}
 
-def insert_holidays_absences(employees_tot: List[str], ausencias_total: pd.DataFrame, 
-                           reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
+def build_cycle_template(seq_turno: Any, semana1: Any, n_slots: int, eachrep: int = 14) -> np.ndarray:
     """
-    Convert R insert_holidays_abscences function to Python.
-    Insert holidays (V) and absences (A) into the schedule matrix.
-    
-    Args:
-        employees_tot: List of all employee IDs
-        ausencias_total: DataFrame with absence data
-        reshaped_final_3: Schedule matrix DataFrame
-        
-    Returns:
-        Updated schedule matrix with absences inserted
-    """
-    try:
-        for colab in employees_tot:
-            colab_pad = colab
-            
-            # Filter absences for this employee
-            ausencias = ausencias_total[ausencias_total['matricula'] == colab_pad]
-            
-            if len(ausencias) == 0:
-                continue
-            
-            # Find employee row index
-            row_indices = []
-            for row_idx, row_data in reshaped_final_3.iterrows():
-                if colab in row_data.values:
-                    row_indices.append(row_idx)
-            
-            if not row_indices:
-                continue
-                
-            row_index = row_indices[0]
-            
-            # Process each absence
-            for _, absence_row in ausencias.iterrows():
-                temp = str(absence_row['data_ini'])
-                data = temp[:10]  # Extract date
-                val = absence_row['tipo_ausencia']
-                fk_motivo_ausencia = absence_row['fk_motivo_ausencia']
-                
-                # Find column indices for this date
-                col_indices = []
-                for col_idx, col_data in reshaped_final_3.items():
-                    if data in col_data.values:
-                        col_indices.append(col_idx)
-                
-                if len(col_indices) >= 2:
-                    if fk_motivo_ausencia == 1:
-                        # Vacation
-                        reshaped_final_3.iloc[row_index, col_indices[0]] = "V"
-                        reshaped_final_3.iloc[row_index, col_indices[1]] = "V"
-                    else:
-                        # Other absence
-                        reshaped_final_3.iloc[row_index, col_indices[0]] = val
-                        reshaped_final_3.iloc[row_index, col_indices[1]] = val
-        
-        return reshaped_final_3
-        
-    except Exception as e:
-        logger.error(f"Error in insert_holidays_absences: {str(e)}")
-        return reshaped_final_3
+    Build the periodic shift row of a (seq_turno, semana_1) combination.
 
-def create_m0_0t(reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
-    """
-    Convert R create_M0_0T function to Python.
-    Assign 0 after M shift and before T shift to indicate free periods.
-    
     Args:
-        reshaped_final_3: Schedule matrix DataFrame
-        
+        seq_turno: Shift sequence of the employee (MT, MTT, MMT, ...)
+        semana1: Shift of the first week (M, M1, M2, T, T1, T2)
+        n_slots: Number of date-shift slots of the calendar (columns without the label column)
+        eachrep: Number of slots covered by the first week
+
     Returns:
-        Updated schedule matrix with 0s for free periods
+        Object array with n_slots shift codes; combinations without template repeat seq_turno
     """
-    try:
-        # Iterate through columns in pairs (each date has two columns: M and T)
-        for i in range(1, reshaped_final_3.shape[1] - 1, 2):  # Start from 1, step by 2
-            # Process each employee row (starting from row 2, index 2)
-            for j in range(2, len(reshaped_final_3)):
-                current_val = str(reshaped_final_3.iloc[j, i])
-                
-                if current_val == "M":
-                    # Morning shift - set afternoon to 0
-                    reshaped_final_3.iloc[j, i + 1] = 0
-                elif current_val in ["T", "T1", "T2"]:
-                    # Afternoon/Evening shift - set morning to 0
-                    reshaped_final_3.iloc[j, i] = 0
-        
-        return reshaped_final_3
-        
-    except Exception as e:
-        logger.error(f"Error in create_m0_0t: {str(e)}")
-        return reshaped_final_3
+    template = MT_MTT_CYCLE_TEMPLATES.get((seq_turno, semana1))
+    if template is None:
+        return np.full(n_slots, seq_turno, dtype=object)
+
+    first_week, blocks = template
+    cycle = np.repeat(np.array(blocks, dtype=object), 14)
+    n_cycles = -(-max(n_slots - eachrep, 0) // len(cycle))
+    row = np.concatenate([np.full(eachrep, first_week, dtype=object), np.tile(cycle, n_cycles)])
+    return row[:n_slots]
 
 def create_mt_mtt_cycles(df_alg_variables_filtered: pd.DataFrame, reshaped_final_3: pd.DataFrame) -> pd.DataFrame:
     """
     Convert R create_MT_MTT_cycles function to Python.
     Create MT or MTT cycles according to shift patterns.
     
+    Each distinct (seq_turno, semana_1) combination is generated once from
+    MT_MTT_CYCLE_TEMPLATES and the employee rows are appended in a single block.
+    
     Args:
         df_alg_variables_filtered: DataFrame with employee algorithm variables
         reshaped_final_3: Schedule matrix DataFrame
@@ -228,81 +127,38 @@ def create_mt_mtt_cycles(df_alg_variables_filtered: pd.DataFrame, reshaped_final
         
         # Select required columns
         df_alg_variables_filtered = df_alg_variables_filtered[['emp', 'seq_turno', 'semana_1']].copy()
+        if len(df_alg_variables_filtered) == 0:
+            return reshaped_final_3
+        
+        # Handle missing seq_turno
+        missing_seq = df_alg_variables_filtered['seq_turno'].isna()
+        for emp in df_alg_variables_filtered.loc[missing_seq, 'emp']:
+            logger.warning(f"No seq_turno defined for employee: {emp}")
+        df_alg_variables_filtered['seq_turno'] = df_alg_variables_filtered['seq_turno'].astype(object).where(~missing_seq, "T")
+        
+        # Calculate days in week (simplified - you may need to adjust)
+        if len(reshaped_final_3.columns) > 1:
+            first_date_str = str(reshaped_final_3.iloc[0, 1])
+            eachrep = count_days_in_week(first_date_str) * 2
+        else:
+            eachrep = 14
         
-        for _, emp_row in df_alg_variables_filtered.iterrows():
-            emp = emp_row['emp']
-            seq_turno = emp_row['seq_turno']
-            
-            # Handle missing seq_turno
-            if pd.isna(seq_turno) or seq_turno is None:
-                logger.warning(f"No seq_turno defined for employee: {emp}")
-                seq_turno = "T"
-            
-            semana1 = emp_row['semana_1']
-            
-            # Calculate days in week (simplified - you may need to adjust)
-            if len(reshaped_final_3.columns) > 1:
-                first_date_str = str(reshaped_final_3.iloc[0, 1])
-                eachrep = count_days_in_week(first_date_str) * 2
-            else:
-                eachrep = 14
-            
-            # Generate shift patterns based on seq_turno and semana1
-            if seq_turno == "MT" and semana1 in ["T", "T1"]:
-                new_row = ['T'] * eachrep
-                new_row2 = (['T'] * 14 + ['M'] * 14) * ((reshaped_final_3.shape[1] // 2 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MT" and semana1 in ["M", "M1"]:
-                new_row = ['M'] * eachrep
-                new_row2 = (['T'] * 14 + ['M'] * 14) * ((reshaped_final_3.shape[1] // 2 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MTT" and semana1 in ["M", "M1"]:
-                new_row = ['M'] * eachrep
-                new_row2 = (['T'] * 14 + ['T'] * 14 + ['M'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MTT" and semana1 == "T1":
-                new_row = ['T'] * eachrep
-                new_row2 = (['T'] * 14 + ['M'] * 14 + ['T'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MTT" and semana1 == "T2":
-                new_row = ['T'] * eachrep
-                new_row2 = (['M'] * 14 + ['T'] * 14 + ['T'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MMT" and semana1 == "M1":
-                new_row = ['M'] * eachrep
-                new_row2 = (['M'] * 14 + ['T'] * 14 + ['M'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MMT" and semana1 == "M2":
-                new_row = ['M'] * eachrep
-                new_row2 = (['T'] * 14 + ['M'] * 14 + ['M'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            elif seq_turno == "MMT" and semana1 in ["T", "T1"]:
-                new_row = ['T'] * eachrep
-                new_row2 = (['M'] * 14 + ['M'] * 14 + ['T'] * 14) * ((reshaped_final_3.shape[1] // 3 // 14) + 1)
-                new_row = [emp] + new_row + new_row2
-                
-            else:
-                # Default case
-                new_row = [seq_turno] * reshaped_final_3.shape[1]
-                new_row = [emp] + new_row[1:]
-            
-            # Trim to match matrix width
-            elements_to_drop = len(new_row) - reshaped_final_3.shape[1]
-            if elements_to_drop > 0:
-                new_row = new_row[:len(new_row) - elements_to_drop]
-            elif elements_to_drop < 0:
-                new_row.extend(['-'] * abs(elements_to_drop))
-            
-            # Add row to matrix
-            new_row_df = pd.DataFrame([new_row], columns=reshaped_final_3.columns)
-            reshaped_final_3 = pd.concat([reshaped_final_3, new_row_df], ignore_index=True)
+        # One template per distinct (seq_turno, semana_1), tiled to every employee by index
+        n_slots = max(reshaped_final_3.shape[1] - 1, 0)
+        keys = list(zip(df_alg_variables_filtered['seq_turno'], df_alg_variables_filtered['semana_1']))
+        template_index: Dict[Tuple[Any, Any], int] = {}
+        codes = np.array([template_index.setdefault(key, len(template_index)) for key in keys], dtype=np.int64)
+        templates = np.empty((len(template_index), n_slots), dtype=object)
+        for (seq_turno, semana1), i in template_index.items():
+            templates[i] = build_cycle_template(seq_turno, semana1, n_slots, eachrep)
+        
+        block = np.empty((len(keys), reshaped_final_3.shape[1]), dtype=object)
+        block[:, 0] = df_alg_variables_filtered['emp'].to_numpy(dtype=object)
+        block[:, 1:] = templates[codes]
+        
+        # Add all rows to matrix at once
+        new_rows_df = pd.DataFrame(block, columns=reshaped_final_3.columns)
+        reshaped_final_3 = pd.concat([reshaped_final_3, new_rows_df], ignore_index=True)
         
         # Reset column and row names
         reshaped_final_3.columns = range(reshaped_final_3.shape[1])
@@ -314,54 +170,130 @@ def create_mt_mtt_cycles(df_alg_variables_filtered: pd.DataFrame, reshaped_final
         logger.error(f"Error in create_mt_mtt_cycles: {str(e)}")
         return reshaped_final_3
 
-def assign_days_off(reshaped_final_3: pd.DataFrame, df_daysoff_final: pd.DataFrame) -> pd.DataFrame:
+# Precedence of calendar events when more than one hits the same cell (higher wins)
+EVENT_PRECEDENCE = {
+    'feriado': 10,
+    'closed_day': 20,
+    'ausencia': 30,
+    'day_off': 40,
+}
+
+def build_calendar_events(df_feriados: Optional[pd.DataFrame] = None, closed_days: Optional[pd.DataFrame] = None,
+                          ausencias: Optional[pd.DataFrame] = None, days_off: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
-    Convert R assign_days_off function to Python.
-    Assign days off to employees in the schedule matrix.
+    Build the long events frame consumed by inject_calendar_events.
+    Holidays and closed days target every employee ("ALL"), holidays also mark the TIPO_DIA row,
+    absences and days off target a single employee.
+    
+    Args:
+        df_feriados: DataFrame with holiday data (columns: data, tipo)
+        closed_days: DataFrame with closed day data (date in the first column)
+        ausencias: DataFrame with absence data (columns: matricula, data_ini, tipo_ausencia, fk_motivo_ausencia)
+        days_off: DataFrame with days off data (columns: employee_id, schedule_dt, sched_subtype)
+        
+    Returns:
+        DataFrame with columns matricula, data, codigo, precedencia
+    """
+    columns = ['matricula', 'data', 'codigo', 'precedencia']
+    frames = []
+    
+    if df_feriados is not None and len(df_feriados) > 0:
+        # Open (2) and closed (3) holidays mark the day type, closed ones also every employee
+        hol = df_feriados[df_feriados['tipo'].isin([2, 3])]
+        frames.append(pd.DataFrame({'matricula': 'TIPO_DIA', 'data': hol['data'].values, 'codigo': 'F',
+                                    'precedencia': EVENT_PRECEDENCE['feriado']}))
+        closed_hol = df_feriados[df_feriados['tipo'] == 3]
+        frames.append(pd.DataFrame({'matricula': 'ALL', 'data': closed_hol['data'].values, 'codigo': 'F',
+                                    'precedencia': EVENT_PRECEDENCE['feriado']}))
+    
+    if closed_days is not None and len(closed_days) > 0:
+        frames.append(pd.DataFrame({'matricula': 'ALL', 'data': closed_days.iloc[:, 0].values, 'codigo': 'L',
+                                    'precedencia': EVENT_PRECEDENCE['closed_day']}))
+    
+    if ausencias is not None and len(ausencias) > 0:
+        # Vacation (motivo 1) is V, other absences keep their type
+        codigo = np.where(ausencias['fk_motivo_ausencia'] == 1, 'V', ausencias['tipo_ausencia'])
+        frames.append(pd.DataFrame({'matricula': ausencias['matricula'].values, 'data': ausencias['data_ini'].values,
+                                    'codigo': codigo, 'precedencia': EVENT_PRECEDENCE['ausencia']}))
+    
+    if days_off is not None and len(days_off) > 0:
+        frames.append(pd.DataFrame({'matricula': days_off['employee_id'].astype(str).values,
+                                    'data': days_off['schedule_dt'].values, 'codigo': days_off['sched_subtype'].values,
+                                    'precedencia': EVENT_PRECEDENCE['day_off']}))
+    
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def inject_calendar_events(reshaped_final_3: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scatter a long frame of calendar events into the schedule matrix in one pass.
+    Each event writes its code in both shifts (M and T) of its date. The matricula can be an
+    employee, "ALL" (every employee) or a header row label such as "TIPO_DIA".
+    When several events hit the same cell, the highest precedencia wins and, on ties,
+    the event that comes last in the frame wins (same result as applying them in order).
     
     Args:
         reshaped_final_3: Schedule matrix DataFrame
-        df_daysoff_final: DataFrame with days off data
+        events: DataFrame with columns matricula, data, codigo, precedencia
         
     Returns:
-        Updated schedule matrix with days off assigned
+        Updated schedule matrix with the events inserted
     """
     try:
-        emps = df_daysoff_final['employee_id'].unique()
-        
-        for emp in emps:
-            df_daysoff = df_daysoff_final[df_daysoff_final['employee_id'] == emp]
-            
-            for _, dayoff_row in df_daysoff.iterrows():
-                date_temp = str(dayoff_row['schedule_dt'])
-                date = date_temp[:10]
-                val = dayoff_row['sched_subtype']
-                
-                # Find employee row index
-                row_indices = []
-                for row_idx, row_data in reshaped_final_3.iterrows():
-                    if str(emp) in row_data.values:
-                        row_indices.append(row_idx)
-                
-                if not row_indices:
-                    continue
-                    
-                row_index = row_indices[0]
-                
-                # Find column indices for this date
-                col_indices = []
-                for col_idx, col_data in reshaped_final_3.items():
-                    if date in col_data.values:
-                        col_indices.append(col_idx)
-                
-                if len(col_indices) >= 2:
-                    reshaped_final_3.iloc[row_index, col_indices[0]] = val
-                    reshaped_final_3.iloc[row_index, col_indices[1]] = val
-        
-        return reshaped_final_3
+        if len(events) == 0:
+            return reshaped_final_3
+        
+        matrix = ScheduleMatrix.from_frame(reshaped_final_3)
+        
+        # Resolve the date of every event to its (M, T) slot pair
+        ev = pd.DataFrame({
+            'matricula': events['matricula'].values,
+            'codigo': events['codigo'].values,
+            'precedencia': events['precedencia'].values,
+            'ordem': np.arange(len(events)),
+        })
+        ev['slot_m'], ev['slot_t'] = matrix.slot_pairs_of(events['data'])
+        ev = ev[ev['slot_m'] >= 0]
+        
+        # Winner per target: highest precedencia, last in frame order on ties
+        ev = ev.sort_values(['precedencia', 'ordem'], kind='stable')
+        
+        is_header = ev['matricula'].isin(list(matrix.headers.keys()))
+        is_all = ev['matricula'] == 'ALL'
+        
+        # Header rows (e.g. TIPO_DIA)
+        header_ev = ev[is_header].drop_duplicates(['matricula', 'slot_m'], keep='last')
+        for label, group in header_ev.groupby('matricula', sort=False):
+            matrix.headers[label][group['slot_m'].values] = group['codigo'].values
+            matrix.headers[label][group['slot_t'].values] = group['codigo'].values
+        
+        # Events for every employee write whole columns
+        all_ev = ev[is_all].drop_duplicates('slot_m', keep='last')
+        matrix.values[:, all_ev['slot_m'].values] = all_ev['codigo'].values
+        matrix.values[:, all_ev['slot_t'].values] = all_ev['codigo'].values
+        
+        # Employee events only win over an "ALL" event of the same day if they rank higher
+        emp_ev = ev[~is_header & ~is_all].copy()
+        emp_ev['row'] = matrix.rows_of(emp_ev['matricula'])
+        emp_ev = emp_ev[emp_ev['row'] >= 0].drop_duplicates(['row', 'slot_m'], keep='last')
+        
+        all_rank = all_ev.set_index('slot_m')[['precedencia', 'ordem']]
+        emp_ev = emp_ev.join(all_rank, on='slot_m', rsuffix='_all')
+        wins = (emp_ev['precedencia_all'].isna() |
+                (emp_ev['precedencia'] > emp_ev['precedencia_all']) |
+                ((emp_ev['precedencia'] == emp_ev['precedencia_all']) & (emp_ev['ordem'] > emp_ev['ordem_all'])))
+        emp_ev = emp_ev[wins]
+        
+        rows = emp_ev['row'].values
+        matrix.values[rows, emp_ev['slot_m'].values] = emp_ev['codigo'].values
+        matrix.values[rows, emp_ev['slot_t'].values] = emp_ev['codigo'].values
+        
+        return matrix.to_frame()
         
     except Exception as e:
-        logger.error(f"Error in assign_days_off: {str(e)}")
+        logger.error(f"Error in inject_calendar_events: {str(e)}")
         return reshaped_final_3
 
 def assign_empty_days(df_tipo_contrato: pd.DataFrame, reshaped_final_3: pd.DataFrame,
@@ -380,78 +312,135 @@ def assign_empty_days(df_tipo_contrato: pd.DataFrame, reshaped_final_3: pd.DataF
         Updated schedule matrix with empty days assigned
     """
     try:
-        weekday_contrato2 = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        weekday_contrato3 = ['Monday', 'Tuesday', 'Wednesday', 'Thursday']
+        # Weekdays (Monday = 0) on which each contract type has no work assigned
+        weekday_contrato2 = [0, 1, 2, 3, 4]
+        weekday_contrato3 = [0, 1, 2, 3]
         absence_types = ['A', 'AP', 'V']
         
-        for emp in not_in_pre_ger:
-            # Get contract type for this employee
-            emp_contract = df_tipo_contrato[df_tipo_contrato['emp'] == emp]
-            if len(emp_contract) == 0:
+        # Hash index of the employee rows
+        matrix = ScheduleMatrix.from_frame(reshaped_final_3)
+        
+        # Contract type and matrix row of each employee (first match of each)
+        contract_by_emp = df_tipo_contrato.drop_duplicates('emp').set_index('emp')['tipo_contrato']
+        rows, contracts = [], []
+        for emp in dict.fromkeys(not_in_pre_ger):
+            if emp not in contract_by_emp.index:
                 continue
-                
-            tipo_de_contrato = emp_contract['tipo_contrato'].iloc[0]
+            tipo_de_contrato = contract_by_emp[emp]
             
             logger.info(f"Colab: {emp}, Tipo de Contrato: {tipo_de_contrato}")
             
-            # Find employee row index
-            row_indices = []
-            for row_idx, row_data in reshaped_final_3.iterrows():
-                if emp in row_data.values:
-                    row_indices.append(row_idx)
-            
-            if not row_indices:
-                continue
-                
-            row_index = row_indices[0]
-            
-            # Skip if contract type is 6
-            if tipo_de_contrato == 6:
-                logger.info("Tipo de contrato = 6, do nothing, next emp (loop)")
+            matrix_row = matrix.row_of(emp)
+            if matrix_row is None or tipo_de_contrato == 6:
                 continue
-            
-            # Process each date column (step by 2 for M/T pairs)
-            for i in range(1, reshaped_final_3.shape[1] - 1, 2):
-                date_temp = str(reshaped_final_3.iloc[0, i])
-                date = date_temp[:10]
-                
-                try:
-                    weekday = pd.to_datetime(date).day_name()
-                    type_of_day = str(reshaped_final_3.iloc[0, i])
-                    
-                    # Check holiday type
-                    holiday_matches = df_feriados_filtered[
-                        df_feriados_filtered['data'] == pd.to_datetime(type_of_day)
-                    ]
-                    type_of_hol = holiday_matches['tipo'].iloc[0] if len(holiday_matches) > 0 else '-'
-                    
-                    assigned_value = str(reshaped_final_3.iloc[row_index, i])
-                    
-                    # Apply contract type rules
-                    if type_of_hol == 3:
-                        # Closed holiday
-                        reshaped_final_3.iloc[row_index, i:i+2] = 'F'
-                    elif (tipo_de_contrato == 3 and 
-                          weekday in weekday_contrato3 and 
-                          type_of_hol != 2 and 
-                          assigned_value not in absence_types):
-                        reshaped_final_3.iloc[row_index, i:i+2] = '-'
-                    elif (tipo_de_contrato == 2 and 
-                          weekday in weekday_contrato2 and 
-                          type_of_hol != 2 and 
-                          assigned_value not in absence_types):
-                        reshaped_final_3.iloc[row_index, i:i+2] = '-'
-                        
-                except Exception as date_error:
-                    logger.warning(f"Error processing date {date}: {str(date_error)}")
-                    continue
-        
-        return reshaped_final_3
+            rows.append(matrix_row)
+            contracts.append(tipo_de_contrato)
+        
+        # M slot of each date (M/T pairs), weekday and holiday type vectors computed once for the horizon
+        m_slots = np.arange(0, reshaped_final_3.shape[1] - 2, 2)
+        if len(rows) == 0 or len(m_slots) == 0:
+            return reshaped_final_3
+        
+        dates = pd.to_datetime(pd.Series(matrix.headers['Dia'][m_slots]).astype(str).str[:10], errors='coerce')
+        weekday = dates.dt.dayofweek.to_numpy()
+        if len(df_feriados_filtered) > 0:
+            holidays = df_feriados_filtered.assign(data=pd.to_datetime(df_feriados_filtered['data'])).drop_duplicates('data')
+            type_of_hol = dates.map(holidays.set_index('data')['tipo']).to_numpy(dtype=object)
+        else:
+            type_of_hol = np.full(len(m_slots), '-', dtype=object)
+        closed_holiday = type_of_hol == 3
+        open_day = ~closed_holiday & (type_of_hol != 2)
+        
+        rows = np.array(rows, dtype=np.int64)
+        contracts = np.array(contracts, dtype=object)
+        assigned = matrix.values[np.ix_(rows, m_slots)].astype(str)
+        not_absent = ~np.isin(assigned, absence_types)
+        
+        # Contract type rules: closed holidays first, then the contract weekday masks
+        empty_mask = np.zeros(assigned.shape, dtype=bool)
+        for tipo_de_contrato, weekdays in ((2, weekday_contrato2), (3, weekday_contrato3)):
+            day_mask = np.isin(weekday, weekdays) & open_day
+            empty_mask |= (contracts == tipo_de_contrato)[:, None] & day_mask[None, :] & not_absent
+        closed_mask = np.broadcast_to(closed_holiday, assigned.shape)
+        
+        # Single masked assignment to both shift slots
+        row_idx, pair_idx = np.nonzero(closed_mask | empty_mask)
+        values = np.where(closed_mask[row_idx, pair_idx], 'F', '-').astype(object)
+        matrix.values[rows[row_idx], m_slots[pair_idx]] = values
+        matrix.values[rows[row_idx], m_slots[pair_idx] + 1] = values
+        
+        return matrix.to_frame()
         
     except Exception as e:
         logger.error(f"Error in assign_empty_days: {str(e)}")
         return reshaped_final_3
 
+# Ordered TRADS code rules: the first rule whose conditions all hold gives the code.
+# Each condition maps a column to an allowed value or a tuple of allowed values (None matches missing values).
+TRADS_CODE_RULES = [
+    ({'tipo_dia': 'F', 'dia_semana': (1, 8)}, 'L_DOM'),
+    ({'tipo_dia': 'F'}, 'L'),
+    ({'tipo_dia': 'A', 'descanso': 'A', 'horario_ind': 'N'}, 'MoT'),
+    ({'tipo_dia': 'A', 'descanso': 'A', 'horario_ind': 'S', 'exit_after_morning': True}, 'T'),
+    ({'tipo_dia': 'A', 'descanso': 'A', 'horario_ind': 'S', 'exit_before_morning': True}, 'M'),
+    ({'tipo_dia': 'S'}, '-'),
+    ({'tipo_dia': 'A', 'descanso': ('R', 'N'), 'interval_ge_1h': True}, 'P'),
+    ({'tipo_dia': 'A', 'descanso': ('R', 'N'), 'interval_lt_1h': True, 'exit_after_morning': True}, 'T'),
+    ({'tipo_dia': 'A', 'descanso': ('R', 'N'), 'interval_lt_1h': True, 'exit_before_morning': True}, 'M'),
+    ({'tipo_dia': 'A', 'descanso': 'A', 'horario_ind': 'Y', 'interval_lt_1h': True, 'exit_after_morning': True}, 'T'),
+    ({'tipo_dia': 'A', 'descanso': 'A', 'horario_ind': 'Y', 'interval_lt_1h': True, 'exit_before_morning': True}, 'M'),
+    ({'tipo_dia': 'N'}, 'NL'),
+]
+
+# WFM (type, subtype) to TRADS code rules, evaluated the same way as TRADS_CODE_RULES
+WFM_TYPE_RULES = [
+    ({'type': 'T', 'subtype': 'M'}, 'M'),
+    ({'type': 'T', 'subtype': 'T'}, 'T'),
+    ({'type': 'T', 'subtype': 'H'}, 'MoT'),
+    ({'type': 'T', 'subtype': 'P'}, 'P'),
+    ({'type': 'F', 'subtype': None}, 'L'),
+    ({'type': 'F', 'subtype': 'D'}, 'LD'),
+    ({'type': 'F', 'subtype': 'Q'}, 'LQ'),
+    ({'type': 'F', 'subtype': 'C'}, 'C'),
+    ({'type': 'R', 'subtype': None}, 'F'),
+    ({'type': 'N', 'subtype': None}, '-'),
+    ({'type': 'T', 'subtype': 'A'}, 'V'),
+]
+
+def apply_code_rules(df: pd.DataFrame, rules: List[Tuple[Dict[str, Any], str]], default: str = '-') -> np.ndarray:
+    """
+    Evaluate an ordered rule table over all rows at once.
+    
+    Args:
+        df: DataFrame with the columns referenced by the rules (missing columns never match a value)
+        rules: Ordered list of (conditions, code) pairs
+        default: Code for rows that match no rule
+        
+    Returns:
+        Array with the code of each row
+    """
+    def matches(column: str, allowed: Any) -> np.ndarray:
+        if column not in df.columns:
+            series = pd.Series([None] * len(df), index=df.index, dtype=object)
+        else:
+            series = df[column]
+        allowed = allowed if isinstance(allowed, tuple) else (allowed,)
+        values = [value for value in allowed if value is not None]
+        mask = series.isin(values).to_numpy() if values else np.zeros(len(df), dtype=bool)
+        if len(values) < len(allowed):
+            mask |= series.isna().to_numpy()
+        return mask
+    
+    conditions = []
+    for rule_conditions, _ in rules:
+        mask = np.ones(len(df), dtype=bool)
+        for column, allowed in rule_conditions.items():
+            mask &= matches(column, allowed)
+        conditions.append(mask)
+    
+    codes = [code for _, code in rules]
+    return np.select(conditions, codes, default=default).astype(object)
+
 def add_trads_code(df_cycle90_info_filtered: pd.DataFrame, lim_sup_manha: str, lim_inf_tarde: str) -> pd.DataFrame:
     """
     Convert R add_trads_code function to Python.
@@ -489,43 +478,18 @@ def add_trads_code(df_cycle90_info_filtered: pd.DataFrame, lim_sup_manha: str, l
             pd.Timedelta(minutes=15)
         )
         
+        # Comparison flags used by the rules (missing values fail both sides of each comparison)
+        intervalo = df_cycle90_info_filtered['intervalo']
+        max_exit = df_cycle90_info_filtered['max_exit']
+        rule_inputs = df_cycle90_info_filtered[['tipo_dia', 'descanso', 'horario_ind', 'dia_semana']].assign(
+            interval_ge_1h=intervalo >= 1,
+            interval_lt_1h=intervalo < 1,
+            exit_after_morning=max_exit >= lim_sup_manha,
+            exit_before_morning=max_exit < lim_sup_manha,
+        )
+        
         # Apply TRADS code logic
-        def get_trads_code(row):
-            tipo_dia = row['tipo_dia']
-            descanso = row['descanso']
-            horario_ind = row['horario_ind']
-            dia_semana = row['dia_semana']
-            intervalo = row['intervalo']
-            max_exit = row['max_exit']
-            
-            if tipo_dia == 'F' and (dia_semana == 1 or dia_semana == 8):
-                return 'L_DOM'
-            elif tipo_dia == 'F':
-                return 'L'
-            elif tipo_dia == 'A' and descanso == 'A' and horario_ind == 'N':
-                return 'MoT'
-            elif tipo_dia == 'A' and descanso == 'A' and horario_ind == 'S' and max_exit >= lim_sup_manha:
-                return 'T'
-            elif tipo_dia == 'A' and descanso == 'A' and horario_ind == 'S' and max_exit < lim_sup_manha:
-                return 'M'
-            elif tipo_dia == 'S':
-                return '-'
-            elif tipo_dia == 'A' and (descanso == 'R' or descanso == 'N') and intervalo >= 1:
-                return 'P'
-            elif tipo_dia == 'A' and (descanso == 'R' or descanso == 'N') and intervalo < 1 and max_exit >= lim_sup_manha:
-                return 'T'
-            elif tipo_dia == 'A' and (descanso == 'R' or descanso == 'N') and intervalo < 1 and max_exit < lim_sup_manha:
-                return 'M'
-            elif tipo_dia == 'A' and descanso == 'A' and horario_ind == 'Y' and intervalo < 1 and max_exit >= lim_sup_manha:
-                return 'T'
-            elif tipo_dia == 'A' and descanso == 'A' and horario_ind == 'Y' and intervalo < 1 and max_exit < lim_sup_manha:
-                return 'M'
-            elif tipo_dia == 'N':
-                return 'NL'
-            else:
-                return '-'
-        
-        df_cycle90_info_filtered['codigo_trads'] = df_cycle90_info_filtered.apply(get_trads_code, axis=1)
+        df_cycle90_info_filtered['codigo_trads'] = apply_code_rules(rule_inputs, TRADS_CODE_RULES)
         
         return df_cycle90_info_filtered
         
@@ -533,70 +497,73 @@ def add_trads_code(df_cycle90_info_filtered: pd.DataFrame, lim_sup_manha: str, l
         logger.error(f"Error in add_trads_code: {str(e)}")
         return df_cycle90_info_filtered
 
-def assign_90_cycles(reshaped_final_3: pd.DataFrame, df_cycle90_info_filtered: pd.DataFrame,
-                    colab: int, matriz_festivos: pd.DataFrame, lim_sup_manha: str, lim_inf_tarde: str,
-                    day: str, reshaped_col_index: int, reshaped_row_index: int, matricula: str) -> pd.DataFrame:
+def assign_90_cycles(reshaped_final_3: pd.DataFrame, cycle90_info: pd.DataFrame, df_colaborador: pd.DataFrame,
+                     start_date: str, end_date: str) -> Tuple[pd.DataFrame, List[str]]:
     """
     Convert R assign_90_cycles function to Python.
-    Assign 90-day cycles to the schedule matrix.
+    Assign the 90-day cycles of all CICLO employees to the schedule matrix.
+    
+    The TRADS codes are computed once per employee, the cycle days are joined to the
+    calendar (M, T) slots through the date index and all employee rows are appended
+    to the matrix in a single block.
     
     Args:
         reshaped_final_3: Schedule matrix DataFrame
-        df_cycle90_info_filtered: Filtered 90-day cycle information
-        colab: Employee ID
-        matriz_festivos: Holiday matrix
-        lim_sup_manha: Morning limit time
-        lim_inf_tarde: Afternoon limit time
-        day: Current day string
-        reshaped_col_index: Column index in matrix
-        reshaped_row_index: Row index in matrix
-        matricula: Employee matricula
+        cycle90_info: 90-day cycle information for all CICLO employees (one row per employee and day)
+        df_colaborador: DataFrame with employee data, used for the morning/afternoon limits
+        start_date: Start date of the schedule
+        end_date: End date of the schedule
         
     Returns:
-        Updated schedule matrix with 90-day cycles assigned
+        Tuple with the updated schedule matrix and the matriculas of the employees with 90-day cycles
+        (empty if the cycles could not be assigned)
     """
+    matriculas_90_cycles = []
     try:
-        # Convert time limits
-        lim_sup_manha = f"2000-01-01 {lim_sup_manha}"
-        lim_sup_manha = pd.to_datetime(lim_sup_manha, format="%Y-%m-%d %H:%M")
-        lim_inf_tarde = f"2000-01-01 {lim_inf_tarde}"
-        lim_inf_tarde = pd.to_datetime(lim_inf_tarde, format="%Y-%m-%d %H:%M")
-        
-        # Add TRADS codes
-        df_cycle90_info_filtered = add_trads_code(df_cycle90_info_filtered, 
-                                                 lim_sup_manha.strftime("%Y-%m-%d %H:%M:%S"), 
-                                                 lim_inf_tarde.strftime("%Y-%m-%d %H:%M:%S"))
-        
-        # Reset row names
-        reshaped_final_3.reset_index(drop=True, inplace=True)
-        
-        # Get holidays as list of strings
-        festivos = [str(date) for date in matriz_festivos['data']]
-        
-        # Process the specific day range
-        if isinstance(reshaped_col_index, list) and len(reshaped_col_index) >= 2:
-            col_range = range(reshaped_col_index[0], reshaped_col_index[1] + 1)
-        else:
-            col_range = [reshaped_col_index]
-        
-        for k in col_range:
-            day_number = pd.to_datetime(day).weekday() + 1  # Convert to 1-7 format
+        cycle90_info = cycle90_info[
+            (cycle90_info['schedule_day'] >= pd.to_datetime(start_date)) &
+            (cycle90_info['schedule_day'] <= pd.to_datetime(end_date))
+        ]
+        if len(cycle90_info) == 0:
+            return reshaped_final_3, matriculas_90_cycles
+        
+        matrix = ScheduleMatrix.from_frame(reshaped_final_3)
+        block = np.full((cycle90_info['employee_id'].nunique(), matrix.n_slots), '-', dtype=object)
+        
+        for row, (colab, df_cycle90_info_filtered) in enumerate(cycle90_info.groupby('employee_id', sort=False)):
+            matricula = df_cycle90_info_filtered['matricula'].iloc[0]
+            matriculas_90_cycles.append(matricula)
             
-            # Find matching cycle row for this day
-            cycle_rows = df_cycle90_info_filtered[
-                df_cycle90_info_filtered.apply(lambda row: day in str(row).values, axis=1)
-            ]
+            lim_sup_manha, lim_inf_tarde = get_limit_mt(matricula, df_colaborador)
+            try:
+                # Convert time limits
+                lim_sup_manha = pd.to_datetime(f"2000-01-01 {lim_sup_manha}", format="%Y-%m-%d %H:%M")
+                lim_inf_tarde = pd.to_datetime(f"2000-01-01 {lim_inf_tarde}", format="%Y-%m-%d %H:%M")
+            except Exception as e:
+                logger.error(f"Error in assign_90_cycles for employee {colab}: {str(e)}")
+                continue
             
-            if len(cycle_rows) > 0:
-                cycle_row = cycle_rows.iloc[0]
-                val = cycle_row.get('codigo_trads', '-')
-                reshaped_final_3.iloc[reshaped_row_index, k] = val
+            # Add TRADS codes
+            df_cycle90_info_filtered = add_trads_code(df_cycle90_info_filtered.copy(),
+                                                      lim_sup_manha.strftime("%Y-%m-%d %H:%M:%S"),
+                                                      lim_inf_tarde.strftime("%Y-%m-%d %H:%M:%S"))
+            if 'codigo_trads' not in df_cycle90_info_filtered.columns:
+                continue
+            
+            # Scatter the codes of the days present in the calendar to both shift slots
+            slots_m, slots_t = matrix.slot_pairs_of(df_cycle90_info_filtered['schedule_day'])
+            found = slots_m >= 0
+            codes = df_cycle90_info_filtered['codigo_trads'].to_numpy(dtype=object)[found]
+            block[row, slots_m[found]] = codes
+            block[row, slots_t[found]] = codes
         
-        return reshaped_final_3
+        matrix.append_rows(matriculas_90_cycles, block)
+        return matrix.to_frame(), matriculas_90_cycles
         
     except Exception as e:
         logger.error(f"Error in assign_90_cycles: {str(e)}")
-        return reshaped_final_3
+        # No cycle rows were added, so no employee is excluded from the MT/MTT rotations
+        return reshaped_final_3, []
 
 def load_pre_ger_scheds(df_pre_ger: pd.DataFrame, employees_tot: List[str]) -> Tuple[pd.DataFrame, List[str]]:
     """
@@ -625,57 +592,27 @@ def load_pre_ger_scheds(df_pre_ger: pd.DataFrame, employees_tot: List[str]) -> T
             df_pre_ger['ind'] == 'P'
         ].drop('ind', axis=1)
         
-        # Pivot wider
-        reshaped = df_pre_ger_filtered.pivot_table(
-            index='employee_id', 
-            columns='schedule_dt', 
-            values='sched_subtype', 
-            aggfunc='first'
-        ).reset_index()
-        
-        # Create column names row
-        column_names = pd.DataFrame([reshaped.columns.tolist()], columns=reshaped.columns)
-        column_names.iloc[0, 0] = "Dia"
-        
-        # Convert employee_id to string
-        reshaped['employee_id'] = reshaped['employee_id'].astype(str)
+        # First non-missing code of each (employee, day), as in a pivot with aggfunc='first'
+        df_pre_ger_filtered = df_pre_ger_filtered.dropna(subset=['employee_id', 'schedule_dt', 'sched_subtype'])
+        row_codes, employees = pd.factorize(df_pre_ger_filtered['employee_id'], sort=True)
+        day_codes, days = pd.factorize(df_pre_ger_filtered['schedule_dt'], sort=True)
+        first = ~pd.Series(row_codes * len(days) + day_codes).duplicated().to_numpy()
         
-        # Combine column names with data
-        reshaped_names = pd.concat([column_names, reshaped], ignore_index=True)
+        # Pivot straight into the M/T pair layout: label column, then two slots per day
+        n_rows = len(employees) + 2
+        reshaped_final_3 = np.full((n_rows, 2 * len(days) + 1), np.nan, dtype=object)
+        reshaped_final_3[0, 0] = "Dia"
+        reshaped_final_3[0, 1:] = np.repeat(np.asarray(days, dtype=object), 2)
+        reshaped_final_3[1, 0] = "TURNO"
+        reshaped_final_3[1, 1:] = np.tile(np.array(['M', 'T'], dtype=object), len(days))
+        reshaped_final_3[2:, 0] = [str(emp) for emp in employees]
         
-        # Duplicate columns to get M/T shifts
-        first_col = reshaped_names.iloc[:, [0]]
-        last_cols = reshaped_names.iloc[:, 1:]
+        values = df_pre_ger_filtered['sched_subtype'].to_numpy(dtype=object)[first]
+        rows = row_codes[first] + 2
+        reshaped_final_3[rows, 2 * day_codes[first] + 1] = values
+        reshaped_final_3[rows, 2 * day_codes[first] + 2] = values
         
-        # Duplicate last columns
-        duplicated_cols = pd.concat([last_cols, last_cols], axis=1)
-        
-        # Sort columns by name
-        duplicated_cols = duplicated_cols.reindex(sorted(duplicated_cols.columns), axis=1)
-        
-        # Combine first column with duplicated columns
-        reshaped_final = pd.concat([first_col, duplicated_cols], axis=1)
-        
-        # Reset column and row names
-        reshaped_final.columns = range(reshaped_final.shape[1])
-        reshaped_final.reset_index(drop=True, inplace=True)
-        
-        # Create TURNO row
-        new_row = ['M' if i % 2 == 1 else 'T' for i in range(reshaped_final.shape[1])]
-        new_row[0] = "TURNO"
-        
-        # Trim to match matrix width
-        elements_to_drop = len(new_row) - reshaped_final.shape[1]
-        if elements_to_drop > 0:
-            new_row = new_row[:len(new_row) - elements_to_drop]
-        
-        # Combine first row, TURNO row, and remaining rows
-        reshaped_final_1 = reshaped_final.iloc[[0]]
-        new_row_df = pd.DataFrame([new_row], columns=reshaped_final.columns)
-        reshaped_final_2 = reshaped_final.iloc[1:]
-        
-        reshaped_final_3 = pd.concat([reshaped_final_1, new_row_df, reshaped_final_2], ignore_index=True)
-        reshaped_final_3.columns = range(reshaped_final_3.shape[1])
+        reshaped_final_3 = pd.DataFrame(reshaped_final_3, columns=range(reshaped_final_3.shape[1]))
         
         return reshaped_final_3, emp_pre_ger
         
@@ -722,9 +659,8 @@ def load_wfm_scheds(df_pre_ger: pd.DataFrame, employees_tot_pad: List[str]) -> T
         df_pre_ger['sched_subtype'] = df_pre_ger['sched_subtype'].fillna('-')
         
         # Count days off
-        df_count = df_pre_ger.groupby('employee_id')['sched_subtype'].apply(
-            lambda x: (x.isin(['L', 'LD', 'LQ', 'F', 'V', '-'])).sum()
-        ).reset_index(name='days_off_count')
+        days_off = df_pre_ger['sched_subtype'].isin(['L', 'LD', 'LQ', 'F', 'V', '-'])
+        df_count = days_off.groupby(df_pre_ger['employee_id']).sum().reset_index(name='days_off_count')
         
         # Use the same reshaping logic as load_pre_ger_scheds
         reshaped_final_3, _ = load_pre_ger_scheds(df_pre_ger, employees_tot_pad)
@@ -736,16 +672,8 @@ def load_wfm_scheds(df_pre_ger: pd.DataFrame, employees_tot_pad: List[str]) -> T
         return pd.DataFrame(), [], pd.DataFrame()
 
 def convert_types_in(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert WFM types to TRADS - simple mapping."""
-    type_map = {
-        ('T', 'M'): 'M', ('T', 'T'): 'T', ('T', 'H'): 'MoT', ('T', 'P'): 'P',
-        ('F', None): 'L', ('F', 'D'): 'LD', ('F', 'Q'): 'LQ', ('F', 'C'): 'C',
-        ('R', None): 'F', ('N', None): '-', ('T', 'A'): 'V'
-    }
-    
-    df['sched_subtype'] = df.apply(
-        lambda row: type_map.get((row.get('type'), row.get('subtype')), '-'), axis=1
-    )
+    """Convert WFM types to TRADS - rule table mapping (see WFM_TYPE_RULES)."""
+    df['sched_subtype'] = apply_code_rules(df, WFM_TYPE_RULES)
     df['ind'] = 'P'
     return df
 
@@ -1020,28 +948,33 @@ def count_open_holidays(matriz_festivos: pd.DataFrame, tipo_contrato: int) -> Li
     
 
 def func_turnos(matriz2, tipo):
-    """Helper function to process specific shift types (MoT, P, etc.)."""
-    # Filter rows that match 'tipo' and update TIPO_TURNO
-    matriz2_filtered = matriz2[matriz2['TIPO_TURNO'] == tipo].copy()
-    
-    if len(matriz2_filtered) > 0:
-        # Group by COLABORADOR and DATA, then assign M/T based on row number
-        def assign_shift_type(group):
-            group = group.copy()
-            group.loc[group.index[0], 'TIPO_TURNO'] = 'M'  # First row becomes 'M'
-            if len(group) > 1:
-                group.loc[group.index[1], 'TIPO_TURNO'] = 'T'  # Second row becomes 'T'
-            return group
-        
-        matriz2_filtered = (matriz2_filtered
-                           .groupby(['COLABORADOR', 'DATA'])
-                           .apply(assign_shift_type)
-                           .reset_index(drop=True))
-    
-    # Combine the filtered and updated data with the rest of the data
-    matriz2_rest = matriz2[matriz2['TIPO_TURNO'] != tipo].copy()
-    result = pd.concat([matriz2_rest, matriz2_filtered], ignore_index=True)
-    
+    """
+    Helper function to process specific shift types (MoT, P, etc.).
+
+    Within each (COLABORADOR, DATA) the first row with TIPO_TURNO == tipo becomes 'M'
+    and the second 'T' (position from cumcount, so no per-group copies), keeping the
+    original row order.
+
+    Args:
+        matriz2: Long calendar with COLABORADOR, DATA and TIPO_TURNO columns
+        tipo: Shift type to split into M/T
+
+    Returns:
+        Copy of matriz2 with the relabelled TIPO_TURNO and a fresh RangeIndex
+    """
+    result = matriz2.reset_index(drop=True)
+    tipo_rows = np.flatnonzero((result['TIPO_TURNO'] == tipo).to_numpy())
+
+    if len(tipo_rows) > 0:
+        # Ordinal position of each row inside its (COLABORADOR, DATA) group
+        position = (result.iloc[tipo_rows]
+                    .groupby(['COLABORADOR', 'DATA'], sort=False)
+                    .cumcount()
+                    .to_numpy())
+        tipo_turno = result.columns.get_loc('TIPO_TURNO')
+        result.iloc[tipo_rows[position == 0], tipo_turno] = 'M'  # First row becomes 'M'
+        result.iloc[tipo_rows[position == 1], tipo_turno] = 'T'  # Second row becomes 'T'
+
     return result
 
 def adjusted_isoweek(date):
@@ -1057,6 +990,36 @@ def adjusted_isoweek(date):
         return 53
     return week
 
+def adjusted_isoweeks(dates: Any) -> Any:
+    """
+    Vectorized adjusted_isoweek: ISO week of each date, with week 1 dates in December as week 53.
+
+    Each distinct date is computed once and broadcast back, so repeated dates (one per employee
+    and shift in matriz2) cost nothing extra.
+
+    Args:
+        dates: Series or array-like of dates
+
+    Returns:
+        int64 Series (same index) if `dates` is a Series, otherwise an int64 array
+        (float with NaN where a date is missing)
+    """
+    values = pd.to_datetime(dates)
+    codes, uniques = pd.factorize(values)
+    uniques = pd.DatetimeIndex(uniques)
+
+    weeks = uniques.isocalendar()['week'].to_numpy(dtype=np.int64)
+    weeks[(weeks == 1) & (uniques.month == 12)] = 53
+
+    result = weeks[codes] if len(weeks) > 0 else np.zeros(len(codes), dtype=np.int64)
+    if (codes < 0).any():
+        result = result.astype(float)
+        result[codes < 0] = np.nan
+
+    if isinstance(dates, pd.Series):
+        return pd.Series(result, index=dates.index, name=dates.name)
+    return result
+
 def custom_round(x):
     """Custom rounding function."""
     import math
@@ -1114,4 +1077,152 @@ def calcular_folgas3(semana_df):
     
     l_dom = max(len(feriados) - 2, 0) if len(feriados) > 0 else 0
     
-    return pd.DataFrame({'L_RES': [l_res], 'L_DOM': [l_dom]})
\ No newline at end of file
+    return pd.DataFrame({'L_RES': [l_res], 'L_DOM': [l_dom]})
+
+def calcular_folgas_semanas(dias_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate folgas for every week of every 2/3-day contract employee at once.
+
+    Grouped equivalent of calling calcular_folgas2 (tipo_contrato 2) or calcular_folgas3
+    (otherwise) on each (COLABORADOR, WW) slice.
+
+    Args:
+        dias_df: One row per employee and day with COLABORADOR, WW, WDAY, HORARIO, DIA_TIPO
+            and tipo_contrato columns
+
+    Returns:
+        DataFrame with COLABORADOR, WW, L_RES and L_DOM per employee week
+    """
+    horario = dias_df['HORARIO']
+    not_wday1 = (dias_df['WDAY'] != 1).to_numpy()
+    dom_fes = (dias_df['DIA_TIPO'] == 'domYf').to_numpy()
+    h_out = horario.isin(['H', 'OUT']).to_numpy()
+    h_out_nl3d = horario.isin(['H', 'OUT', 'NL3D']).to_numpy()
+
+    # Per-day flags, counted per employee week
+    weeks = pd.DataFrame({
+        'COLABORADOR': dias_df['COLABORADOR'].to_numpy(),
+        'WW': dias_df['WW'].to_numpy(),
+        'tipo_contrato': dias_df['tipo_contrato'].to_numpy(),
+        # 2-day contracts
+        'feriados_h': not_wday1 & h_out & dom_fes,
+        'wday7_h': not_wday1 & h_out & (dias_df['WDAY'] == 7).to_numpy() & (horario == 'H').to_numpy() & ~dom_fes,
+        # 3-day contracts
+        'semana_h': h_out_nl3d,
+        'dias_h': not_wday1 & h_out_nl3d & ~dom_fes,
+        'feriados': not_wday1 & dom_fes,
+    }).groupby(['COLABORADOR', 'WW'], sort=False).agg(
+        tipo_contrato=('tipo_contrato', 'first'),
+        feriados_h=('feriados_h', 'sum'),
+        wday7_h=('wday7_h', 'sum'),
+        semana_h=('semana_h', 'sum'),
+        dias_h=('dias_h', 'sum'),
+        feriados=('feriados', 'sum'),
+    )
+
+    is_2d = (weeks['tipo_contrato'] == 2).to_numpy()
+    has_h = (weeks['semana_h'] > 0).to_numpy()
+    l_res_2d = ((weeks['feriados_h'] > 0) & (weeks['wday7_h'] > 0)).to_numpy(dtype=np.int64)
+    l_dom_2d = np.maximum(weeks['feriados_h'].to_numpy() - 1, 0)
+    l_res_3d = np.where(has_h, np.maximum(np.minimum(weeks['dias_h'], weeks['semana_h'] - 3), 0), 0)
+    l_dom_3d = np.where(has_h, np.maximum(weeks['feriados'].to_numpy() - 2, 0), 0)
+
+    return pd.DataFrame({
+        'COLABORADOR': weeks.index.get_level_values('COLABORADOR'),
+        'WW': weeks.index.get_level_values('WW'),
+        'L_RES': np.where(is_2d, l_res_2d, l_res_3d).astype(np.int64),
+        'L_DOM': np.where(is_2d, l_dom_2d, l_dom_3d).astype(np.int64),
+    })
+
+
+# Weekday suffix of the faixa_horario aber_/fech_ columns, by dayofweek (0 = Monday)
+FAIXA_HORARIO_WEEKDAYS = ('seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom')
+
+def expand_faixa_horario(df_faixa_horario: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expand the opening hours ranges of df_faixa_horario to one row per secao and date.
+
+    Every [data_ini, data_fim] range is repeated once per day (np.repeat plus day offsets)
+    and each date takes aber/fech from the columns of its weekday (aber_seg/fech_seg for
+    Mondays, ..., aber_dom/fech_dom for Sundays). Where ranges of a secao overlap, the
+    first range with a value wins.
+
+    Args:
+        df_faixa_horario: Opening hours with fk_secao, data_ini, data_fim and aber_<wd>/fech_<wd> columns
+
+    Returns:
+        DataFrame with fk_secao, data, aber and fech (datetime), sorted by fk_secao and data
+    """
+    columns = ['fk_secao', 'data', 'aber', 'fech']
+    if len(df_faixa_horario) == 0:
+        return pd.DataFrame(columns=columns)
+
+    data_ini = pd.to_datetime(df_faixa_horario['data_ini']).to_numpy()
+    data_fim = pd.to_datetime(df_faixa_horario['data_fim']).to_numpy()
+    one_day = np.timedelta64(1, 'D')
+
+    # Days in each range (0 for empty or incomplete ranges)
+    valid = ~(np.isnat(data_ini) | np.isnat(data_fim))
+    n_days = np.zeros(len(df_faixa_horario), dtype=np.int64)
+    n_days[valid] = np.maximum((data_fim[valid] - data_ini[valid]) // one_day + 1, 0)
+
+    range_idx = np.repeat(np.arange(len(df_faixa_horario)), n_days)
+    offsets = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    dates = pd.DatetimeIndex(data_ini[range_idx] + offsets * one_day)
+    weekday = dates.dayofweek.to_numpy()
+
+    expanded = pd.DataFrame({
+        'fk_secao': df_faixa_horario['fk_secao'].to_numpy()[range_idx],
+        'data': dates,
+    })
+    for a_f in ('aber', 'fech'):
+        by_weekday = df_faixa_horario[[f'{a_f}_{wd}' for wd in FAIXA_HORARIO_WEEKDAYS]].to_numpy(dtype=object)
+        expanded[a_f] = by_weekday[range_idx, weekday]
+
+    # First non-missing value per secao and date (in range order)
+    result = expanded.groupby(['fk_secao', 'data'], sort=True)[['aber', 'fech']].first().reset_index()
+    for a_f in ('aber', 'fech'):
+        result[a_f] = pd.to_datetime(result[a_f], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    return result[columns]
+
+def turno_demand_stats(df_granularidade: pd.DataFrame, df_turnos: pd.DataFrame, start_date: Any, end_date: Any) -> pd.DataFrame:
+    """
+    Daily demand statistics of every turno of a tipo_posto.
+
+    The granularity slots are joined to the turno windows of their date in one merge, the
+    slots with h_ini_1 <= hora_ini < h_out_1 are kept and a single groupby(['turno', 'data'])
+    computes media_turno, max_turno (calcular_max over the slots in hora_ini order), min_turno
+    and sd_turno. The result is reindexed once against every turno and date of the period,
+    with 0 where there is no demand.
+
+    Args:
+        df_granularidade: Demand slots with fk_tipo_posto, data, hora_ini and pessoas_final
+        df_turnos: Turno windows of one tipo_posto with fk_tipo_posto, data, turno, h_ini_1 and h_out_1
+        start_date: First date of the period
+        end_date: Last date of the period
+
+    Returns:
+        DataFrame with data, media_turno, max_turno, min_turno, sd_turno, turno and fk_tipo_posto,
+        one row per turno (in df_turnos order) and date
+    """
+    turnos = df_turnos.drop_duplicates('turno')[['turno', 'fk_tipo_posto']]
+
+    # Slots of each turno: interval join of the granularity with the turno windows
+    slots = pd.merge(df_granularidade, df_turnos, on=['fk_tipo_posto', 'data'], how='inner')
+    slots = slots[(slots['hora_ini'] >= slots['h_ini_1']) & (slots['hora_ini'] < slots['h_out_1'])]
+    slots = slots.sort_values(['turno', 'data', 'hora_ini']).drop_duplicates()
+    slots['pessoas_final'] = pd.to_numeric(slots['pessoas_final'], errors='coerce')
+
+    stats = slots.groupby(['turno', 'data'], sort=False)['pessoas_final'].agg(
+        media_turno='mean',
+        max_turno=lambda x: calcular_max(x.tolist()),
+        min_turno='min',
+        sd_turno='std',
+    )
+
+    # Every turno on every date of the period
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    full_index = pd.MultiIndex.from_product([turnos['turno'], dates], names=['turno', 'data'])
+    output = stats.reindex(full_index).fillna(0).reset_index()
+    output['fk_tipo_posto'] = np.repeat(turnos['fk_tipo_posto'].to_numpy(), len(dates))
+    return output[['data', 'media_turno', 'max_turno', 'min_turno', 'sd_turno', 'turno', 'fk_tipo_posto']]
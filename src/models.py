@@ -15,13 +15,18 @@ from isoweek import Week
 # Import project-specific components
 from src.config import PROJECT_NAME, CONFIG, ROOT_DIR
 from src.helpers import (
-    calcular_max, count_open_holidays, 
-    insert_feriados, insert_closed_days, insert_holidays_absences,
-    create_m0_0t, create_mt_mtt_cycles, assign_days_off, assign_empty_days,
+    count_open_holidays, 
+    build_calendar_events, inject_calendar_events,
+    create_m0_0t, create_mt_mtt_cycles, assign_empty_days,
     add_trads_code, assign_90_cycles, load_pre_ger_scheds, get_limit_mt,
-    count_dates_per_year, load_wfm_scheds, func_turnos, adjusted_isoweek,
-    custom_round, calcular_folgas2, calcular_folgas3
+    count_dates_per_year, load_wfm_scheds, expand_faixa_horario, turno_demand_stats
 )
+from src.schedule_matrix import ScheduleMatrix
+from src.shift_codes import decode_shift_codes
+from src.schedule_archive import ScheduleArchive
+from src.step_pipeline import StepPipeline
+from src.frame_store import FrameStore, share, log_frame_memory
+from src.func_inicializa_helpers import func_inicializa_steps
 from src.load_csv_functions.load_valid_emp import load_valid_emp_csv
 from base_data_project.algorithms.factory import AlgorithmFactory
 from base_data_project.data_manager.managers.base import BaseDataManager
@@ -49,9 +54,10 @@ class DescansosDataModel(BaseDataModel):
 
         self.external_call_data = external_data # consider removing here or in service
 
+        # Data dicts own their frames (see src.frame_store for the ownership rules)
         # Important auxiliary data
         # Auxiliary data (TODO: define how it starts)
-        self.auxiliary_data = {
+        self.auxiliary_data = FrameStore({
             'messages_df': pd.DataFrame(),
             'final': None, # TODO: change the name
             'num_fer_doms': 0,
@@ -71,21 +77,22 @@ class DescansosDataModel(BaseDataModel):
             'df_day_aloc': None,
             'emp_pre_ger': None,
             'df_count': None
-        }
+        })
 
         # Raw data storage
-        self.raw_data = {
+        self.raw_data = FrameStore({
             'df_calendario': None,
+            'df_calendario_long': None,
             'df_colaborador': None,
             'df_estimativas': None
-        }
+        })
 
         # Medium data storage
-        self.medium_data = {
+        self.medium_data = FrameStore({
             'df_calendario': None,
             'df_colaborador': None,
             'df_estimativas': None
-        }
+        })
         
         # Transformed data
         self.rare_data = {
@@ -98,6 +105,10 @@ class DescansosDataModel(BaseDataModel):
         
         # Metadata for tracking operations
         self.operations_log = []
+
+        # func_inicializa step outputs (memory cache) and the per-step report of the last run
+        self.func_inicializa_cache = {}
+        self.func_inicializa_report = None
         
         self.logger.info("DataContainer initialized")
     
@@ -178,9 +189,9 @@ class DescansosDataModel(BaseDataModel):
 
             # Copy the dataframes into the apropriate dict
             # TODO: should we ensure unit, secao e posto are only one value?
-            self.auxiliary_data['valid_emp'] = valid_emp.copy()
-            self.auxiliary_data['params_lq'] = params_lq.copy()
-            self.auxiliary_data['df_festivos'] = df_festivos.copy()
+            self.auxiliary_data['valid_emp'] = valid_emp
+            self.auxiliary_data['params_lq'] = params_lq
+            self.auxiliary_data['df_festivos'] = df_festivos
             self.auxiliary_data['unit_id'] = unit_id 
             self.auxiliary_data['secao_id'] = secao_id
             self.auxiliary_data['posto_id_list'] = posto_id_list
@@ -209,7 +220,7 @@ class DescansosDataModel(BaseDataModel):
         """
         transform database data into data raw
         """
-        valid_emp = self.auxiliary_data['valid_emp'].copy()
+        valid_emp = share(self.auxiliary_data['valid_emp'])
         valid_emp = valid_emp[valid_emp['fk_perfil'] == posto_id]
         colabs_id_list = valid_emp['fk_colaborador'].tolist()
         if len(colabs_id_list) == 0:
@@ -227,7 +238,7 @@ class DescansosDataModel(BaseDataModel):
             df_colaborador = df_colaborador.rename(columns={'ec.codigo': 'fk_colaborador', 'codigo': 'fk_colaborador'})
             
             # TODO: save the dataframes if they are needed elsewhere, if not let them die here
-            self.raw_data['df_colaborador'] = df_colaborador.copy()
+            self.raw_data['df_colaborador'] = df_colaborador
             self.auxiliary_data['num_fer_doms'] = 0
             return True
         except Exception as e:
@@ -254,7 +265,7 @@ class DescansosDataModel(BaseDataModel):
             # Get sql file path, if the cvs is being used, it gets the the path defined on dummy_data_filepaths
             # turnos information: doesnt need a query since is information resent on core_alg_params
             #query_path = CONFIG.get('available_entities_aux', {}).get('df_turnos', '')
-            df_turnos = self.raw_data['df_colaborador'].copy()
+            df_turnos = share(self.raw_data['df_colaborador'])
             df_turnos = df_turnos[columns_select]
 
             # Estrutura wfm information
@@ -281,13 +292,13 @@ class DescansosDataModel(BaseDataModel):
             df_granularidade = data_manager.load_data('df_granularidade', query_file=query_path, start_date=start_date, end_date=end_date, posto_id=posto_id)
 
             # TODO: save the dataframes if they are needed elsewhere, if not let them die here
-            self.raw_data['df_estimativas'] = df_estimativas.copy()
-            self.auxiliary_data['df_turnos'] = df_turnos.copy()
-            self.auxiliary_data['df_estrutura_wfm'] = df_estrutura_wfm.copy()
-            self.auxiliary_data['df_feriados'] = df_feriados.copy()
-            self.auxiliary_data['df_faixa_horario'] = df_faixa_horario.copy()
-            self.auxiliary_data['df_orcamento'] = df_orcamento.copy()
-            self.auxiliary_data['df_granularidade'] = df_granularidade.copy()
+            self.raw_data['df_estimativas'] = df_estimativas
+            self.auxiliary_data['df_turnos'] = df_turnos
+            self.auxiliary_data['df_estrutura_wfm'] = df_estrutura_wfm
+            self.auxiliary_data['df_feriados'] = df_feriados
+            self.auxiliary_data['df_faixa_horario'] = df_faixa_horario
+            self.auxiliary_data['df_orcamento'] = df_orcamento
+            self.auxiliary_data['df_granularidade'] = df_granularidade
             return True
         
         except Exception as e:
@@ -304,7 +315,7 @@ class DescansosDataModel(BaseDataModel):
         
         try:
             # Tipo_contrato info
-            df_colaborador = self.raw_data['df_colaborador'].copy()
+            df_colaborador = share(self.raw_data['df_colaborador'])
             self.logger.info(f"df_colaborador shape: {df_colaborador.shape}")
             self.logger.info(f"df_colaborador columns: {df_colaborador.columns.tolist()}")
             
@@ -369,13 +380,47 @@ class DescansosDataModel(BaseDataModel):
                         self.logger.warning("df_calendario_passado query path not found in config")
                         df_calendario_passado = pd.DataFrame()
                     else:
-                        df_calendario_passado = data_manager.load_data(
-                            'df_calendario_passado', 
-                            query_file=query_path, 
-                            start_date=first_date_passado, 
-                            end_date=last_date_passado.strftime('%Y-%m-%d'), 
-                            colabs=colabs_passado
-                        )
+                        # Days already archived locally are read from disk, only the rest is queried
+                        archive_dir = CONFIG.get('schedule_archive_dir', '')
+                        archive = None
+                        query_start = first_date_passado
+                        df_archived = pd.DataFrame()
+                        if archive_dir:
+                            try:
+                                archive = ScheduleArchive(archive_dir, max_age_days=CONFIG.get('schedule_archive_max_age_days'))
+                                archive_start = archive.first_missing_date(colabs_passado, first_date_passado, last_date_passado)
+                                df_archived = archive.read(colabs_passado, first_date_passado, archive_start - pd.Timedelta(days=1))
+                                query_start = archive_start.strftime('%Y-%m-%d')
+                                self.logger.info(f"Archived schedule rows: {len(df_archived)}, querying from {query_start}")
+                            except Exception as e:
+                                # Fall back to querying the whole period
+                                self.logger.error(f"Error reading the schedule archive: {e}")
+                                archive = None
+                                query_start = first_date_passado
+                                df_archived = pd.DataFrame()
+                        
+                        if query_start <= last_date_passado:
+                            df_queried = data_manager.load_data(
+                                'df_calendario_passado', 
+                                query_file=query_path, 
+                                start_date=query_start, 
+                                end_date=last_date_passado, 
+                                colabs=colabs_passado
+                            )
+                        else:
+                            df_queried = pd.DataFrame()
+                        
+                        # Archive the past days (before the current start date) for the next runs
+                        if archive is not None and query_start <= last_date_passado:
+                            try:
+                                archived_rows = archive.append(df_queried, colabs_passado, query_start,
+                                                               start_date_dt - pd.Timedelta(days=1))
+                                self.logger.info(f"Appended {archived_rows} rows to the schedule archive")
+                            except Exception as e:
+                                self.logger.error(f"Error appending to the schedule archive: {e}")
+                        
+                        parts = [df for df in [df_archived, df_queried] if len(df) > 0]
+                        df_calendario_passado = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
                 except Exception as e:
                     self.logger.error(f"Error loading df_calendario_passado: {e}")
                     df_calendario_passado = pd.DataFrame()
@@ -444,12 +489,13 @@ class DescansosDataModel(BaseDataModel):
 
             # Saving results in memory
             self.auxiliary_data['df_calendario_past'] = pd.DataFrame()
-            self.auxiliary_data['df_ausencias_ferias'] = df_ausencias_ferias.copy()
-            self.auxiliary_data['df_ciclos_90'] = df_ciclos_90.copy()
-            self.auxiliary_data['df_calendario_passado'] = reshaped_final_3.copy()
+            self.auxiliary_data['df_ausencias_ferias'] = df_ausencias_ferias
+            self.auxiliary_data['df_ciclos_90'] = df_ciclos_90
+            self.auxiliary_data['df_calendario_passado'] = reshaped_final_3
             self.auxiliary_data['emp_pre_ger'] = emp_pre_ger
-            self.auxiliary_data['df_count'] = df_count.copy()
-            self.raw_data['df_calendario'] = df_calendario.copy()
+            self.auxiliary_data['df_count'] = df_count
+            self.raw_data['df_calendario'] = df_calendario
+            self.raw_data['df_calendario_long'] = None
             
             self.logger.info("load_calendario_info completed successfully")
             return True
@@ -482,11 +528,11 @@ class DescansosDataModel(BaseDataModel):
             fk_tipo_posto = self.auxiliary_data['current_posto_id']
             
             # Get DataFrames from existing data
-            df_turnos = self.auxiliary_data['df_turnos'].copy()
-            df_estrutura_wfm = self.auxiliary_data['df_estrutura_wfm'].copy()
-            df_faixa_horario = self.auxiliary_data['df_faixa_horario'].copy()
-            df_feriados = self.auxiliary_data['df_feriados'].copy()
-            df_orcamento = self.auxiliary_data['df_orcamento'].copy()  # This is dfGranularidade equivalent
+            df_turnos = share(self.auxiliary_data['df_turnos'])
+            df_estrutura_wfm = share(self.auxiliary_data['df_estrutura_wfm'])
+            df_faixa_horario = share(self.auxiliary_data['df_faixa_horario'])
+            df_feriados = share(self.auxiliary_data['df_feriados'])
+            df_orcamento = share(self.auxiliary_data['df_orcamento'])  # This is dfGranularidade equivalent
             
             # Filter df_turnos by fk_tipo_posto
             df_turnos = df_turnos[df_turnos['fk_tipo_posto'] == fk_tipo_posto].copy()
@@ -613,57 +659,8 @@ class DescansosDataModel(BaseDataModel):
             # Process faixa_horario
             df_faixa_horario_filtered = df_faixa_horario[df_faixa_horario['fk_secao'] == fk_secao].copy()
             
-            # Expand date ranges in faixa_horario
-            expanded_rows = []
-            for _, row in df_faixa_horario_filtered.iterrows():
-                date_range_fh = pd.date_range(start=row['data_ini'], end=row['data_fim'], freq='D')
-                for date in date_range_fh:
-                    new_row = row.copy()
-                    new_row['data'] = date
-                    expanded_rows.append(new_row)
-            
-            if expanded_rows:
-                df_faixa_horario_expanded = pd.DataFrame(expanded_rows)
-                
-                # Reshape from wide to long format for time columns
-                time_columns = ["aber_seg", "fech_seg", "aber_ter", "fech_ter", "aber_qua", "fech_qua", 
-                            "aber_qui", "fech_qui", "aber_sex", "fech_sex", "aber_sab", "fech_sab", 
-                            "aber_dom", "fech_dom", "aber_fer", "fech_fer"]
-                
-                df_faixa_long = pd.melt(df_faixa_horario_expanded, 
-                                    id_vars=['fk_secao', 'data', 'data_ini', 'data_fim'],
-                                    value_vars=time_columns,
-                                    var_name='wd_ab', value_name='value')
-                
-                # Split wd_ab into action (aber/fech) and weekday
-                df_faixa_long[['a_f', 'wd']] = df_faixa_long['wd_ab'].str.split('_', expand=True)
-                
-                # Pivot back to get aber and fech columns
-                df_faixa_wide = df_faixa_long.pivot_table(
-                    index=['fk_secao', 'data', 'wd'], 
-                    columns='a_f', 
-                    values='value', 
-                    aggfunc='first'
-                ).reset_index()
-                
-                # Clean column names
-                df_faixa_wide.columns.name = None
-                
-                # Convert weekday names and match with actual dates
-                df_faixa_wide['wd'] = df_faixa_wide['wd'].str.replace('sab', 'sáb')
-                df_faixa_wide['wd_date'] = df_faixa_wide['data'].dt.day_name().str.lower()
-                df_faixa_wide['wd_date'] = df_faixa_wide['wd_date'].str.replace('saturday', 'sáb')
-                
-                # Filter matching weekdays
-                df_faixa_horario_final = df_faixa_wide[df_faixa_wide['wd'] == df_faixa_wide['wd_date']].copy()
-                
-                # Convert time columns to datetime
-                df_faixa_horario_final['aber'] = pd.to_datetime(df_faixa_horario_final['aber'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                df_faixa_horario_final['fech'] = pd.to_datetime(df_faixa_horario_final['fech'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                
-                df_faixa_horario_final = df_faixa_horario_final[['fk_secao', 'data', 'aber', 'fech']]
-            else:
-                df_faixa_horario_final = pd.DataFrame(columns=['fk_secao', 'data', 'aber', 'fech'])
+            # Expand date ranges in faixa_horario (aber/fech of each date's weekday)
+            df_faixa_horario_final = expand_faixa_horario(df_faixa_horario_filtered)
             
             # Merge all data together
             df_turnos = pd.merge(df_turnos, df_data, on=['fk_unidade'], how='left')
@@ -742,7 +739,7 @@ class DescansosDataModel(BaseDataModel):
             
             # Process granularity data (df_orcamento equivalent)
             # TODO: shouldnt it be from a query
-            df_granularidade = self.auxiliary_data.get('df_granularidade', pd.DataFrame())
+            df_granularidade = share(self.auxiliary_data.get('df_granularidade', pd.DataFrame()))
             #df_granularidade = df_orcamento[['fk_unidade', 'unidade', 'fk_secao', 'secao', 'fk_tipo_posto', 'tipo_posto', 
             #                                'data', 'hora_ini', 'pessoas_min', 'pessoas_estimado', 'pessoas_final']].copy()
             
@@ -795,67 +792,9 @@ class DescansosDataModel(BaseDataModel):
             # Filter granularity data
             df_granularidade = df_granularidade[df_granularidade['fk_tipo_posto'] == fk_tipo_posto].copy()
             
-            # Process each unique turno
-            output_final = pd.DataFrame()
-            
-            for i, fk_posto_turno in enumerate(df_turnos_processing['fk_posto_turno'].unique()):
-                logger.info(f"Processing turno {i+1}: {fk_posto_turno}")
-                
-                df_turnos_f = df_turnos_processing[df_turnos_processing['fk_posto_turno'] == fk_posto_turno].copy()
-                fk_posto = df_turnos_f['fk_tipo_posto'].iloc[0]
-                turno = df_turnos_f['turno'].iloc[0]
-                
-                # Filter granularity data for this posto
-                df_granularidade_f = df_granularidade[df_granularidade['fk_tipo_posto'] == fk_posto].copy()
-                
-                # Merge with turno data
-                df_granularidade_f = pd.merge(df_granularidade_f, df_turnos_f, 
-                                            on=['fk_tipo_posto', 'data'], how='inner')
-                
-                # Filter by time range
-                time_mask = (df_granularidade_f['hora_ini'] >= df_granularidade_f['h_ini_1']) & \
-                        (df_granularidade_f['hora_ini'] < df_granularidade_f['h_out_1'])
-                df_granularidade_f = df_granularidade_f[time_mask].copy()
-                
-                df_granularidade_f = df_granularidade_f.sort_values(['data', 'hora_ini']).drop_duplicates()
-                df_granularidade_f['pessoas_final'] = pd.to_numeric(df_granularidade_f['pessoas_final'], errors='coerce')
-                
-                # Calculate statistics
-                if len(df_granularidade_f) == 0:
-                    output = pd.DataFrame({
-                        'data': [],
-                        'media_turno': [],
-                        'max_turno': [],
-                        'min_turno': [],
-                        'sd_turno': []
-                    })
-                else:
-                    output = df_granularidade_f.groupby('data').agg({
-                        'pessoas_final': [
-                            ('media_turno', 'mean'),
-                            ('max_turno', lambda x: calcular_max(x.tolist())),
-                            ('min_turno', 'min'),
-                            ('sd_turno', 'std')
-                        ]
-                    }).reset_index()
-                    
-                    # Flatten column names
-                    output.columns = ['data', 'media_turno', 'max_turno', 'min_turno', 'sd_turno']
-                
-                # Create complete date range
-                date_range_complete = pd.date_range(start=start_date, end=end_date, freq='D')
-                df_data_complete = pd.DataFrame({'data': date_range_complete})
-                
-                # Merge with output
-                output = pd.merge(df_data_complete, output, on='data', how='left')
-                output = output.fillna(0)
-                
-                output['turno'] = turno
-                output['fk_tipo_posto'] = fk_posto
-                
-                output_final = pd.concat([output_final, output], ignore_index=True)
-                
-                logger.info(f"Completed processing turno {fk_posto_turno}")
+            # Demand statistics of all turnos at once (one row per turno and date of the period)
+            logger.info(f"Processing turnos: {df_turnos_processing['fk_posto_turno'].unique().tolist()}")
+            output_final = turno_demand_stats(df_granularidade, df_turnos_processing, start_date, end_date)
             
             # Final processing
             if len(output_final) > 0:
@@ -875,10 +814,10 @@ class DescansosDataModel(BaseDataModel):
             
             # Store results in appropriate class attributes
             # Store processed turnos data in auxiliary_data
-            self.auxiliary_data['df_turnos'] = df_turnos_processing.copy()
+            self.auxiliary_data['df_turnos'] = df_turnos_processing
             
             # Store final output matrix (matrizB_og equivalent) in raw_data
-            self.raw_data['df_estimativas'] = output_final.copy()
+            self.raw_data['df_estimativas'] = output_final
             
             logger.info("load_matrices_transformations completed successfully")
             logger.info(f"Stored df_turnos with shape: {df_turnos_processing.shape}")
@@ -918,9 +857,9 @@ class DescansosDataModel(BaseDataModel):
             unit_id = self.auxiliary_data['unit_id']
             
             # Get DataFrames from existing data
-            matriz_ma = self.raw_data['df_colaborador'].copy()
-            params_lq = self.auxiliary_data['params_lq'].copy()
-            matriz_festivos = self.auxiliary_data['df_festivos'].copy()
+            matriz_ma = share(self.raw_data['df_colaborador'])
+            params_lq = share(self.auxiliary_data['params_lq'])
+            matriz_festivos = share(self.auxiliary_data['df_festivos'])
             
             # Global variables that would be passed from external context
             # TODO: These should be configured in your config or passed as parameters
@@ -1213,7 +1152,7 @@ class DescansosDataModel(BaseDataModel):
                 return False
             
             # Store result in raw_data
-            self.raw_data['df_colaborador'] = matriz_ma_final.copy()
+            self.raw_data['df_colaborador'] = matriz_ma_final
             self.auxiliary_data['num_fer_doms'] = num_fer_dom
             
             logger.info(f"load_ma_bd completed successfully. Processed {len(matriz_ma_final)} employees.")
@@ -1253,10 +1192,10 @@ class DescansosDataModel(BaseDataModel):
             current_year = pd.to_datetime(start_date).year
             
             # Get DataFrames from existing data
-            matriz_ma = self.raw_data['df_colaborador'].copy()
-            df_feriados = self.auxiliary_data['df_feriados'].copy()
-            df_ciclos_90 = self.auxiliary_data['df_ciclos_90'].copy()
-            df_ausencias_ferias = self.auxiliary_data['df_ausencias_ferias'].copy()
+            matriz_ma = share(self.raw_data['df_colaborador'])
+            df_feriados = share(self.auxiliary_data['df_feriados'])
+            df_ciclos_90 = share(self.auxiliary_data['df_ciclos_90'])
+            df_ausencias_ferias = share(self.auxiliary_data['df_ausencias_ferias'])
             closed_days = self.auxiliary_data.get('df_closed_days', pd.DataFrame())
             if closed_days is None:
                 closed_days = pd.DataFrame()
@@ -1342,56 +1281,12 @@ class DescansosDataModel(BaseDataModel):
                     lambda x: x - 6 if x == 7 else (8 if x == 8 else x + 1)
                 )
                 
-                # Get unique collaborators with 90-day cycles
-                colabs_90_cycle = cycle90_info['employee_id'].unique()
                 cycle90_info['schedule_day'] = pd.to_datetime(cycle90_info['schedule_day'])
                 
-                # Process each collaborator with 90-day cycles
-                for colab in colabs_90_cycle:
-                    df_cycle90_info_filtered = cycle90_info[
-                        (cycle90_info['employee_id'] == colab) &
-                        (cycle90_info['schedule_day'] >= pd.to_datetime(start_date)) &
-                        (cycle90_info['schedule_day'] <= pd.to_datetime(end_date))
-                    ].copy()
-                    
-                    if len(df_cycle90_info_filtered) == 0:
-                        continue
-                    
-                    matricula = df_cycle90_info_filtered['matricula'].iloc[0]
-                    matriculas_90_cycles.append(matricula)
-                    
-                    lim_sup_manha, lim_inf_tarde = get_limit_mt(matricula, self.raw_data['df_colaborador'])
-                    
-                    # Add new row for this employee
-                    row_filling = ['-'] * (reshaped_final_3.shape[1] - 1)
-                    new_row = [matricula] + row_filling
-                    
-                    # Add the new row to the DataFrame
-                    new_row_df = pd.DataFrame([new_row], columns=reshaped_final_3.columns)
-                    reshaped_final_3 = pd.concat([reshaped_final_3, new_row_df], ignore_index=True)
-                    
-                    # Find row index for this employee
-                    reshaped_row_index = reshaped_final_3.index[
-                        reshaped_final_3.apply(lambda row: matricula in row.values, axis=1)
-                    ].tolist()[-1]
-                    
-                    # Process each day for this employee
-                    for _, cycle_row in df_cycle90_info_filtered.iterrows():
-                        day = cycle_row['schedule_day'].strftime('%Y-%m-%d')
-                        
-                        # Find column index for this day
-                        reshaped_col_index = None
-                        for col_idx, col_data in reshaped_final_3.items():
-                            if day in col_data.values:
-                                reshaped_col_index = col_idx
-                                break
-                        
-                        if reshaped_col_index is not None:
-                            reshaped_final_3 = assign_90_cycles(
-                                reshaped_final_3, df_cycle90_info_filtered, colab, df_feriados,
-                                lim_sup_manha, lim_inf_tarde, day, reshaped_col_index, 
-                                reshaped_row_index, matricula
-                            )
+                # Assign the cycles of all collaborators in one pass
+                reshaped_final_3, matriculas_90_cycles = assign_90_cycles(
+                    reshaped_final_3, cycle90_info, self.raw_data['df_colaborador'], start_date, end_date
+                )
             
             # Process employees not in pre-generated or 90-cycle schedules
             not_in_pre_ger = [emp for emp in all_colab_pad if emp not in emp_pre_ger]
@@ -1428,26 +1323,23 @@ class DescansosDataModel(BaseDataModel):
                 (df_feriados['data'] <= pd.to_datetime(f"{current_year}-12-31"))
             ].copy()
             
-            # Insert holidays and absences
-            if len(ausencias_total) > 0 and not ausencias_total.empty:
-                reshaped_final_3 = insert_holidays_absences(all_colab_pad, ausencias_total, reshaped_final_3)
+            # Add TIPO_DIA row
+            new_row = ['-'] * reshaped_final_3.shape[1]
+            new_row[0] = "TIPO_DIA"
             
-            if len(df_feriados_filtered) > 0:
-                reshaped_final_3 = insert_feriados(df_feriados_filtered, reshaped_final_3)
-            else:
-                # Add TIPO_DIA row when no holidays
-                new_row = ['-'] * reshaped_final_3.shape[1]
-                new_row[0] = "TIPO_DIA"
-                
-                upper_bind = reshaped_final_3.iloc[:2].copy()  # Take first 2 rows (Dia and TURNO)
-                lower_bind = reshaped_final_3.iloc[2:].copy()  # Take remaining rows
-                
-                new_row_df = pd.DataFrame([new_row], columns=reshaped_final_3.columns)
-                reshaped_final_3 = pd.concat([upper_bind, new_row_df, lower_bind], ignore_index=True)
+            upper_bind = reshaped_final_3.iloc[:2].copy()  # Take first 2 rows (Dia and TURNO)
+            lower_bind = reshaped_final_3.iloc[2:].copy()  # Take remaining rows
             
-            # Insert closed days if available
-            if closed_days is not None and len(closed_days) > 0:
-                reshaped_final_3 = insert_closed_days(closed_days, reshaped_final_3)
+            new_row_df = pd.DataFrame([new_row], columns=reshaped_final_3.columns)
+            reshaped_final_3 = pd.concat([upper_bind, new_row_df, lower_bind], ignore_index=True)
+            
+            # Insert absences, holidays and closed days in one pass, so that assign_empty_days
+            # leaves the absence cells (A, AP, V) of 2/3-day contracts in place
+            if len(ausencias_total) > 0:
+                ausencias_total = ausencias_total[ausencias_total['matricula'].isin(all_colab_pad)]
+            calendar_events = build_calendar_events(df_feriados=df_feriados_filtered, closed_days=closed_days,
+                                                    ausencias=ausencias_total)
+            reshaped_final_3 = inject_calendar_events(reshaped_final_3, calendar_events)
             
             # Assign empty days for contract types
             if len(df_tipo_contrato) > 0:
@@ -1455,17 +1347,15 @@ class DescansosDataModel(BaseDataModel):
                     df_tipo_contrato, reshaped_final_3, not_in_pre_ger, df_feriados_filtered
                 )
             
-            # Final insertion of holidays and absences
-            if len(ausencias_total) > 0 and not ausencias_total.empty:
-                reshaped_final_3 = insert_holidays_absences(all_colab_pad, ausencias_total, reshaped_final_3)
-            
-            # Process days off
+            # Insert absences and days off (employee events) again, after the empty days, so that
+            # they also take precedence over the closed holidays set by assign_empty_days
             df_days_off_filtered = pd.DataFrame()  # TODO: Implement get_days_off equivalent if needed
-            if len(df_days_off_filtered) > 0:
-                reshaped_final_3 = assign_days_off(reshaped_final_3, df_days_off_filtered)
+            employee_events = build_calendar_events(ausencias=ausencias_total, days_off=df_days_off_filtered)
+            reshaped_final_3 = inject_calendar_events(reshaped_final_3, employee_events)
             
-            # Store result in raw_data
-            self.raw_data['df_calendario'] = reshaped_final_3.copy()
+            # Store result in raw_data, in the wide layout and in the long layout used by func_inicializa
+            self.raw_data['df_calendario'] = reshaped_final_3
+            self.raw_data['df_calendario_long'] = ScheduleMatrix.from_frame(reshaped_final_3).to_long()
             
             logger.info(f"load_m2_bd completed successfully. Created calendar matrix with shape: {reshaped_final_3.shape}")
             logger.info(f"First few rows of created matrix:")
@@ -1489,26 +1379,25 @@ class DescansosDataModel(BaseDataModel):
         """
         Python translation of R funcInicializa function.
         Initializes matrices and performs data transformations.
+
+        The work is split in the steps of src.func_inicializa_helpers, run through a StepPipeline
+        that logs the time and memory of each step. Set CONFIG['func_inicializa_cache'] to 'memory'
+        or 'disk' to cache the step outputs, so a re-run resumes from the first changed step.
         
         Args:
             start_date: Start date string
             end_date: End date string  
             fer: Holiday data
             closed_days: Closed days data
-            semanas_restantes: Remaining weeks
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            import pandas as pd
-            import numpy as np
-            from datetime import datetime
-            
             # Get matrices from existing data
-            matriz2_og = self.raw_data['df_calendario'].copy()
-            matrizB_og = self.raw_data['df_estimativas'].copy() 
-            matrizA_og = self.raw_data['df_colaborador'].copy()
+            matriz2_og = share(self.raw_data['df_calendario'])
+            matrizB_og = share(self.raw_data['df_estimativas']) 
+            matrizA_og = share(self.raw_data['df_colaborador'])
 
             # TODO: Remove this debug code
             # Debug: Check the structure of matriz2_og
@@ -1526,978 +1415,51 @@ class DescansosDataModel(BaseDataModel):
             if not turno_exists or not dia_exists:
                 self.logger.error("Required header rows (TURNO/Dia) not found in matriz2_og")
                 return False
-            
-            # Find TURNO and Dia rows
-            turno_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'TURNO'].index[0]
-            dia_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'Dia'].index[0]
 
             # Semanas restantes calculo
             date_obj = datetime.strptime(end_date, '%Y-%m-%d')
             semana_inicial = date_obj.isocalendar().week
             semanas_restantes = 52 - semana_inicial
-            
-            # Get year from matrizB_og
-            ano = pd.to_datetime(matrizB_og['data'].min()).year
-            
-            # Adjust minTurno for specific dates
-            special_dates = [f'{ano}-12-23', f'{ano}-12-24', f'{ano}-12-30', f'{ano}-12-31']
-            friday_dates = [f'{ano}-12-22', f'{ano}-12-29']
-            
-            matrizB_ini = matrizB_og.copy()
-            matrizB_ini.loc[matrizB_ini['data'].isin(special_dates), 'min_turno'] = matrizB_ini['max_turno']
-            mask_friday = (matrizB_ini['data'].isin(friday_dates)) & (matrizB_ini['turno'] == 'M')
-            matrizB_ini.loc[mask_friday, 'min_turno'] = matrizB_ini.loc[mask_friday, 'max_turno']
-            
-            #CRIAR MATRIZ_2--------------------------------------------------
-            
-            # Reshape matriz2_og (equivalent to R melt)
-            # Find TURNO and Dia rows
-            turno_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'TURNO'].index[0]
-            dia_row_idx = matriz2_og[matriz2_og.iloc[:, 0] == 'Dia'].index[0]
-            
-            # Create column names
-            dia_values = matriz2_og.iloc[dia_row_idx, 1:].values
-            turno_values = matriz2_og.iloc[turno_row_idx, 1:].values
-            new_columns = [f"{dia}_{turno}" for dia, turno in zip(dia_values, turno_values)]
-            new_columns.insert(0, 'DIA_TURNO')
-            
-            # Rename columns
-            matriz2_og.columns = new_columns
-            
-            # Melt the dataframe
-            matriz2_ini = pd.melt(matriz2_og, id_vars='DIA_TURNO', 
-                                var_name='DATA', value_name='TIPO_TURNO')
-            matriz2_ini.columns = ['COLABORADOR', 'DATA', 'TIPO_TURNO']
-            
-            # Filter by date range
-            matriz2_ini['DATA'] = matriz2_ini['DATA'].astype(str)
-            matriz2_ini = matriz2_ini[
-                (matriz2_ini['DATA'] >= start_date) & 
-                (matriz2_ini['DATA'] <= end_date)
-            ]
-            
-            # Filter out unwanted rows
-            unwanted_colaboradors = ['Dia', 'maxTurno', 'mediaTurno', 'minTurno', 'sdTurno', 'TURNO']
-            matriz2 = matriz2_ini[~matriz2_ini['COLABORADOR'].isin(unwanted_colaboradors)].copy()
-            
-            # Clean DATA column (remove everything after underscore)
-            matriz2['DATA'] = matriz2['DATA'].str.replace(r'_.*$', '', regex=True)
-            
-            # Add HORARIO column
-            matriz2['HORARIO'] = np.where(
-                matriz2['TIPO_TURNO'].isin(['M', 'T', 'MoT', 'P']), 'H', matriz2['TIPO_TURNO']
-            )
-            
-            # Get unique shift types
-            tipos_de_turno = matriz2['TIPO_TURNO'].unique().tolist()
-            
-            # Process MoT and P shifts if they exist
-            if 'MoT' in tipos_de_turno:
-                matriz2 = func_turnos(matriz2, 'MoT')
-            if 'P' in tipos_de_turno:
-                matriz2 = func_turnos(matriz2, 'P')
-            
-            # Add date-related columns
-            matriz2['DATA'] = pd.to_datetime(matriz2['DATA'])
-            matriz2['WDAY'] = matriz2['DATA'].dt.dayofweek + 1  # Convert to 1-7 scale
-            matriz2['ID'] = range(len(matriz2))
-            matriz2['WW'] = matriz2['DATA'].apply(adjusted_isoweek)
-            matriz2['WD'] = matriz2['DATA'].dt.day_name().str[:3]
-            
-            # Calculate DIA_TIPO
-            def calculate_dia_tipo(group):
-                has_feriado = (group['TIPO_TURNO'] == 'F').any()
-                is_sunday = group['WD'].iloc[0] == 'Sun'
-                not_feriado_horario = group['HORARIO'] != 'F'
-                
-                if (has_feriado or is_sunday) and not_feriado_horario.any():
-                    return 'domYf'
-                else:
-                    return group['WD'].iloc[0]
-            
-            matriz2['DIA_TIPO'] = matriz2.groupby('DATA').apply(calculate_dia_tipo).reset_index(drop=True)
-            
-            # Merge with employee admission/dismissal dates
-            emp_dates = matrizA_og[['emp', 'data_admissao', 'data_demissao']].copy()
-            emp_dates = pd.concat([
-                emp_dates,
-                pd.DataFrame({'emp': ['TIPO_DIA'], 'data_admissao': [pd.NaT], 'data_demissao': [pd.NaT]})
-            ])
-            
-            matriz2 = matriz2.merge(emp_dates, left_on='COLABORADOR', right_on='emp', how='left')
-            
-            # Filter by dismissal date and adjust HORARIO based on admission date
-            matriz2 = matriz2[
-                matriz2['DATA'] <= matriz2['data_demissao'].fillna(pd.Timestamp('2100-01-01'))
-            ]
-            
-            def adjust_horario(row):
-                admission_date = row['data_admissao'] if pd.notna(row['data_admissao']) else pd.Timestamp('1900-01-01')
-                if row['DATA'] >= admission_date:
-                    return row['HORARIO']
-                elif row['DATA'] < admission_date and row['DIA_TIPO'] == 'domYf':
-                    return 'L_'
-                else:
-                    return 'NL'
-            
-            matriz2['HORARIO'] = matriz2.apply(adjust_horario, axis=1)
-            
-            #CRIAR MATRIZ_A--------------------------------------------------
-            
-            # Extract festivos (holidays)
-            dom_e_fes = matriz2[
-                (matriz2['HORARIO'] == 'F') & 
-                (matriz2['COLABORADOR'] == 'TIPO_DIA')
-            ]['DATA'].unique()
-            
-            # Filter matrizA_og
-            matrizA_og = matrizA_og[matrizA_og['matricula'] != ''].copy()
-            
-            # Initialize counting dataframes
-            df_merge_count_dom_fes = []
-            df_merge_count_fes = []
-            df_merge_count_holidays = []
-            
-            # Get convenio from external data or config
-            convenio_bd = self.external_call_data.get('convenio_bd', 'BD')  # You may need to adjust this
-            
-            # Process each employee
-            for matricula in matrizA_og['matricula'].unique():
-                if matricula == '':
-                    continue
-                    
-                matriz_temp = matriz2[matriz2['COLABORADOR'] == matricula].copy()
-                #matriz_temp['DATA'] = matriz_temp['DATA'].astype(str)
-                tipo_contrato = matrizA_og[matrizA_og['matricula'] == matricula]['tipo_contrato'].iloc[0]
-                
-                if convenio_bd == 'BD':  # Assuming BD convention
-                    if tipo_contrato in [4, 5]:
-                        # Count occurrences for 4/5 day contracts
-                        count_occurrences = len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            (matriz_temp['WDAY'] == 1)
-                        ])
-                        
-                        # Subtract closed days that fell on holidays
-                        fer_tipo3 = fer[fer['tipo'] == 3]['data'] if 'tipo' in fer.columns else []
-                        count_occurrences_extra2 = len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            matriz_temp['DATA'].isin(fer_tipo3) & 
-                            (matriz_temp['WDAY'] == 1)
-                        ])
-                        count_occurrences -= count_occurrences_extra2
-                        
-                        # Count holidays
-                        count_occurrences_fes = len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            matriz_temp['DATA'].isin(dom_e_fes)
-                        ])
-                        count_occurrences_fes -= len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            matriz_temp['DATA'].isin(fer_tipo3) & 
-                            (matriz_temp['WDAY'] != 1)
-                        ])
-                        
-                        count_holidays = len(matriz_temp[matriz_temp['HORARIO'] == 'V'])
-                        
-                    else:
-                        # For other contract types
-                        count_occurrences = len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            ((matriz_temp['WDAY'] == 1) | matriz_temp['DATA'].isin(dom_e_fes))
-                        ])
-                        
-                        fer_tipo3 = fer[fer['tipo'] == 3]['data'] if 'tipo' in fer.columns else []
-                        count_occurrences_extra2 = len(matriz_temp[
-                            matriz_temp['HORARIO'].isin(['A', 'L', 'V', 'L_', 'L_DOM', 'DFS']) & 
-                            matriz_temp['DATA'].isin(fer_tipo3)
-                        ])
-                        count_occurrences -= count_occurrences_extra2
-                        
-                        count_occurrences_fes = 0
-                        count_holidays = 0
-                
-                else:
-                    # SABECO convention
-                    count_occurrences = len(matriz_temp[
-                        (matriz_temp['HORARIO'] != 'NL') & 
-                        matriz_temp['HORARIO'].str.contains('^L|DFS', case=False, na=False) & 
-                        ((matriz_temp['WDAY'] == 1) | matriz_temp['DATA'].isin(dom_e_fes))
-                    ])
-                    count_occurrences_fes = 0
-                    count_holidays = 0
-                
-                # Store results
-                df_merge_count_dom_fes.append({
-                    'matricula': matricula, 
-                    'total_dom_fes': count_occurrences
-                })
-                df_merge_count_fes.append({
-                    'matricula': matricula, 
-                    'total_fes': count_occurrences_fes
-                })
-                df_merge_count_holidays.append({
-                    'matricula': matricula, 
-                    'total_holidays': count_holidays
-                })
-            
-            # Convert to DataFrames and merge
-            df_merge_count_dom_fes = pd.DataFrame(df_merge_count_dom_fes).drop_duplicates()
-            df_merge_count_fes = pd.DataFrame(df_merge_count_fes).drop_duplicates()
-            df_merge_count_holidays = pd.DataFrame(df_merge_count_holidays).drop_duplicates()
-            
-            matrizA_og = matrizA_og.merge(df_merge_count_dom_fes, on='matricula', how='left')
-            matrizA_og = matrizA_og.merge(df_merge_count_fes, on='matricula', how='left')
-            matrizA_og = matrizA_og.merge(df_merge_count_holidays, on='matricula', how='left')
-            
-            # Divide by 2 (as in R code)
-            matrizA_og['total_dom_fes'] = matrizA_og['total_dom_fes'] / 2
-            matrizA_og['total_fes'] = matrizA_og['total_fes'] / 2
-            matrizA_og['total_holidays'] = matrizA_og['total_holidays'] / 2
-            
-            # Adjust for contract type 3
-            matrizA_og.loc[matrizA_og['tipo_contrato'] == 3, 'total_dom_fes'] = 0
-            matrizA_og.loc[matrizA_og['tipo_contrato'] == 3, 'dyf_max_t'] = 0
-            
-            # Add DESCANSOS_ATRB column
-            matrizA_og['descansos_atrb'] = 0
-            
-            # CALCULA LIBRANÇAS ------------------------------------------------------------
-            
-            # Create df_CD for consecutive day calculations
-            df_cd = matriz2[matriz2['COLABORADOR'].isin(matrizA_og['matricula'])].copy()
-            df_cd['WD'] = df_cd['DATA'].dt.dayofweek + 1  # Convert to 1-7 scale
-            df_cd = df_cd.sort_values(['COLABORADOR', 'DATA'])
-            
-            # Remove duplicates by keeping first occurrence per COLABORADOR/DATA
-            df_cd = df_cd.groupby(['COLABORADOR', 'DATA']).first().reset_index()
-            
-            # Add next/previous day shift information
-            df_cd = df_cd.sort_values(['COLABORADOR', 'DATA'])
-            df_cd['TIPO_TURNO_NEXT'] = df_cd.groupby('COLABORADOR')['HORARIO'].shift(-1).fillna('H')
-            df_cd['TIPO_TURNO_PREV'] = df_cd.groupby('COLABORADOR')['HORARIO'].shift(1).fillna('H')
-            df_cd['WDAY_NEXT'] = df_cd.groupby('COLABORADOR')['WDAY'].shift(-1)
-            df_cd['TIPO_TURNO_NEXT2'] = df_cd.groupby('COLABORADOR')['HORARIO'].shift(-2).fillna('H')
-            df_cd['WDAY_NEXT2'] = df_cd.groupby('COLABORADOR')['WDAY'].shift(-2)
-            df_cd['WDAY_PREV'] = df_cd.groupby('COLABORADOR')['WDAY'].shift(1)
-            
-            # Process 4/5 day contracts - count different types of rest days
-            colabs_45d = matrizA_og[matrizA_og['tipo_contrato'].isin([4, 5])]['matricula'].tolist()
-            
-            count_ldt_45d_data = []
-            for colab in colabs_45d:
-                colab_data = df_cd[df_cd['COLABORADOR'] == colab].copy()
-                
-                # Calculate LD_at, LQ_at, LRES_at, CXX_at
-                ld_at = 0
-                
-                # LQ_at calculation
-                lq_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'] != 'LD') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6, 7])) &
-                    (~colab_data['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['TIPO_TURNO_PREV'] != 'L')
-                )
-                lq_at = lq_condition.sum()
-                
-                # LRES_at calculation  
-                lres_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6])) &
-                    (~colab_data['TIPO_TURNO_PREV'].str.contains('^L', case=False, na=False)) &
-                    (~colab_data['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False))
-                )
-                lres_at = lres_condition.sum()
-                
-                # CXX_at calculation
-                cxx_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6])) &
-                    (colab_data['TIPO_TURNO_PREV'].str.contains('^L', case=False, na=False))
-                )
-                cxx_at = cxx_condition.sum()
-                
-                count_ldt_45d_data.append({
-                    'COLABORADOR': colab,
-                    'LD_at': ld_at,
-                    'LQ_at': lq_at, 
-                    'LRES_at': lres_at,
-                    'CXX_at': cxx_at
-                })
-            
-            # Process 6 day contracts
-            colabs_6d = matrizA_og[matrizA_og['tipo_contrato'] == 6]['matricula'].tolist()
-            
-            count_ldt_6d_data = []
-            for colab in colabs_6d:
-                colab_data = df_cd[df_cd['COLABORADOR'] == colab].copy()
-                
-                # LD_at calculation
-                ld_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'] != 'LQ') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6, 7])) &
-                    (~colab_data['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['TIPO_TURNO_PREV'] != 'L')
-                )
-                ld_at = ld_condition.sum()
-                
-                # LQ_at calculation  
-                lq_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'] != 'LD') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6, 7])) &
-                    (~colab_data['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['TIPO_TURNO_PREV'] != 'L')
-                )
-                lq_at = lq_condition.sum()
-                
-                # CXX_at calculation
-                cxx_condition = (
-                    (colab_data['DIA_TIPO'] != 'domYf') &
-                    (colab_data['HORARIO'].str.contains('^L', case=False, na=False)) &
-                    (colab_data['WD'].isin([2, 3, 4, 5, 6])) &
-                    (colab_data['TIPO_TURNO_PREV'].str.contains('^L', case=False, na=False))
-                )
-                cxx_at = cxx_condition.sum()
-                
-                count_ldt_6d_data.append({
-                    'COLABORADOR': colab,
-                    'LD_at': ld_at,
-                    'LQ_at': lq_at,
-                    'LRES_at': 0,
-                    'CXX_at': cxx_at
-                })
-            
-            # Combine all collaborators
-            count_ldt = pd.DataFrame(count_ldt_45d_data + count_ldt_6d_data)
-            
-            # Calculate consecutive day patterns (C2D and C3D)
-            
-            # Add pattern identification columns
-            df_cd['FRI_SAT_SUN'] = (
-                (df_cd['WDAY_PREV'] == 6) & 
-                (df_cd['TIPO_TURNO_PREV'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY'] == 7) & 
-                (df_cd['HORARIO'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT'] == 1) & 
-                (df_cd['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False))
-            )
-            
-            df_cd['SAT_SUN_MON'] = (
-                (df_cd['WDAY'] == 7) & 
-                (df_cd['HORARIO'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT'] == 1) & 
-                (df_cd['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT2'] == 2) & 
-                (df_cd['TIPO_TURNO_NEXT2'].str.contains('^L', case=False, na=False))
-            )
-            
-            df_cd['SAT_SUN_ONLY'] = (
-                (df_cd['WDAY'] == 7) & 
-                (df_cd['HORARIO'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT'] == 1) & 
-                (df_cd['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT2'] == 2) & 
-                (~df_cd['TIPO_TURNO_NEXT2'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_PREV'] == 6) & 
-                (~df_cd['TIPO_TURNO_PREV'].str.contains('^L', case=False, na=False))
-            )
-            
-            df_cd['SUN_MON_ONLY'] = (
-                (df_cd['WDAY'] == 7) & 
-                (~df_cd['HORARIO'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT'] == 1) & 
-                (df_cd['TIPO_TURNO_NEXT'].str.contains('^L', case=False, na=False)) &
-                (df_cd['WDAY_NEXT2'] == 2) & 
-                (df_cd['TIPO_TURNO_NEXT2'].str.contains('^L', case=False, na=False))
-            )
-            
-            # Count C3D patterns
-            c3d_fri_sat_sun = df_cd[df_cd['FRI_SAT_SUN']].groupby('COLABORADOR')['DATA'].nunique().reset_index()
-            c3d_fri_sat_sun.columns = ['COLABORADOR', 'C3D_at_FSS']
-            
-            c3d_sat_sun_mon = df_cd[df_cd['SAT_SUN_MON']].groupby('COLABORADOR')['DATA'].nunique().reset_index()
-            c3d_sat_sun_mon.columns = ['COLABORADOR', 'C3D_at_SSM']
-            
-            # Merge C3D counts
-            c3d_at = pd.merge(c3d_sat_sun_mon, c3d_fri_sat_sun, on='COLABORADOR', how='outer').fillna(0)
-            c3d_at['C3D_at'] = c3d_at['C3D_at_SSM'] + c3d_at['C3D_at_FSS']
-            c3d_at = c3d_at[['COLABORADOR', 'C3D_at']]
-            
-            # Count C2D patterns  
-            c2d_sat_sun_only = df_cd[df_cd['SAT_SUN_ONLY']].groupby('COLABORADOR')['DATA'].nunique().reset_index()
-            c2d_sat_sun_only.columns = ['COLABORADOR', 'C2D_at_SSO']
-            
-            c2d_sun_mon_only = df_cd[df_cd['SUN_MON_ONLY']].groupby('COLABORADOR')['DATA'].nunique().reset_index()
-            c2d_sun_mon_only.columns = ['COLABORADOR', 'C2D_at_SMO']
-            
-            # Merge C2D counts
-            c2d_at = pd.merge(c2d_sat_sun_only, c2d_sun_mon_only, on='COLABORADOR', how='outer').fillna(0)
-            c2d_at['C2D_at'] = c2d_at['C2D_at_SSO'] + c2d_at['C2D_at_SMO']
-            c2d_at = c2d_at[['COLABORADOR', 'C2D_at']]
-            
-            # Merge C2D and C3D
-            c_at = pd.merge(c2d_at, c3d_at, on='COLABORADOR', how='outer').fillna(0)
-            
-            # Merge with count_ldt
-            count_ldt = pd.merge(count_ldt, c_at, on='COLABORADOR', how='left').fillna(0)
-            
-            # Merge with matrizA_og
-            matrizA_og = matrizA_og.merge(count_ldt, left_on='matricula', right_on='COLABORADOR', how='left').fillna(0)
-            
-            # Store original matrizA_og
-            matrizA_og_ed = matrizA_og.copy()
-            
-            # Adjust C2D logic (C2D = C2D + C3D)
-            matrizA_og['C2D_at'] = matrizA_og['C2D_at'] + matrizA_og['C3D_at']
 
-            # Log the column names of matrizA_og
-            self.logger.info(f"Columns in matrizA_og after processing: {matrizA_og.columns.tolist()}")
-            
-            # Calculate adjusted values
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['LD_at']
-            matrizA_og['ld'] = np.maximum(matrizA_og['ld'] - matrizA_og['LD_at'], 0)
-            matrizA_og['l_dom'] = matrizA_og['l_dom'] - matrizA_og['total_dom_fes'] - matrizA_og['total_fes']
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['total_dom_fes']
-            
-            # Handle holidays based on contract type
-            holiday_adjustment = np.where(
-                matrizA_og['tipo_contrato'] == 4,
-                2 * matrizA_og['total_holidays'].apply(custom_round) / 7,
-                matrizA_og['total_holidays'].apply(custom_round) / 7
+            pipeline = StepPipeline(
+                'func_inicializa',
+                func_inicializa_steps(),
+                cache_mode=CONFIG.get('func_inicializa_cache'),
+                cache_dir=CONFIG.get('func_inicializa_cache_dir'),
+                memory_cache=self.func_inicializa_cache,
+                track_memory=CONFIG.get('func_inicializa_track_memory', False)
             )
-            matrizA_og['l_total'] = matrizA_og['l_total'] - holiday_adjustment
-            
-            # Handle C2D and C3D
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['C2D_at']
-            matrizA_og['c2d'] = np.maximum(matrizA_og['c2d'] - matrizA_og['C2D_at'], 0)
-            
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['C3D_at']
-            matrizA_og['c3d'] = np.maximum(matrizA_og['c3d'] - matrizA_og['C3D_at'], 0)
-            
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['LQ_at']
-            matrizA_og['lq'] = np.maximum(matrizA_og['lq'] - matrizA_og['LQ_at'], 0)
-            
-            # Handle CXX
-            matrizA_og['l_total'] = matrizA_og['l_total'] - matrizA_og['CXX_at']
-            matrizA_og['cxx'] = np.maximum(matrizA_og['cxx'] - matrizA_og['CXX_at'], 0)
-            
-            # Create matrizA with selected columns
-            matrizA = matrizA_og[[
-                'unidade', 'secao', 'posto', 'fk_colaborador', 'matricula', 'out',
-                'tipo_contrato', 'ciclo', 'l_total', 'l_dom', 'ld', 'lq', 'q', 
-                'c2d', 'c3d', 'cxx', 'descansos_atrb', 'dyf_max_t', 'LRES_at', 'lq_og'
-            ]].copy()
-            
-            # CONTRATOS 2/3DIAS Processing -----------------------------------------------
-            
-            # Create matriz2_3D for 2/3 day contracts
-            contract_23_employees = matrizA[matrizA['tipo_contrato'].isin([2, 3])]['matricula'].tolist()
-            
-            if len(contract_23_employees) > 0:
-                matriz2_3d = matriz2[matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
-                
-                # Merge with contract type information
-                contract_info = matrizA[matrizA['tipo_contrato'].isin([2, 3])][['matricula', 'tipo_contrato']]
-                matriz2_3d = matriz2_3d.merge(contract_info, left_on='COLABORADOR', right_on='matricula', how='left')
-                
-                # Filter out unwanted HORARIO types and group by week/employee
-                matriz2_3d = matriz2_3d[~matriz2_3d['HORARIO'].isin(['-', 'V', 'F'])].copy()
-                
-                # Count work days per week per employee (divide by 2 for morning/afternoon)
-                week_counts = (matriz2_3d.groupby(['COLABORADOR', 'WW'])
-                            .size()
-                            .reset_index(name='count'))
-                week_counts['count'] = week_counts['count'] / 2
-                
-                # Merge back with matriz2_3d
-                matriz2_3d = matriz2_3d.merge(week_counts, on=['COLABORADOR', 'WW'], how='left')
-                
-                # Update HORARIO based on count and contract type
-                def update_horario_3d(row):
-                    if row['count'] == 3 and row['tipo_contrato'] == 3:
-                        return 'NL3D'
-                    elif row['count'] == 2 and row['tipo_contrato'] == 2:
-                        return 'NL2D'
-                    else:
-                        return row['HORARIO']
-                
-                matriz2_3d['HORARIO'] = matriz2_3d.apply(update_horario_3d, axis=1)
-                
-                # Remove unnecessary columns
-                matriz2_3d = matriz2_3d.drop(['count', 'tipo_contrato_y'], axis=1, errors='ignore')
-                
-                # Merge back with main matriz2
-                # First remove the employees that were processed
-                matriz2 = matriz2[~matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
-                # Then add back the processed data
-                matriz2 = pd.concat([matriz2, matriz2_3d], ignore_index=True)
-            
-            # Convert DATA back to string
-            matriz2['DATA'] = matriz2['DATA'].astype(str)
-            
-            # Calculate work weeks for 2/3 day contract employees
-            if len(contract_23_employees) > 0:
-                matriz3d = matriz2[matriz2['COLABORADOR'].isin(contract_23_employees)].copy()
-                
-                # Filter work days and count weeks
-                matriz3d = matriz3d[~matriz3d['HORARIO'].isin(['-', 'V', 'F', 'NL3D', 'NL2D'])].copy()
-                
-                work_weeks = (matriz3d.groupby('COLABORADOR')['WW']
-                            .nunique()
-                            .reset_index(name='count'))
-                work_weeks.columns = ['matricula', 'count']
-                
-                # Merge with matrizA
-                matrizA = matrizA.merge(work_weeks, on='matricula', how='left')
-                
-                # Update L_TOTAL for 2/3 day contracts
-                matrizA.loc[matrizA['tipo_contrato'].isin([2, 3]), 'l_total'] = (
-                    matrizA.loc[matrizA['tipo_contrato'].isin([2, 3]), 'count']
-                )
-            else:
-                matrizA['count'] = 0
-            
-            matrizA = matrizA.fillna(0)
-            matrizA = matrizA.drop('count', axis=1, errors='ignore')
-            # Apply clip to all numeric columns explicitly
-            numeric_cols = matrizA.select_dtypes(include=['number']).columns
-            matrizA[numeric_cols] = matrizA[numeric_cols].clip(lower=0)
-            
-            # Add L_RES column
-            matrizA['l_res'] = 0
-            
-            # Calculate auxiliary columns
-            matrizA['aux'] = matrizA['l_dom'] + matrizA['ld'] + matrizA['lq'] + matrizA['c2d'] + matrizA['c3d'] + matrizA['cxx']
-            matrizA['aux2'] = matrizA['l_total'] - matrizA['aux']
-            
-            # Adjust LD if aux2 is negative
-            matrizA.loc[matrizA['aux2'] < 0, 'ld'] = matrizA['ld'] + matrizA['aux2']
-            matrizA = matrizA.drop(['aux', 'aux2'], axis=1)
-            
-            # Set L_RES for contract type 3
-            matrizA.loc[matrizA['tipo_contrato'] == 3, 'l_res'] = matrizA.loc[matrizA['tipo_contrato'] == 3, 'l_total']
-            
-            # Rename columns to match R output
-            matrizA = matrizA.rename(columns={
-                'ld': 'l_d',
-                'lq': 'l_q', 
-                'q': 'l_qs'
+            results = pipeline.run({
+                'matriz2_og': matriz2_og,
+                'matriz2_long': self.raw_data.get('df_calendario_long'),
+                'matrizA_og': matrizA_og,
+                'matrizB_og': matrizB_og,
+                'start_date': start_date,
+                'end_date': end_date,
+                'fer': fer,
+                'convenio_bd': self.external_call_data.get('convenio_bd', 'BD'),  # You may need to adjust this
+                'semanas_restantes': semanas_restantes,
+                'param_pess_obj': self.external_call_data.get('param_pessoas_objetivo', 0.5),
             })
-            
-            # Add VZ (empty days) for 4-day contracts
-            matrizA['vz'] = np.where(matrizA['tipo_contrato'] == 4, semanas_restantes - 4, 0)
-            
-            # Update HORARIO: change 'L' to 'L_'
-            matriz2.loc[matriz2['HORARIO'] == 'L', 'HORARIO'] = 'L_'
-            
-            # Create backup matrices
-            matrizA_bk_og = matrizA.copy()
-            matrizA_bk_og['l_res'] = (matrizA_bk_og['l_total'] - matrizA_bk_og['l_dom'] - 
-                                    matrizA_bk_og['l_d'] - matrizA_bk_og['l_q'] - 
-                                    matrizA_bk_og['l_qs'] - matrizA_bk_og['c2d'] - 
-                                    matrizA_bk_og['c3d'] - matrizA_bk_og['cxx'] - 
-                                    matrizA_bk_og['vz'] - matrizA_bk_og['LRES_at'])
-            matrizA_bk_og['l_total'] = matrizA_bk_og['l_total'] - matrizA_bk_og['LRES_at']
-            matrizA_bk_og = matrizA_bk_og.drop('LRES_at', axis=1)
-            matrizA_bk_og.loc[matrizA_bk_og['l_res'] < 0, 'vz'] = matrizA_bk_og['vz'] + matrizA_bk_og['l_res']
-            
-            matrizA_bk = matrizA.copy()
-            matrizA_bk['l_res'] = (matrizA_bk['l_total'] - matrizA_bk['l_dom'] - 
-                                matrizA_bk['l_d'] - matrizA_bk['l_q'] - 
-                                matrizA_bk['l_qs'] - matrizA_bk['c2d'] - 
-                                matrizA_bk['c3d'] - matrizA_bk['cxx'] - 
-                                matrizA_bk['vz'] - matrizA_bk['LRES_at'])
-            matrizA_bk['l_total'] = matrizA_bk['l_total'] - matrizA_bk['LRES_at']
-            matrizA_bk = matrizA_bk.drop('LRES_at', axis=1)
-            matrizA_bk.loc[matrizA_bk['l_res'] < 0, 'vz'] = matrizA_bk['vz'] + matrizA_bk['l_res']
-            
-            # Sort by L_TOTAL descending and clip negative values
-            matrizA_bk = matrizA_bk.sort_values('l_total', ascending=False)
-            # Before clipping, identify numeric columns
-            numeric_cols = matrizA_bk.select_dtypes(include=['number']).columns
-            # Apply clip only to numeric columns
-            matrizA_bk[numeric_cols] = matrizA_bk[numeric_cols].clip(lower=0)
-            
-            # Create backup for matriz_data_turno (placeholder)
-            matriz_data_turno_bk = pd.DataFrame({'COLUNA': [np.nan]})
-            
-            # Dev TIPO TURNO FIX ---------------------------------------------------------------------
-            # Fix TIPO_TURNO for consistency
-            matriz2_tipo_turno_fix = (matriz2[matriz2['HORARIO'].isin(['H', 'DFS'])]
-                                    [['WW', 'TIPO_TURNO']]
-                                    .drop_duplicates('WW')
-                                    .rename(columns={'TIPO_TURNO': 'TIPO_TURNO_FIX'}))
-            
-            matriz2 = matriz2.merge(matriz2_tipo_turno_fix, on='WW', how='left')
-            matriz2.loc[matriz2['TIPO_TURNO'] == 'NL', 'TIPO_TURNO'] = matriz2['TIPO_TURNO_FIX']
-            matriz2 = matriz2.drop('TIPO_TURNO_FIX', axis=1, errors='ignore')
-            
-            matriz2_bk = matriz2.copy()
-            
-            # Individual Employee Processing Loop ----------------------------------------
-            
-            for colab in matrizA_bk['matricula']:
-                mmA = matrizA_bk[matrizA_bk['matricula'] == colab].copy()
-                if len(mmA) == 0:
-                    continue
-                    
-                mmA = mmA.iloc[0:1].copy()  # Take first row if multiple
-                tipo_contrato = mmA['tipo_contrato'].iloc[0]
-                ciclo = mmA['ciclo'].iloc[0] if 'ciclo' in mmA.columns else ''
-                dyf_max_t = mmA['dyf_max_t'].iloc[0] if 'dyf_max_t' in mmA.columns else 0
-                
-                if tipo_contrato == 2:
-                    # Process 2-day contracts using calcular_folgas2
-                    new_c = matriz2_bk[matriz2_bk['COLABORADOR'] == colab].copy()
-                    new_c = new_c.sort_values(['COLABORADOR', 'DATA', 'TIPO_TURNO'], ascending=[True, True, False])
-                    
-                    # Remove duplicates by keeping first occurrence per COLABORADOR/DATA
-                    new_c = new_c.groupby(['COLABORADOR', 'DATA']).first().reset_index()
-                    
-                    # Group by week and calculate folgas
-                    week_results = []
-                    for ww in new_c['WW'].unique():
-                        week_data = new_c[new_c['WW'] == ww]
-                        folgas_result = calcular_folgas2(week_data)
-                        folgas_result['COLABORADOR'] = colab
-                        week_results.append(folgas_result)
-                    
-                    # Combine results
-                    if week_results:
-                        combined_results = pd.concat(week_results, ignore_index=True)
-                        total_l_res = combined_results['L_RES'].sum()
-                        total_l_dom = combined_results['L_DOM'].sum()
-                        total_l_total = total_l_res + total_l_dom
-                        
-                        mmA.loc[:, 'l_res'] = total_l_res
-                        mmA.loc[:, 'l_dom'] = total_l_dom
-                        mmA.loc[:, 'l_total'] = total_l_total
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                    
-                elif tipo_contrato == 3:
-                    # Process 3-day contracts using calcular_folgas3
-                    new_c = matriz2_bk[matriz2_bk['COLABORADOR'] == colab].copy()
-                    new_c = new_c.sort_values(['COLABORADOR', 'DATA', 'TIPO_TURNO'], ascending=[True, True, False])
-                    
-                    # Remove duplicates
-                    new_c = new_c.groupby(['COLABORADOR', 'DATA']).first().reset_index()
-                    
-                    # Group by week and calculate folgas
-                    week_results = []
-                    for ww in new_c['WW'].unique():
-                        week_data = new_c[new_c['WW'] == ww]
-                        folgas_result = calcular_folgas3(week_data)
-                        folgas_result['COLABORADOR'] = colab
-                        week_results.append(folgas_result)
-                    
-                    # Combine results
-                    if week_results:
-                        combined_results = pd.concat(week_results, ignore_index=True)
-                        total_l_res = combined_results['L_RES'].sum()
-                        total_l_dom = combined_results['L_DOM'].sum()
-                        total_l_total = total_l_res + total_l_dom
-                        
-                        mmA.loc[:, 'l_res'] = total_l_res
-                        mmA.loc[:, 'l_dom'] = total_l_dom
-                        mmA.loc[:, 'l_total'] = total_l_total
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                    
-                elif dyf_max_t == 0 and ciclo not in ['COMPLETO']:
-                    # Employee doesn't work any Sunday - force all Sundays with L
-                    mmA.loc[:, 'l_total'] = mmA['l_total'].iloc[0] - mmA['l_dom'].iloc[0]
-                    mmA.loc[:, 'l_dom'] = 0
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                    
-                    # Update calendar matrix with domYfes with L
-                    new_c = matriz2_bk[matriz2_bk['COLABORADOR'] == colab].copy()
-                    new_c.loc[(new_c['DIA_TIPO'] == 'domYf') & (new_c['HORARIO'] != 'V'), 'HORARIO'] = 'L_DOM'
-                    
-                    matriz2_bk = matriz2_bk[matriz2_bk['COLABORADOR'] != colab]
-                    matriz2_bk = pd.concat([matriz2_bk, new_c], ignore_index=True)
-                    
-                elif ciclo in ['SIN DYF']:
-                    # Special cycle: only assign Sundays and LD
-                    mmA.loc[:, 'c2d'] = mmA['c2d'].iloc[0] - mmA['c3d'].iloc[0]
-                    mmA.loc[:, 'l_total'] = (mmA['l_dom'].iloc[0] + mmA['l_d'].iloc[0] + 
-                                            mmA['c2d'].iloc[0] + mmA['cxx'].iloc[0])
-                    mmA.loc[:, 'l_q'] = 0
-                    mmA.loc[:, 'l_qs'] = 0
-                    mmA.loc[:, 'c3d'] = 0
-                    mmA.loc[:, 'l_res'] = 0
-                    mmA.loc[:, 'vz'] = 0
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                
-                # Handle COMPLETO cycle - reset all L values
-                if ciclo == 'COMPLETO':
-                    # Reset all columns from position 9 onwards to 0
-                    cols_to_reset = mmA.columns[8:]  # Assuming position 9 is index 8
-                    mmA.loc[:, cols_to_reset] = 0
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                
-                # Handle CXX for 4/5 day contracts
-                if (tipo_contrato in [4, 5] and mmA['cxx'].iloc[0] > 0 and 
-                    ciclo not in ['SIN DYF', 'COMPLETO']):
-                    
-                    mmA.loc[:, 'l_res2'] = mmA['l_res'].iloc[0] - mmA['cxx'].iloc[0]
-                    mmA.loc[:, 'l_res'] = mmA['cxx'].iloc[0]
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-                else:
-                    mmA.loc[:, 'l_res2'] = 0
-                    
-                    # Update matrizA_bk
-                    matrizA_bk = matrizA_bk[matrizA_bk['matricula'] != colab]
-                    matrizA_bk = pd.concat([matrizA_bk, mmA], ignore_index=True)
-            
-            # Final cleanup of matrizA_bk
-            matrizA_bk = matrizA_bk.drop('dyf_max_t', axis=1, errors='ignore')
-            matrizA_bk = matrizA_bk.reset_index(drop=True)
-            
-            # Initialize logs
-            logs = None
-            
-            # Update matriz2_bk HORARIO: L_ -> L_DOM for domYf
-            matriz2_bk.loc[(matriz2_bk['DIA_TIPO'] == 'domYf') & 
-                        (matriz2_bk['HORARIO'] == 'L_'), 'HORARIO'] = 'L_DOM'
-            
-            #CRIAR MATRIZ_B--------------------------------------------------
-            
-            # Calculate +H (working hours) for morning shifts
-            trab_manha_data = []
-            for data in matriz2_bk['DATA'].unique():
-                if data == 'TIPO_DIA':
-                    continue
-                    
-                day_data = matriz2_bk[(matriz2_bk['DATA'] == data) & 
-                                    (matriz2_bk['COLABORADOR'] != 'TIPO_DIA')].copy()
-                
-                # Group by COLABORADOR to analyze each employee's day
-                employee_counts = []
-                for colab in day_data['COLABORADOR'].unique():
-                    colab_data = day_data[day_data['COLABORADOR'] == colab]
-                    
-                    # Check if employee has M shift with H or NL
-                    has_m = ((colab_data['TIPO_TURNO'] == 'M') & 
-                            (colab_data['HORARIO'].str.contains('H|NL', case=False, na=False))).any()
-                    
-                    # Check if employee has T shift with H or NL  
-                    has_t = ((colab_data['TIPO_TURNO'] == 'T') & 
-                            (colab_data['HORARIO'].str.contains('H|NL', case=False, na=False))).any()
-                    
-                    # Calculate weight: 1 if only M, 0.5 if both M and T, 0 if no M
-                    if has_m and has_t:
-                        m_count = 0.5
-                    elif has_m:
-                        m_count = 1.0
-                    else:
-                        m_count = 0.0
-                        
-                    employee_counts.append(m_count)
-                
-                trab_manha_data.append({
-                    'DATA': data,
-                    'TURNO': 'M',
-                    '+H': sum(employee_counts)
-                })
-            
-            trab_manha = pd.DataFrame(trab_manha_data)
-            
-            # Calculate +H for afternoon shifts
-            trab_tarde_data = []
-            for data in matriz2_bk['DATA'].unique():
-                if data == 'TIPO_DIA':
-                    continue
-                    
-                day_data = matriz2_bk[(matriz2_bk['DATA'] == data) & 
-                                    (matriz2_bk['COLABORADOR'] != 'TIPO_DIA')].copy()
-                
-                # Group by COLABORADOR to analyze each employee's day
-                employee_counts = []
-                for colab in day_data['COLABORADOR'].unique():
-                    colab_data = day_data[day_data['COLABORADOR'] == colab]
-                    
-                    # Check if employee has T shift with H or NL (this is the main shift for afternoon)
-                    has_m = ((colab_data['TIPO_TURNO'] == 'T') & 
-                            (colab_data['HORARIO'].str.contains('H|NL', case=False, na=False))).any()
-                    
-                    # Check if employee has M shift with H or NL  
-                    has_t = ((colab_data['TIPO_TURNO'] == 'M') & 
-                            (colab_data['HORARIO'].str.contains('H|NL', case=False, na=False))).any()
-                    
-                    # Calculate weight: 1 if only T, 0.5 if both M and T, 0 if no T
-                    if has_m and has_t:
-                        m_count = 0.5
-                    elif has_m:
-                        m_count = 1.0
-                    else:
-                        m_count = 0.0
-                        
-                    employee_counts.append(m_count)
-                
-                trab_tarde_data.append({
-                    'DATA': data,
-                    'TURNO': 'T', 
-                    '+H': sum(employee_counts)
-                })
-            
-            trab_tarde = pd.DataFrame(trab_tarde_data)
-            
-            # Merge +H with matrizB for morning
-            matrizB_m = matrizB_ini[matrizB_ini['turno'] == 'M'].copy()
-            matrizB_m = matrizB_m.merge(trab_manha, left_on=['data', 'turno'], 
-                                    right_on=['DATA', 'TURNO'], how='left')
-            matrizB_m = matrizB_m.drop(['DATA', 'TURNO'], axis=1, errors='ignore')
-            
-            # Merge +H with matrizB for afternoon  
-            matrizB_t = matrizB_ini[matrizB_ini['turno'] == 'T'].copy()
-            matrizB_t = matrizB_t.merge(trab_tarde, left_on=['data', 'turno'],
-                                    right_on=['DATA', 'TURNO'], how='left')
-            matrizB_t = matrizB_t.drop(['DATA', 'TURNO'], axis=1, errors='ignore')
-            
-            # Combine morning and afternoon
-            matrizB_ini = pd.concat([matrizB_m, matrizB_t], ignore_index=True)
-            
-            # Get param_pess_obj from external data or set default
-            param_pess_obj = self.external_call_data.get('param_pessoas_objetivo', 0.5)
-            
-            # Calculate objective function and diff
-            matrizB_ini['max_turno'] = pd.to_numeric(matrizB_ini['max_turno'], errors='coerce')
-            matrizB_ini['min_turno'] = pd.to_numeric(matrizB_ini['min_turno'], errors='coerce')
-            matrizB_ini['sd_turno'] = pd.to_numeric(matrizB_ini['sd_turno'], errors='coerce')
-            matrizB_ini['media_turno'] = pd.to_numeric(matrizB_ini['media_turno'], errors='coerce')
-            matrizB_ini['+H'] = pd.to_numeric(matrizB_ini['+H'], errors='coerce').fillna(0)
-            
-            # Calculate aux (coefficient of variation)
-            matrizB_ini['aux'] = np.where(
-                matrizB_ini['media_turno'] != 0,
-                matrizB_ini['sd_turno'] / matrizB_ini['media_turno'],
-                0
-            )
-            
-            # Calculate pessObj (target people)
-            matrizB_ini['pess_obj'] = np.where(
-                matrizB_ini['aux'] >= param_pess_obj,
-                np.ceil(matrizB_ini['media_turno']),
-                np.round(matrizB_ini['media_turno'])
-            )
-            
-            # Calculate diff (difference between actual and target)
-            matrizB_ini['diff'] = matrizB_ini['+H'] - matrizB_ini['pess_obj']
-            
-            # Ensure min_turno is at least 1
-            matrizB_ini['min_turno'] = np.where(matrizB_ini['min_turno'] == 0, 1, matrizB_ini['min_turno'])
-            
-            # Create final matrizB
-            matrizB = matrizB_ini.copy()
-            
-            # Add weekday
-            matrizB['data'] = pd.to_datetime(matrizB['data'])
-            matrizB['WDAY'] = matrizB['data'].dt.dayofweek + 1
-            
-            # Create backup
-            matrizB_bk = matrizB.copy()
-            
-            # Calculate holiday work statistics
-            matrizA_bk_with_dyf = matrizA_bk.merge(
-                matrizA_bk_og[['matricula', 'dyf_max_t']], 
-                on='matricula', 
-                how='left'
-            )
-            
-            # Calculate festH (holiday work hours)
-            fest_h_data = []
-            for colab in matrizA_bk['matricula']:
-                colab_data = matriz2_bk[
-                    (matriz2_bk['COLABORADOR'] == colab) & 
-                    (matriz2_bk['DIA_TIPO'] == 'domYf') & 
-                    (matriz2_bk['WDAY'] != 1)
-                ].copy()
-                
-                if len(colab_data) > 0:
-                    # Group by DATA and check for work indicators
-                    daily_work = colab_data.groupby('DATA').agg({
-                        'HORARIO': lambda x: (x.str.contains('H|NL', case=False, na=False)).any()
-                    }).reset_index()
-                    daily_work.columns = ['DATA', 'dias_h']
-                    
-                    # Add OUT and DFS indicators
-                    out_dfs_data = colab_data.groupby('DATA').agg({
-                        'HORARIO': lambda x: ((x == 'OUT') | (x == 'DFS')).any()
-                    }).reset_index()
-                    out_dfs_data.columns = ['DATA', 'nl_out_dfs']
-                    
-                    daily_work = daily_work.merge(out_dfs_data, on='DATA', how='left')
-                    daily_work['dias_h'] = daily_work['dias_h'] | daily_work['nl_out_dfs']
-                    
-                    fest_h = daily_work['dias_h'].sum()
-                else:
-                    fest_h = 0
-                
-                fest_h_data.append({'matricula': colab, 'fest_h': fest_h})
-            
-            fest_h_df = pd.DataFrame(fest_h_data)
-            
-            # Merge with matrizA_bk
-            matrizA_bk = matrizA_bk.merge(fest_h_df, on='matricula', how='left')
-            matrizA_bk['fest_h'] = matrizA_bk['fest_h'].fillna(0)
-            
-            # Calculate minFestH based on DyF_MAX_T
-            def calculate_min_fest_h(row):
-                dyf_max_t = row['dyf_max_t'] if 'dyf_max_t' in row else 0
-                fest_h = row['fest_h']
-                
-                if dyf_max_t == 33:
-                    return round(fest_h * 0.6)
-                elif dyf_max_t == 22:
-                    return round(fest_h * 0.5)
-                elif dyf_max_t == 5:
-                    return round(fest_h * 0.3)
-                else:
-                    return 0
-            
-            matrizA_bk['min_fest_h'] = matrizA_bk.apply(calculate_min_fest_h, axis=1)
-            matrizA_bk['obj_fes'] = matrizA_bk['fest_h'] - matrizA_bk['min_fest_h']
-            
-            # Drop intermediate columns
-            matrizA_bk = matrizA_bk.drop(['fest_h', 'obj_fes'], axis=1, errors='ignore')
+            self.func_inicializa_report = pipeline.report_frame()
             
             self.logger.info("func_inicializa MatrizB creation completed successfully")
             
-            # Store final results in transformed_data
+            # Decode the shift codes at the output boundary
+            matriz2_bk = share(results['matriz2_bk'])
+            for col in ['TIPO_TURNO', 'HORARIO']:
+                matriz2_bk[col] = decode_shift_codes(matriz2_bk[col])
+            
+            # Store final results in transformed_data (the store shares the frames)
             self.medium_data.update({
-                'matrizA_bk': matrizA_bk.copy(),
-                'matriz2_bk': matriz2_bk.copy(), 
-                'matrizB_bk': matrizB_bk.copy(),
-                'tipos_de_turno': tipos_de_turno,
-                'matrizA': matrizA.copy(),
-                'matrizA_bk_og': matrizA_bk_og.copy(),
-                'matriz_data_turno_bk': matriz_data_turno_bk.copy(),
-                'logs': logs
+                'matrizA_bk': results['matrizA_bk'],
+                'matriz2_bk': matriz2_bk, 
+                'matrizB_bk': results['matrizB_bk'],
+                'tipos_de_turno': results['tipos_de_turno'],
+                'matrizA': results['matrizA'],
+                'matrizA_bk_og': results['matrizA_bk_og'],
+                'matriz_data_turno_bk': results['matriz_data_turno_bk'],
+                'logs': results['logs']
             })
             
             self.logger.info("func_inicializa completed successfully")
@@ -2507,6 +1469,26 @@ class DescansosDataModel(BaseDataModel):
             self.logger.error(f"Error in func_inicializa: {str(e)}", exc_info=True)
             return False
         
+    def log_memory_usage(self, label: Optional[str] = None) -> pd.DataFrame:
+        """
+        Log the memory held by raw_data, auxiliary_data and medium_data.
+
+        Args:
+            label: Context of the report (e.g. the posto)
+
+        Returns:
+            DataFrame with the nominal and stored size of each frame (see src.frame_store.frame_memory)
+        """
+        try:
+            return log_frame_memory({
+                'raw_data': self.raw_data,
+                'auxiliary_data': self.auxiliary_data,
+                'medium_data': self.medium_data,
+            }, label=label)
+        except Exception as e:
+            self.logger.error(f"Error computing memory usage: {str(e)}")
+            return pd.DataFrame()
+
     def validate_func_inicializa(self) -> bool:
         """
         Validates func_inicializa operations. Validates data before running the allocation cycle.
@@ -0,0 +1,358 @@
+"""
+On-disk archive of past schedules (df_calendario_passado) for the DescansosDataModel.
+Columnar, memory-mapped storage keyed by (employee, date) and appended incrementally after each run.
+
+The archive is meant for immutable history: rows excluded or corrected in the database after
+they were archived keep being served from disk until the archive expires (max_age_days).
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import contextlib
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+# Local stuff
+from src.config import PROJECT_NAME
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+# Archive layout: <archive_dir>/columns.json and <archive_dir>/chunk_<created ns>_<id>/ with one
+# <column>.npy per column plus the coverage.npz added by that chunk
+COLUMNS_FILE = 'columns.json'
+COVERAGE_FILE = 'coverage.npz'
+LOCK_FILE = '.lock'
+CHUNK_PREFIX = 'chunk_'
+
+# Seconds to wait for the writer lock, and age after which a lock is considered left behind by a dead process
+LOCK_TIMEOUT = 60
+LOCK_STALE_AFTER = 600
+
+
+class ScheduleArchive:
+    """
+    Memory-mapped columnar archive of past schedule rows.
+
+    Each append writes a new, uniquely named chunk with one .npy file per column and the
+    coverage it adds: per employee, the contiguous date range that is fully archived. Only
+    dates inside the coverage are served from disk and everything else still has to be
+    queried from the database. A chunk (rows and coverage) becomes visible atomically, and
+    appends run under a lock file, so concurrent runs (e.g. two postos) never overwrite
+    each other's chunks nor archive the same days twice.
+    """
+
+    def __init__(self, archive_dir: str, key_column: str = 'fk_colaborador', date_column: str = 'schedule_day',
+                 max_age_days: Optional[float] = None):
+        """
+        Open (or prepare) an archive directory.
+
+        Args:
+            archive_dir: Directory of the archive (created on the first append)
+            key_column: Employee key column of the schedule rows
+            date_column: Date column of the schedule rows
+            max_age_days: Discard the whole archive once its oldest chunk is older than this
+                (None keeps it forever), so later corrections in the database are picked up
+        """
+        self.archive_dir = archive_dir
+        self.key_column = key_column
+        self.date_column = date_column
+        self.max_age_days = max_age_days
+        self.columns: Dict[str, str] = {}
+        self.coverage: Dict[int, Tuple[np.datetime64, np.datetime64]] = {}
+        if self._expired():
+            self.clear()
+        self._load_metadata()
+
+    def _load_metadata(self) -> None:
+        """Load the column kinds and merge the coverage of every chunk, if the archive exists."""
+        self.columns = {}
+        columns_path = os.path.join(self.archive_dir, COLUMNS_FILE)
+        if os.path.exists(columns_path):
+            with open(columns_path, 'r', encoding='utf-8') as f:
+                self.columns = json.load(f)
+
+        self.coverage = {}
+        for chunk_dir in self._chunk_dirs():
+            coverage_path = os.path.join(chunk_dir, COVERAGE_FILE)
+            if not os.path.exists(coverage_path):
+                continue
+            with np.load(coverage_path) as data:
+                for key, start, end in zip(data['key'], data['covered_from'], data['covered_to']):
+                    covered = self.coverage.get(int(key))
+                    if covered is not None:
+                        start, end = min(covered[0], start), max(covered[1], end)
+                    self.coverage[int(key)] = (start, end)
+
+    def _chunk_dirs(self) -> List[str]:
+        """Chunk directories in append order (chunk names start with their creation time)."""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(
+            os.path.join(self.archive_dir, name) for name in os.listdir(self.archive_dir)
+            if name.startswith(CHUNK_PREFIX) and not name.endswith('.tmp')
+        )
+
+    def _expired(self) -> bool:
+        """Whether the oldest chunk is older than max_age_days."""
+        if self.max_age_days is None:
+            return False
+        chunk_dirs = self._chunk_dirs()
+        if not chunk_dirs:
+            return False
+        try:
+            created_ns = int(os.path.basename(chunk_dirs[0])[len(CHUNK_PREFIX):].split('_')[0])
+        except ValueError:
+            return True
+        return (time.time_ns() - created_ns) / 1e9 > self.max_age_days * 86400
+
+    def clear(self) -> None:
+        """Remove every archived row and the coverage."""
+        if not os.path.isdir(self.archive_dir):
+            return
+        with self._locked():
+            for name in os.listdir(self.archive_dir):
+                path = os.path.join(self.archive_dir, name)
+                if name.startswith(CHUNK_PREFIX):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif name == COLUMNS_FILE:
+                    os.remove(path)
+        self.columns = {}
+        self.coverage = {}
+        logger.info(f"Schedule archive {self.archive_dir} cleared")
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the archive writer lock (an exclusively created lock file, portable across platforms)."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        lock_path = os.path.join(self.archive_dir, LOCK_FILE)
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_AFTER:
+                        logger.warning(f"Removing stale schedule archive lock {lock_path}")
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock the schedule archive {self.archive_dir}")
+                time.sleep(0.1)
+        try:
+            os.write(fd, str(os.getpid()).encode('utf-8'))
+            os.close(fd)
+            yield
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(lock_path)
+
+    @staticmethod
+    def _to_day(value: Any) -> np.datetime64:
+        """Convert a date-like value to a datetime64[D] day."""
+        return np.datetime64(pd.to_datetime(value).date(), 'D')
+
+    def first_missing_date(self, employees: List[Any], start_date: Any, end_date: Any) -> pd.Timestamp:
+        """
+        Get the first date that still has to be queried for a set of employees.
+
+        Dates from start_date up to the day before the returned date are fully archived
+        for every employee in the list.
+
+        Args:
+            employees: Employee keys
+            start_date: First date of the requested period
+            end_date: Last date of the requested period
+
+        Returns:
+            First date to query from the database (end_date + 1 day if nothing is missing)
+        """
+        start = self._to_day(start_date)
+        end = self._to_day(end_date)
+        first_missing = end + 1
+        for key in employees:
+            covered = self.coverage.get(int(key))
+            if covered is not None and covered[0] <= start <= covered[1]:
+                first_missing = min(first_missing, covered[1] + 1)
+            else:
+                first_missing = start
+                break
+        return pd.Timestamp(max(first_missing, start))
+
+    def read(self, employees: List[Any], start_date: Any, end_date: Any) -> pd.DataFrame:
+        """
+        Read the archived rows of a set of employees in a date range.
+
+        The chunk files are memory-mapped, so only the selected rows are materialized.
+
+        Args:
+            employees: Employee keys
+            start_date: First date to read
+            end_date: Last date to read
+
+        Returns:
+            DataFrame with the archived rows (empty if nothing is archived in the range)
+        """
+        start = self._to_day(start_date)
+        end = self._to_day(end_date)
+        if end < start or not self.columns:
+            return pd.DataFrame(columns=list(self.columns))
+
+        # Readable range per employee: requested range intersected with its coverage
+        keys, lower, upper = [], [], []
+        for key in employees:
+            covered = self.coverage.get(int(key))
+            if covered is not None:
+                keys.append(int(key))
+                lower.append(max(start, covered[0]))
+                upper.append(min(end, covered[1]))
+        if not keys:
+            return pd.DataFrame(columns=list(self.columns))
+        keys = np.array(keys, dtype=np.int64)
+        order = np.argsort(keys)
+        keys, lower, upper = keys[order], np.array(lower)[order], np.array(upper)[order]
+
+        parts = []
+        for chunk_dir in self._chunk_dirs():
+            key_path = os.path.join(chunk_dir, f'{self.key_column}.npy')
+            if not os.path.exists(key_path):
+                continue
+            chunk_keys = np.load(key_path, mmap_mode='r')
+            chunk_days = np.load(os.path.join(chunk_dir, f'{self.date_column}.npy'), mmap_mode='r')
+            pos = np.clip(np.searchsorted(keys, chunk_keys), 0, len(keys) - 1)
+            selected = (keys[pos] == chunk_keys) & (chunk_days >= lower[pos]) & (chunk_days <= upper[pos])
+            if not selected.any():
+                continue
+            parts.append({
+                column: np.load(os.path.join(chunk_dir, f'{column}.npy'), mmap_mode='r')[selected]
+                for column in self.columns
+            })
+
+        if not parts:
+            return pd.DataFrame(columns=list(self.columns))
+        data = {column: np.concatenate([part[column] for part in parts]) for column in self.columns}
+        return self._decode(data)
+
+    def append(self, df: pd.DataFrame, employees: List[Any], query_start: Any, until_date: Any) -> int:
+        """
+        Archive the rows of a database query and extend the coverage of the employees that came back.
+
+        Only rows from query_start up to until_date (past days that will not change anymore)
+        are archived, and rows already inside an employee's coverage are skipped. Coverage is
+        only extended for employees with rows in `df`: an empty or partial query result (e.g.
+        a failed query) never marks days as archived, so they are queried again next time.
+
+        Args:
+            df: Rows returned by the database for [query_start, ...]
+            employees: Employee keys that were queried
+            query_start: First date of the database query
+            until_date: Last date to archive
+
+        Returns:
+            Number of rows appended
+        """
+        start = self._to_day(query_start)
+        until = self._to_day(until_date)
+        if until < start or df is None or len(df) == 0:
+            return 0
+
+        with self._locked():
+            # Another run may have appended since this archive was opened
+            self._load_metadata()
+
+            rows_keys = df[self.key_column].astype(np.int64).to_numpy()
+            returned = set(np.unique(rows_keys).tolist())
+
+            # Employees whose coverage can be extended contiguously, and the last day already archived for each
+            skip_until = {}
+            for key in employees:
+                key = int(key)
+                if key not in returned:
+                    continue
+                covered = self.coverage.get(key)
+                if covered is None:
+                    skip_until[key] = start - 1
+                elif covered[0] <= start <= covered[1] + 1:
+                    skip_until[key] = covered[1]
+            if not skip_until:
+                return 0
+
+            rows_days = pd.to_datetime(df[self.date_column]).to_numpy().astype('datetime64[D]')
+            last_archived = np.array([skip_until.get(int(key), until) for key in rows_keys], dtype='datetime64[D]')
+            rows = df[(rows_days >= start) & (rows_days <= until) & (rows_days > last_archived)]
+
+            new_coverage = {}
+            for key, last_day in skip_until.items():
+                covered_from = self.coverage[key][0] if key in self.coverage else start
+                new_coverage[key] = (covered_from, max(until, last_day))
+            if not self._write_chunk(rows, new_coverage):
+                return 0
+            self.coverage.update(new_coverage)
+        return len(rows)
+
+    def _write_chunk(self, rows: pd.DataFrame, coverage: Dict[int, Tuple[np.datetime64, np.datetime64]]) -> bool:
+        """Write a new chunk with one .npy file per column and the coverage it adds (caller holds the lock)."""
+        columns = {column: self._kind_of(column, rows[column]) for column in rows.columns}
+        if self.columns and list(self.columns) != list(columns):
+            logger.warning(f"Schedule archive columns changed ({list(self.columns)} -> {list(columns)}), rows not archived")
+            return False
+
+        if not self.columns:
+            self.columns = columns
+            tmp_path = os.path.join(self.archive_dir, f'{COLUMNS_FILE}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.columns, f)
+            os.replace(tmp_path, os.path.join(self.archive_dir, COLUMNS_FILE))
+
+        chunk_dir = os.path.join(self.archive_dir, f'{CHUNK_PREFIX}{time.time_ns():020d}_{uuid.uuid4().hex[:8]}')
+        tmp_dir = f'{chunk_dir}.tmp'
+        os.makedirs(tmp_dir)
+        for column, kind in self.columns.items():
+            np.save(os.path.join(tmp_dir, f'{column}.npy'), self._encode(rows[column], kind))
+        keys = np.array(list(coverage), dtype=np.int64)
+        np.savez(os.path.join(tmp_dir, COVERAGE_FILE), key=keys,
+                 covered_from=np.array([coverage[key][0] for key in keys], dtype='datetime64[D]'),
+                 covered_to=np.array([coverage[key][1] for key in keys], dtype='datetime64[D]'))
+        os.replace(tmp_dir, chunk_dir)
+        return True
+
+    def _kind_of(self, column: str, values: pd.Series) -> str:
+        """Storage kind of a column: key, date, integer, number or text."""
+        if column == self.key_column:
+            return 'key'
+        if column == self.date_column or pd.api.types.is_datetime64_any_dtype(values):
+            return 'date'
+        if pd.api.types.is_integer_dtype(values):
+            return 'integer'
+        if pd.api.types.is_numeric_dtype(values):
+            return 'number'
+        return 'text'
+
+    @staticmethod
+    def _encode(values: pd.Series, kind: str) -> np.ndarray:
+        """Convert a column to a fixed-width NumPy array that can be memory-mapped."""
+        if kind in ('key', 'integer'):
+            return values.astype(np.int64).to_numpy()
+        if kind == 'date':
+            return pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+        if kind == 'number':
+            return values.astype(np.float64).to_numpy()
+        return np.array(['' if pd.isna(value) else str(value) for value in values], dtype=str)
+
+    def _decode(self, data: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Build a DataFrame from archived arrays, restoring missing text values."""
+        df = pd.DataFrame({column: np.asarray(values) for column, values in data.items()})
+        for column, kind in self.columns.items():
+            if kind == 'date':
+                df[column] = pd.to_datetime(df[column])
+            elif kind == 'text':
+                df[column] = df[column].astype(object).where(df[column] != '', None)
+        return df
@@ -0,0 +1,297 @@
+"""
+Schedule matrix container for the DescansosDataModel calendar.
+Indexed NumPy representation of the wide `reshaped_final_3` calendar used by the helpers.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+# Local stuff
+from src.config import PROJECT_NAME
+from src.shift_codes import encode_shift_codes
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+# Labels of the rows that describe the calendar columns instead of an employee
+HEADER_LABELS = ('Dia', 'TURNO', 'TIPO_DIA')
+
+
+def normalize_date_key(value: Any) -> str:
+    """
+    Normalize a date value to the 'YYYY-MM-DD' key used in the 'Dia' header row.
+
+    Args:
+        value: Date as string, datetime or Timestamp
+
+    Returns:
+        Date string with the first 10 characters (YYYY-MM-DD format)
+    """
+    return str(value)[:10]
+
+
+class ScheduleMatrix:
+    """
+    Employees x date-shift slots calendar backed by NumPy object arrays.
+
+    The wide DataFrame layout (`reshaped_final_3`) has the row labels in column 0,
+    the header rows ('Dia', 'TURNO' and optionally 'TIPO_DIA') on top and one row per
+    employee below them, with two columns (M and T) per date. This class keeps the
+    header rows as metadata and the employee cells in a dense `values` array, with
+    hash indexes from date to its (M, T) slot pair and from matricula to its row,
+    so that cells and slices can be located and assigned in O(1).
+    """
+
+    def __init__(self, headers: Dict[str, np.ndarray], employees: List[Any], values: np.ndarray):
+        """
+        Build the matrix from already split header rows and employee rows.
+
+        Args:
+            headers: Ordered mapping from header label to its slot values
+            employees: Employee row labels (matriculas)
+            values: Object array with shape (len(employees), number of slots)
+        """
+        self.headers = {label: np.asarray(row, dtype=object) for label, row in headers.items()}
+        self.employees = list(employees)
+        values = np.asarray(values, dtype=object)
+        if values.ndim != 2:
+            values = values.reshape(len(self.employees), -1)
+        self.values = values
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        """Build the date -> (M, T) slot pair and matricula -> row hash indexes."""
+        self._date_index: Dict[str, Tuple[int, int]] = {}
+        dia_row = self.headers.get('Dia')
+        if dia_row is not None:
+            first_slot: Dict[str, int] = {}
+            for slot, day in enumerate(dia_row):
+                key = normalize_date_key(day)
+                if key in self._date_index:
+                    continue
+                if key in first_slot:
+                    self._date_index[key] = (first_slot[key], slot)
+                else:
+                    first_slot[key] = slot
+
+        self._row_index: Dict[Any, int] = {}
+        for row, label in enumerate(self.employees):
+            self._row_index.setdefault(label, row)
+            self._row_index.setdefault(str(label), row)
+
+    @classmethod
+    def from_frame(cls, reshaped_final_3: pd.DataFrame) -> 'ScheduleMatrix':
+        """
+        Build a ScheduleMatrix from the wide calendar DataFrame.
+
+        Args:
+            reshaped_final_3: Schedule matrix DataFrame (labels in the first column)
+
+        Returns:
+            ScheduleMatrix with the same content
+        """
+        arr = reshaped_final_3.to_numpy(dtype=object, copy=True)
+        if arr.shape[0] == 0:
+            return cls({}, [], np.empty((0, max(arr.shape[1] - 1, 0)), dtype=object))
+
+        labels = arr[:, 0]
+        n_headers = 0
+        while n_headers < len(labels) and labels[n_headers] in HEADER_LABELS:
+            n_headers += 1
+
+        headers = {labels[i]: arr[i, 1:] for i in range(n_headers)}
+        return cls(headers, labels[n_headers:].tolist(), arr[n_headers:, 1:])
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Convert back to the wide calendar DataFrame layout.
+
+        Returns:
+            DataFrame with header rows on top, employee rows below and numeric column names
+        """
+        n_rows = len(self.headers) + len(self.employees)
+        arr = np.empty((n_rows, self.n_slots + 1), dtype=object)
+
+        for i, (label, row) in enumerate(self.headers.items()):
+            arr[i, 0] = label
+            arr[i, 1:] = row
+
+        offset = len(self.headers)
+        arr[offset:, 0] = self.employees
+        arr[offset:, 1:] = self.values
+
+        return pd.DataFrame(arr, columns=range(arr.shape[1]))
+
+    def to_long(self, dtype: Optional[pd.CategoricalDtype] = None) -> pd.DataFrame:
+        """
+        Convert to the long (COLABORADOR, DATA, TURNO, TIPO_TURNO) layout used by func_inicializa.
+
+        Rows follow the order of melting the wide frame (slot by slot, then row by row), without
+        the 'Dia' and 'TURNO' header rows.
+
+        Args:
+            dtype: Shift code dtype of TIPO_TURNO (built from the cell values if None)
+
+        Returns:
+            DataFrame with a datetime DATA column and categorical TURNO and TIPO_TURNO columns
+        """
+        header_labels = [label for label in self.headers if label not in ('Dia', 'TURNO')]
+        labels = np.array(header_labels + self.employees, dtype=object)
+        block = np.vstack([self.headers[label][None, :] for label in header_labels] + [self.values])
+
+        dia_row = self.headers.get('Dia', np.full(self.n_slots, None, dtype=object))
+        turno_row = self.headers.get('TURNO', np.full(self.n_slots, None, dtype=object))
+        dates = pd.to_datetime(pd.Series(dia_row, dtype=object).astype(str).str[:10], errors='coerce')
+
+        return pd.DataFrame({
+            'COLABORADOR': np.tile(labels, self.n_slots),
+            'DATA': np.repeat(dates.to_numpy(), len(labels)),
+            'TURNO': pd.Categorical(np.repeat(turno_row, len(labels))),
+            'TIPO_TURNO': encode_shift_codes(pd.Series(block.T.ravel(), dtype=object), dtype),
+        })
+
+    @property
+    def n_slots(self) -> int:
+        """Number of date-shift slots (columns without the label column)."""
+        return self.values.shape[1]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape of the employee cells array (employees, slots)."""
+        return self.values.shape
+
+    @property
+    def dates(self) -> List[str]:
+        """Dates present in the calendar, in column order."""
+        return list(self._date_index.keys())
+
+    def row_of(self, matricula: Any) -> Optional[int]:
+        """
+        Get the row of an employee.
+
+        Args:
+            matricula: Employee row label
+
+        Returns:
+            Row position in `values`, or None if the employee is not in the matrix
+        """
+        row = self._row_index.get(matricula)
+        if row is None:
+            row = self._row_index.get(str(matricula))
+        return row
+
+    def slots_of(self, date: Any) -> Optional[Tuple[int, int]]:
+        """
+        Get the (M, T) slot pair of a date.
+
+        Args:
+            date: Date as string, datetime or Timestamp
+
+        Returns:
+            Tuple with the M and T slot positions in `values`, or None if the date is not in the matrix
+        """
+        return self._date_index.get(normalize_date_key(date))
+
+    def rows_of(self, matriculas: Iterable[Any]) -> np.ndarray:
+        """
+        Vectorized version of `row_of`.
+
+        Args:
+            matriculas: Employee row labels
+
+        Returns:
+            Array of row positions, -1 where the employee is not in the matrix
+        """
+        rows = [self.row_of(matricula) for matricula in matriculas]
+        return np.array([-1 if row is None else row for row in rows], dtype=np.int64)
+
+    def slot_pairs_of(self, dates: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized version of `slots_of`.
+
+        Args:
+            dates: Dates as strings, datetimes or Timestamps
+
+        Returns:
+            Tuple of arrays with the M and T slot positions, -1 where the date is not in the matrix
+        """
+        pairs = [self._date_index.get(normalize_date_key(date), (-1, -1)) for date in dates]
+        if not pairs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pairs = np.array(pairs, dtype=np.int64)
+        return pairs[:, 0], pairs[:, 1]
+
+    def set_day(self, matricula: Any, date: Any, value: Any) -> bool:
+        """
+        Assign a value to both shift slots of an employee on a date.
+
+        Args:
+            matricula: Employee row label
+            date: Date of the assignment
+            value: Value to assign
+
+        Returns:
+            True if the cell exists and was assigned, False otherwise
+        """
+        row = self.row_of(matricula)
+        slots = self.slots_of(date)
+        if row is None or slots is None:
+            return False
+        self.values[row, slots[0]] = value
+        self.values[row, slots[1]] = value
+        return True
+
+    def set_header_day(self, label: str, date: Any, value: Any) -> bool:
+        """
+        Assign a value to both shift slots of a header row on a date.
+
+        Args:
+            label: Header row label (e.g. 'TIPO_DIA')
+            date: Date of the assignment
+            value: Value to assign
+
+        Returns:
+            True if the header row and date exist and were assigned, False otherwise
+        """
+        slots = self.slots_of(date)
+        if label not in self.headers or slots is None:
+            return False
+        self.headers[label][slots[0]:slots[1] + 1] = value
+        return True
+
+    def insert_header(self, label: str, fill_value: Any = '-', position: Optional[int] = None) -> None:
+        """
+        Insert a new header row, keeping the header order.
+
+        Args:
+            label: Header row label
+            fill_value: Initial value of every slot
+            position: Position among the header rows (appended at the end if None)
+        """
+        items = list(self.headers.items())
+        new_item = (label, np.full(self.n_slots, fill_value, dtype=object))
+        if position is None:
+            items.append(new_item)
+        else:
+            items.insert(position, new_item)
+        self.headers = dict(items)
+
+    def append_rows(self, employees: List[Any], values: np.ndarray) -> None:
+        """
+        Append a block of employee rows in one operation.
+
+        Args:
+            employees: Row labels of the new rows
+            values: Object array with shape (len(employees), number of slots)
+        """
+        if len(employees) == 0:
+            return
+        block = np.asarray(values, dtype=object).reshape(len(employees), self.n_slots)
+        start = len(self.employees)
+        self.values = np.vstack([self.values, block])
+        self.employees.extend(employees)
+        for offset, label in enumerate(employees):
+            self._row_index.setdefault(label, start + offset)
+            self._row_index.setdefault(str(label), start + offset)
@@ -294,6 +294,7 @@ class AlgoritmoGDService(BaseService):
                         progress=(progress+0.4)/len(posto_id_list),
                         message="Valid func_inicializa, advancing to the next substage"
                     )
+                self.data.log_memory_usage(f"posto {posto_id}")
 
                 # SUBSTAGE 4: allocation_cycle
                 if self.stage_handler:
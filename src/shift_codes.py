@@ -0,0 +1,78 @@
+"""
+Shift code symbol table for the DescansosDataModel calendar.
+Compact categorical (int8) encoding of the schedule cell codes used by the calendar and matriz2.
+"""
+
+import pandas as pd
+from typing import Any, Iterable, Optional
+
+# Local stuff
+from src.config import PROJECT_NAME
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+# Known schedule cell codes (shifts, days off, absences and the 0 written by create_m0_0t)
+SHIFT_CODES = (
+    0, '-',
+    'M', 'T', 'T1', 'T2', 'MoT', 'P', 'H',
+    'L', 'L_', 'L_DOM', 'LD', 'LQ', 'LRES', 'C', 'CXX',
+    'F', 'V', 'A', 'AP', 'NL', 'NL2D', 'NL3D', 'OUT', 'DFS',
+)
+
+
+def shift_code_dtype(values: Optional[Iterable[Any]] = None) -> pd.CategoricalDtype:
+    """
+    Build the categorical dtype of the shift codes.
+
+    The categories are the known SHIFT_CODES plus any other value found in `values`
+    (e.g. absence types loaded from the database), sorted by their string form so that
+    sorting an encoded column gives the same order as sorting the plain strings.
+
+    Args:
+        values: Optional cell values that must be representable by the dtype
+
+    Returns:
+        CategoricalDtype with int8 codes for up to 127 symbols
+    """
+    symbols = set(SHIFT_CODES)
+    if values is not None:
+        symbols.update(value for value in pd.unique(pd.Series(values, dtype=object)) if not pd.isna(value))
+    return pd.CategoricalDtype(categories=sorted(symbols, key=str), ordered=False)
+
+
+def encode_shift_codes(values: Any, dtype: Optional[pd.CategoricalDtype] = None) -> pd.Series:
+    """
+    Encode schedule cell codes as a categorical Series.
+
+    Args:
+        values: Series or array-like with the cell codes
+        dtype: Shift code dtype to use (built from `values` if None)
+
+    Returns:
+        Categorical Series with the same index as `values` (if it is a Series)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if dtype is None:
+        dtype = shift_code_dtype(series)
+    unknown = ~series.isin(dtype.categories) & series.notna()
+    if unknown.any():
+        logger.warning(f"Shift codes not in the symbol table were set to missing: {series[unknown].unique().tolist()}")
+    return series.astype(dtype)
+
+
+def decode_shift_codes(values: pd.Series) -> pd.Series:
+    """
+    Decode a categorical shift code Series back to plain Python values.
+
+    Args:
+        values: Categorical (or already decoded) Series
+
+    Returns:
+        Object Series with the original cell values
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype(object)
+    return values
+
@@ -0,0 +1,333 @@
+"""
+Step pipeline used to run long data transformations (e.g. func_inicializa) as named steps.
+Each step is timed, its memory reported, and its outputs can be cached in memory or on disk
+so that a re-run resumes from the first step whose code or inputs changed.
+"""
+
+import os
+import sys
+import glob
+import time
+import pickle
+import hashlib
+import inspect
+import tracemalloc
+import types
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+
+# Local stuff
+from src.config import PROJECT_NAME
+from base_data_project.log_config import get_logger
+
+# Set up logger
+logger = get_logger(PROJECT_NAME)
+
+CACHE_MODES = (None, 'memory', 'disk')
+
+
+class PipelineStep:
+    """
+    A named step of a StepPipeline.
+
+    The step function is called with the `inputs` as keyword arguments (taken from the
+    pipeline context) and must return a dict with exactly the `outputs` keys.
+    """
+
+    def __init__(self, name: str, func: Callable[..., Dict[str, Any]], inputs: List[str], outputs: List[str]):
+        """
+        Args:
+            name: Step name (used in logs, reports and cache file names)
+            func: Step function
+            inputs: Context keys passed to the function
+            outputs: Context keys returned by the function
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    def code_fingerprint(self) -> str:
+        """
+        Fingerprint of the step code, so that editing a step or a helper it uses invalidates its cache.
+
+        Covers the source of the step function, of its module and of every module of the same
+        package reachable from it through module globals (e.g. src.helpers for the
+        func_inicializa steps).
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha1()
+        try:
+            digest.update(inspect.getsource(self.func).encode('utf-8'))
+        except (OSError, TypeError):
+            digest.update(repr(self.func).encode('utf-8'))
+        for module in _package_modules(inspect.getmodule(self.func)):
+            digest.update(module.__name__.encode('utf-8'))
+            try:
+                digest.update(inspect.getsource(module).encode('utf-8'))
+            except (OSError, TypeError):
+                digest.update(repr(module).encode('utf-8'))
+        return digest.hexdigest()
+
+
+def _package_modules(module: Optional[types.ModuleType]) -> List[types.ModuleType]:
+    """
+    A module and the modules of its top-level package it reaches through its globals, recursively.
+
+    Args:
+        module: Starting module (None for functions without one)
+
+    Returns:
+        Modules sorted by name
+    """
+    if module is None:
+        return []
+    package = module.__name__.split('.')[0]
+    found = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found:
+            continue
+        found[current.__name__] = current
+        for value in vars(current).values():
+            if isinstance(value, types.ModuleType):
+                referenced = value
+            else:
+                referenced = sys.modules.get(getattr(value, '__module__', None) or '')
+            if referenced is not None and referenced.__name__.split('.')[0] == package:
+                pending.append(referenced)
+    return [found[name] for name in sorted(found)]
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Content fingerprint of a pipeline context value.
+
+    DataFrames and Series are hashed by content (values, index, columns and dtypes), plain
+    containers recursively and anything else by its pickled bytes.
+
+    Args:
+        value: Value to fingerprint
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha1()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(type(value).__name__.encode('utf-8'))
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode('utf-8'))
+            digest.update(repr(value.dtypes.astype(str).tolist()).encode('utf-8'))
+        else:
+            digest.update(repr((value.name, str(value.dtype))).encode('utf-8'))
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Unhashable cells (e.g. lists)
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    elif isinstance(value, dict):
+        for key in value:
+            digest.update(repr(key).encode('utf-8'))
+            digest.update(fingerprint(value[key]).encode('utf-8'))
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode('utf-8'))
+        for item in value:
+            digest.update(fingerprint(item).encode('utf-8'))
+    elif value is None or isinstance(value, (str, int, float, bool, np.generic, pd.Timestamp)):
+        digest.update(repr(value).encode('utf-8'))
+    else:
+        try:
+            digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            digest.update(repr(value).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def memory_size(value: Any) -> int:
+    """Approximate size in bytes of a pipeline value (deep size for pandas objects)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(memory_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(memory_size(item) for item in value)
+    return 0
+
+
+class StepPipeline:
+    """
+    Runs a list of PipelineSteps over a shared context dict.
+
+    Caching: with cache_mode 'memory' or 'disk' the outputs of each step are stored (pickled)
+    under a key built from the step name, the step source and the fingerprints of its inputs.
+    Outputs of a step are fingerprinted through the key of the step that produced them, so
+    only the initial context is hashed by content. On a re-run every step up to the first one
+    whose code or inputs changed is loaded from the cache, and the remaining steps are run.
+    Only the latest entry of each step is kept. The code part of the key covers the modules of
+    the step package (see PipelineStep.code_fingerprint); changes to installed dependencies are
+    not detected, clear the cache after upgrading them.
+    """
+
+    def __init__(self, name: str, steps: List[PipelineStep], cache_mode: Optional[str] = None,
+                 cache_dir: Optional[str] = None, memory_cache: Optional[Dict[str, Any]] = None,
+                 track_memory: bool = False):
+        """
+        Args:
+            name: Pipeline name (used in logs)
+            steps: Steps, in execution order
+            cache_mode: None (no cache), 'memory' or 'disk'
+            cache_dir: Directory of the disk cache (required for 'disk')
+            memory_cache: Dict used as memory cache, pass the same dict between runs to reuse it
+            track_memory: Report the peak traced allocation of each step (tracemalloc, slower)
+        """
+        if cache_mode not in CACHE_MODES:
+            logger.warning(f"Unknown cache mode {cache_mode!r} for pipeline {name}, running without cache")
+            cache_mode = None
+        if cache_mode == 'disk' and not cache_dir:
+            logger.warning(f"No cache directory set for pipeline {name}, running without cache")
+            cache_mode = None
+        self.name = name
+        self.steps = steps
+        self.cache_mode = cache_mode
+        self.cache_dir = cache_dir
+        self.memory_cache = memory_cache if memory_cache is not None else {}
+        self.track_memory = track_memory
+        self.report: List[Dict[str, Any]] = []
+
+    def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the steps in order.
+
+        Args:
+            context: Initial values (every input of a step must be either here or an output of an earlier step)
+
+        Returns:
+            Context with the initial values and the outputs of every step
+        """
+        context = dict(context)
+        self.report = []
+        fingerprints = {}
+        if self.cache_mode is not None:
+            fingerprints = {key: fingerprint(value) for key, value in context.items()}
+
+        started_tracing = False
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+
+        try:
+            for step in self.steps:
+                missing = [key for key in step.inputs if key not in context]
+                if missing:
+                    raise KeyError(f"Step {step.name} of pipeline {self.name} is missing inputs: {missing}")
+
+                start = time.perf_counter()
+                if self.track_memory:
+                    tracemalloc.reset_peak()
+                    traced_before = tracemalloc.get_traced_memory()[0]
+
+                key = None
+                outputs = None
+                source = 'run'
+                if self.cache_mode is not None:
+                    key = self._step_key(step, fingerprints)
+                    outputs = self._load(step, key)
+                    if outputs is not None:
+                        source = self.cache_mode
+                if outputs is None:
+                    try:
+                        outputs = step.func(**{name: context[name] for name in step.inputs})
+                    except Exception as e:
+                        logger.error(f"Error in step {step.name} of pipeline {self.name}: {str(e)}")
+                        raise
+                    missing = [name for name in step.outputs if name not in outputs]
+                    if missing:
+                        raise KeyError(f"Step {step.name} of pipeline {self.name} did not return: {missing}")
+                    if self.cache_mode is not None:
+                        self._store(step, key, outputs)
+                elapsed = time.perf_counter() - start
+                peak_mb = None
+                if self.track_memory:
+                    peak_mb = (tracemalloc.get_traced_memory()[1] - traced_before) / 1024 ** 2
+
+                for name in step.outputs:
+                    context[name] = outputs[name]
+                    if key is not None:
+                        fingerprints[name] = hashlib.sha1(f'{key}:{name}'.encode('utf-8')).hexdigest()
+
+                output_mb = memory_size([outputs[name] for name in step.outputs]) / 1024 ** 2
+                self.report.append({
+                    'step': step.name,
+                    'source': source,
+                    'seconds': elapsed,
+                    'peak_mb': peak_mb,
+                    'output_mb': output_mb,
+                })
+                peak_info = f", peak {peak_mb:.1f} MB" if peak_mb is not None else ""
+                logger.info(f"{self.name} step {step.name} ({source}): {elapsed:.3f}s, output {output_mb:.1f} MB{peak_info}")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        total = sum(entry['seconds'] for entry in self.report)
+        logger.info(f"{self.name} completed {len(self.report)} steps in {total:.3f}s")
+        return context
+
+    def report_frame(self) -> pd.DataFrame:
+        """Per-step report of the last run (step, source, seconds, peak_mb, output_mb)."""
+        return pd.DataFrame(self.report, columns=['step', 'source', 'seconds', 'peak_mb', 'output_mb'])
+
+    def _step_key(self, step: PipelineStep, fingerprints: Dict[str, str]) -> str:
+        """Cache key of a step: its name, source and input fingerprints."""
+        digest = hashlib.sha1(step.name.encode('utf-8'))
+        digest.update(step.code_fingerprint().encode('utf-8'))
+        for name in step.inputs:
+            digest.update(f'{name}={fingerprints[name]}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _cache_path(self, step: PipelineStep, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{step.name}.{key[:16]}.pkl')
+
+    def _load(self, step: PipelineStep, key: str) -> Optional[Dict[str, Any]]:
+        """Cached outputs of a step, or None on a cache miss."""
+        try:
+            if self.cache_mode == 'memory':
+                cached = self.memory_cache.get(step.name)
+                if cached is not None and cached[0] == key:
+                    return pickle.loads(cached[1])
+            elif self.cache_mode == 'disk':
+                path = self._cache_path(step, key)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load cached outputs of step {step.name}: {str(e)}")
+        return None
+
+    def _store(self, step: PipelineStep, key: str, outputs: Dict[str, Any]) -> None:
+        """Store the outputs of a step, replacing its previous entry."""
+        try:
+            # Pickled snapshot, so later in-place changes to the outputs do not leak into the cache
+            data = pickle.dumps({name: outputs[name] for name in step.outputs}, protocol=pickle.HIGHEST_PROTOCOL)
+            if self.cache_mode == 'memory':
+                self.memory_cache[step.name] = (key, data)
+            elif self.cache_mode == 'disk':
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._cache_path(step, key)
+                for old_path in glob.glob(os.path.join(self.cache_dir, f'{glob.escape(step.name)}.*.pkl')):
+                    if old_path != path:
+                        os.remove(old_path)
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not cache outputs of step {step.name}: {str(e)}")
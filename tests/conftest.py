@@ -0,0 +1,8 @@
+"""Shared pytest setup: make the project root importable (src.*) when running from any directory."""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
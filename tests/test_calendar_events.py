@@ -0,0 +1,155 @@
+"""Tests for build_calendar_events / inject_calendar_events (event precedence on the wide calendar) and assign_empty_days."""
+
+import pandas as pd
+
+from src.helpers import assign_empty_days, build_calendar_events, inject_calendar_events, EVENT_PRECEDENCE
+from src.schedule_matrix import ScheduleMatrix
+
+
+def make_calendar() -> pd.DataFrame:
+    """Wide calendar with 3 days and 2 employees, every cell '-'."""
+    dates = ['2025-01-01', '2025-01-02', '2025-01-03']
+    rows = [
+        ['Dia'] + [d for d in dates for _ in range(2)],
+        ['TURNO'] + ['M', 'T'] * len(dates),
+        ['TIPO_DIA'] + ['-'] * 2 * len(dates),
+        ['0000000001'] + ['-'] * 2 * len(dates),
+        ['0000000002'] + ['-'] * 2 * len(dates),
+    ]
+    return pd.DataFrame(rows, columns=range(7))
+
+
+def day(calendar: pd.DataFrame, label: str, date: str) -> list:
+    """Values of the M and T slots of a row on a date."""
+    matrix = ScheduleMatrix.from_frame(calendar)
+    slot_m, slot_t = matrix.slots_of(date)
+    row = matrix.headers[label] if label in matrix.headers else matrix.values[matrix.row_of(label)]
+    return [row[slot_m], row[slot_t]]
+
+
+def events(*rows) -> pd.DataFrame:
+    return pd.DataFrame(list(rows), columns=['matricula', 'data', 'codigo', 'precedencia'])
+
+
+def test_higher_precedence_employee_event_beats_all_event():
+    result = inject_calendar_events(make_calendar(), events(
+        ('0000000001', '2025-01-02', 'V', EVENT_PRECEDENCE['ausencia']),
+        ('ALL', '2025-01-02', 'L', EVENT_PRECEDENCE['closed_day']),
+    ))
+    assert day(result, '0000000001', '2025-01-02') == ['V', 'V']
+    assert day(result, '0000000002', '2025-01-02') == ['L', 'L']
+
+
+def test_lower_precedence_employee_event_loses_to_all_event():
+    result = inject_calendar_events(make_calendar(), events(
+        ('ALL', '2025-01-01', 'F', EVENT_PRECEDENCE['closed_day']),
+        ('0000000001', '2025-01-01', 'X', EVENT_PRECEDENCE['feriado']),
+    ))
+    assert day(result, '0000000001', '2025-01-01') == ['F', 'F']
+    assert day(result, '0000000002', '2025-01-01') == ['F', 'F']
+
+
+def test_ties_are_won_by_the_last_event():
+    result = inject_calendar_events(make_calendar(), events(
+        ('0000000002', '2025-01-03', 'A', 30),
+        ('0000000002', '2025-01-03', 'V', 30),
+        ('ALL', '2025-01-01', 'L', 20),
+        ('ALL', '2025-01-01', 'F', 20),
+        ('ALL', '2025-01-02', 'L', 30),
+        ('0000000001', '2025-01-02', 'V', 30),
+    ))
+    assert day(result, '0000000002', '2025-01-03') == ['V', 'V']
+    assert day(result, '0000000001', '2025-01-01') == ['F', 'F']
+    # Same precedence as the ALL event but later in the frame
+    assert day(result, '0000000001', '2025-01-02') == ['V', 'V']
+    assert day(result, '0000000002', '2025-01-02') == ['L', 'L']
+
+
+def test_same_result_as_applying_events_in_order():
+    evs = events(
+        ('ALL', '2025-01-01', 'L', 20),
+        ('0000000001', '2025-01-01', 'V', 30),
+        ('0000000001', '2025-01-01', 'A', 10),
+        ('0000000002', '2025-01-03', 'DFS', 40),
+        ('ALL', '2025-01-03', 'F', 10),
+        ('TIPO_DIA', '2025-01-03', 'F', 10),
+    )
+    result = inject_calendar_events(make_calendar(), evs)
+
+    # Reference: apply events one by one in precedence order (stable), later ones overwrite
+    matrix = ScheduleMatrix.from_frame(make_calendar())
+    for ev in evs.sort_values('precedencia', kind='stable').itertuples():
+        if ev.matricula in matrix.headers:
+            matrix.set_header_day(ev.matricula, ev.data, ev.codigo)
+        elif ev.matricula == 'ALL':
+            for employee in matrix.employees:
+                matrix.set_day(employee, ev.data, ev.codigo)
+        else:
+            matrix.set_day(ev.matricula, ev.data, ev.codigo)
+    pd.testing.assert_frame_equal(result, matrix.to_frame())
+
+
+def test_unknown_dates_and_employees_are_ignored():
+    calendar = make_calendar()
+    result = inject_calendar_events(calendar, events(
+        ('0000000009', '2025-01-01', 'V', 30),
+        ('0000000001', '2025-02-01', 'V', 30),
+    ))
+    pd.testing.assert_frame_equal(result, calendar.astype(object))
+
+
+def test_build_calendar_events():
+    df_feriados = pd.DataFrame({'data': ['2025-01-01', '2025-01-03'], 'tipo': [2, 3]})
+    closed_days = pd.DataFrame({'data': ['2025-01-02']})
+    ausencias = pd.DataFrame({'matricula': ['0000000001', '0000000002'], 'data_ini': ['2025-01-02', '2025-01-03'],
+                              'tipo_ausencia': ['A', 'AP'], 'fk_motivo_ausencia': [1, 2]})
+    result = inject_calendar_events(make_calendar(), build_calendar_events(df_feriados, closed_days, ausencias))
+
+    # Open holiday only marks the day type, closed holidays also every employee
+    assert day(result, 'TIPO_DIA', '2025-01-01') == ['F', 'F']
+    assert day(result, '0000000001', '2025-01-01') == ['-', '-']
+    assert day(result, 'TIPO_DIA', '2025-01-03') == ['F', 'F']
+    # Vacation (motivo 1) becomes V and beats the closed day
+    assert day(result, '0000000001', '2025-01-02') == ['V', 'V']
+    assert day(result, '0000000002', '2025-01-02') == ['L', 'L']
+    # Other absences keep their type and beat the closed holiday
+    assert day(result, '0000000002', '2025-01-03') == ['AP', 'AP']
+    assert day(result, '0000000001', '2025-01-03') == ['F', 'F']
+
+
+def test_absences_survive_the_empty_days_of_short_contracts():
+    # Wed 01-01 to Fri 01-03, every cell worked, with an absence on Thursday and a vacation on Friday
+    calendar = make_calendar()
+    calendar.iloc[3:, 1:] = 'M'
+    ausencias = pd.DataFrame({'matricula': ['0000000001', '0000000002'], 'data_ini': ['2025-01-02', '2025-01-03'],
+                              'tipo_ausencia': ['A', 'A'], 'fk_motivo_ausencia': [2, 1]})
+    df_feriados = pd.DataFrame({'data': pd.to_datetime(['2025-01-01']), 'tipo': [2]})
+    calendar = inject_calendar_events(calendar, build_calendar_events(df_feriados, ausencias=ausencias))
+
+    df_tipo_contrato = pd.DataFrame({'emp': ['0000000001', '0000000002'], 'tipo_contrato': [2, 3]})
+    result = assign_empty_days(df_tipo_contrato, calendar, ['0000000001', '0000000002'], df_feriados)
+
+    # 2-day contract: Monday to Friday are empty, except the absence
+    assert day(result, '0000000001', '2025-01-02') == ['A', 'A']
+    assert day(result, '0000000001', '2025-01-03') == ['-', '-']
+    # 3-day contract: Monday to Thursday are empty, Friday keeps the vacation
+    assert day(result, '0000000002', '2025-01-02') == ['-', '-']
+    assert day(result, '0000000002', '2025-01-03') == ['V', 'V']
+    # Open holidays are left as assigned
+    assert day(result, '0000000001', '2025-01-01') == ['M', 'M']
+
+
+def test_absence_on_an_empty_weekday_is_kept():
+    calendar = make_calendar()
+    calendar.iloc[3:, 1:] = 'M'
+    calendar = inject_calendar_events(calendar, events(
+        ('0000000001', '2025-01-01', 'V', EVENT_PRECEDENCE['ausencia']),
+        ('0000000002', '2025-01-01', 'AP', EVENT_PRECEDENCE['ausencia']),
+    ))
+    df_tipo_contrato = pd.DataFrame({'emp': ['0000000001', '0000000002'], 'tipo_contrato': [3, 2]})
+    result = assign_empty_days(df_tipo_contrato, calendar, ['0000000001', '0000000002'], pd.DataFrame())
+
+    assert day(result, '0000000001', '2025-01-01') == ['V', 'V']
+    assert day(result, '0000000002', '2025-01-01') == ['AP', 'AP']
+    assert day(result, '0000000001', '2025-01-02') == ['-', '-']
+    assert day(result, '0000000002', '2025-01-02') == ['-', '-']
@@ -0,0 +1,178 @@
+"""Tests for the load_estimativas helpers (opening hours expansion, turno demand), against the previous row loops."""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.helpers import calcular_max, expand_faixa_horario, turno_demand_stats
+
+
+FAIXA_COLUMNS_WEEKDAYS = ['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom', 'fer']
+
+
+def reference_faixa_horario(df_faixa_horario: pd.DataFrame, weekday_of_date) -> pd.DataFrame:
+    """Opening hours per date with the iterrows/melt/pivot expansion load_estimativas used before."""
+    expanded_rows = []
+    for _, row in df_faixa_horario.iterrows():
+        for date in pd.date_range(start=row['data_ini'], end=row['data_fim'], freq='D'):
+            new_row = row.copy()
+            new_row['data'] = date
+            expanded_rows.append(new_row)
+    df_expanded = pd.DataFrame(expanded_rows)
+
+    time_columns = [f'{a_f}_{wd}' for wd in FAIXA_COLUMNS_WEEKDAYS for a_f in ('aber', 'fech')]
+    df_long = pd.melt(df_expanded, id_vars=['fk_secao', 'data', 'data_ini', 'data_fim'],
+                      value_vars=time_columns, var_name='wd_ab', value_name='value')
+    df_long[['a_f', 'wd']] = df_long['wd_ab'].str.split('_', expand=True)
+    df_wide = df_long.pivot_table(index=['fk_secao', 'data', 'wd'], columns='a_f',
+                                  values='value', aggfunc='first').reset_index()
+    df_wide.columns.name = None
+    df_wide['wd'] = df_wide['wd'].str.replace('sab', 'sáb')
+    df_wide['wd_date'] = weekday_of_date(df_wide['data'])
+
+    result = df_wide[df_wide['wd'] == df_wide['wd_date']].copy()
+    for a_f in ('aber', 'fech'):
+        result[a_f] = pd.to_datetime(result[a_f], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    return result[['fk_secao', 'data', 'aber', 'fech']].reset_index(drop=True)
+
+
+def portuguese_weekday(dates: pd.Series) -> pd.Series:
+    return dates.dt.dayofweek.map(dict(enumerate(['seg', 'ter', 'qua', 'qui', 'sex', 'sáb', 'dom'])))
+
+
+def english_weekday(dates: pd.Series) -> pd.Series:
+    """Weekday match of the previous code: only 'saturday' was translated, so only Saturdays matched."""
+    return dates.dt.day_name().str.lower().str.replace('saturday', 'sáb')
+
+
+def make_faixa_horario(n_ranges: int, seed: int) -> pd.DataFrame:
+    """Random, partly overlapping opening hours ranges of 3 secoes, with missing times."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_ranges):
+        data_ini = pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(rng.integers(0, 300)))
+        row = {
+            'fk_secao': int(rng.integers(1, 4)),
+            'data_ini': data_ini,
+            'data_fim': data_ini + pd.Timedelta(days=int(rng.integers(0, 60))),
+        }
+        for wd in FAIXA_COLUMNS_WEEKDAYS:
+            row[f'aber_{wd}'] = None if rng.random() < 0.2 else f'2000-01-01 0{rng.integers(7, 10)}:00:00'
+            row[f'fech_{wd}'] = None if rng.random() < 0.2 else f'2000-01-01 2{rng.integers(0, 3)}:00:00'
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(autouse=True)
+def quiet_reference():
+    # The reference loop concatenates object rows and parses mixed values
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_expand_faixa_horario_matches_the_pivot_expansion(seed):
+    df_faixa_horario = make_faixa_horario(15, seed)
+    result = expand_faixa_horario(df_faixa_horario)
+
+    # The pivot dropped the dates without any opening time; expand_faixa_horario keeps them as NaT
+    with_times = result.dropna(subset=['aber', 'fech'], how='all').reset_index(drop=True)
+    expected = reference_faixa_horario(df_faixa_horario, portuguese_weekday)
+    pd.testing.assert_frame_equal(with_times, expected, check_dtype=False)
+
+    # On Saturdays, the only weekday the previous code matched, the results are unchanged
+    saturdays = with_times[with_times['data'].dt.dayofweek == 5].reset_index(drop=True)
+    pd.testing.assert_frame_equal(saturdays, reference_faixa_horario(df_faixa_horario, english_weekday),
+                                  check_dtype=False)
+
+
+def test_expand_faixa_horario_without_ranges():
+    result = expand_faixa_horario(make_faixa_horario(3, 0).iloc[:0])
+    assert result.empty
+    assert list(result.columns) == ['fk_secao', 'data', 'aber', 'fech']
+
+
+def reference_turno_demand(df_granularidade: pd.DataFrame, df_turnos: pd.DataFrame,
+                           start_date: str, end_date: str) -> pd.DataFrame:
+    """Demand statistics computed turno by turno, as load_estimativas did before turno_demand_stats."""
+    df_turnos = df_turnos.assign(fk_posto_turno=df_turnos['fk_tipo_posto'].astype(str) + '_' + df_turnos['turno'])
+    output_final = pd.DataFrame()
+    for fk_posto_turno in df_turnos['fk_posto_turno'].unique():
+        df_turnos_f = df_turnos[df_turnos['fk_posto_turno'] == fk_posto_turno].drop(columns='fk_posto_turno')
+        fk_posto = df_turnos_f['fk_tipo_posto'].iloc[0]
+        turno = df_turnos_f['turno'].iloc[0]
+
+        slots = df_granularidade[df_granularidade['fk_tipo_posto'] == fk_posto]
+        slots = pd.merge(slots, df_turnos_f, on=['fk_tipo_posto', 'data'], how='inner')
+        slots = slots[(slots['hora_ini'] >= slots['h_ini_1']) & (slots['hora_ini'] < slots['h_out_1'])]
+        slots = slots.sort_values(['data', 'hora_ini']).drop_duplicates()
+        slots['pessoas_final'] = pd.to_numeric(slots['pessoas_final'], errors='coerce')
+
+        if len(slots) == 0:
+            output = pd.DataFrame({'data': [], 'media_turno': [], 'max_turno': [], 'min_turno': [], 'sd_turno': []})
+        else:
+            output = slots.groupby('data').agg({'pessoas_final': [
+                ('media_turno', 'mean'),
+                ('max_turno', lambda x: calcular_max(x.tolist())),
+                ('min_turno', 'min'),
+                ('sd_turno', 'std'),
+            ]}).reset_index()
+            output.columns = ['data', 'media_turno', 'max_turno', 'min_turno', 'sd_turno']
+
+        dates = pd.DataFrame({'data': pd.date_range(start=start_date, end=end_date, freq='D')})
+        output = pd.merge(dates, output, on='data', how='left').fillna(0)
+        output['turno'] = turno
+        output['fk_tipo_posto'] = fk_posto
+        output_final = pd.concat([output_final, output], ignore_index=True)
+    return output_final
+
+
+def make_demand(n_days: int, seed: int) -> tuple:
+    """15 minute demand slots of one tipo_posto (with duplicated slots) and its m/t turno windows."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-01-01', periods=n_days)
+    hours = pd.date_range('2000-01-01 07:00', '2000-01-01 22:45', freq='15min')
+    df_granularidade = pd.DataFrame({
+        'fk_tipo_posto': 7,
+        'data': np.repeat(dates, len(hours)),
+        'hora_ini': np.tile(hours, n_days),
+        'pessoas_final': rng.integers(0, 6, n_days * len(hours)).astype(str),
+    })
+    df_granularidade = pd.concat([df_granularidade, df_granularidade.sample(30, random_state=seed)])
+
+    windows = {'m': ('07:00', '14:00'), 't': ('14:00', '23:00')}
+    # No turno windows on the last days of the period
+    df_turnos = pd.DataFrame([
+        {'fk_tipo_posto': 7, 'h_ini_1': pd.Timestamp(f'2000-01-01 {h_ini}'),
+         'h_out_1': pd.Timestamp(f'2000-01-01 {h_out}'), 'turno': turno, 'data': date}
+        for date in dates[:-3] for turno, (h_ini, h_out) in windows.items()
+    ])
+    return df_granularidade, df_turnos
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_turno_demand_stats_matches_the_per_turno_loop(seed):
+    df_granularidade, df_turnos = make_demand(40, seed)
+    start_date, end_date = '2025-01-01', '2025-02-15'
+
+    pd.testing.assert_frame_equal(turno_demand_stats(df_granularidade, df_turnos, start_date, end_date),
+                                  reference_turno_demand(df_granularidade, df_turnos, start_date, end_date),
+                                  check_dtype=False)
+
+
+def test_turno_demand_stats_turno_without_slots_is_zero():
+    df_granularidade, df_turnos = make_demand(10, 0)
+    # The t window starts after the last demand slot
+    df_turnos.loc[df_turnos['turno'] == 't', ['h_ini_1', 'h_out_1']] = pd.Timestamp('2000-01-01 23:30')
+    start_date, end_date = '2025-01-01', '2025-01-12'
+
+    result = turno_demand_stats(df_granularidade, df_turnos, start_date, end_date)
+    pd.testing.assert_frame_equal(result,
+                                  reference_turno_demand(df_granularidade, df_turnos, start_date, end_date),
+                                  check_dtype=False)
+    t_stats = result[result['turno'] == 't'][['media_turno', 'max_turno', 'min_turno', 'sd_turno']]
+    assert len(t_stats) == 12
+    assert (t_stats == 0).all().all()
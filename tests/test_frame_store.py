@@ -0,0 +1,78 @@
+"""Tests for FrameStore ownership with and without copy-on-write, and the frame memory report."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.frame_store import FrameStore, enable_copy_on_write, log_frame_memory, share
+
+
+@pytest.fixture(params=[False, True], ids=['cow_off', 'cow_on'])
+def copy_on_write(request):
+    previous = pd.get_option('mode.copy_on_write')
+    enable_copy_on_write(request.param)
+    yield request.param
+    pd.set_option('mode.copy_on_write', previous)
+
+
+def make_calendar(n_rows: int = 100_000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'COLABORADOR': rng.integers(0, 300, n_rows),
+        'DATA': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 90, n_rows), unit='D'),
+        'WDAY': rng.integers(1, 8, n_rows),
+        'HORARIO': rng.integers(0, 10, n_rows).astype(np.int8),
+    })
+
+
+def test_stored_frame_is_only_copied_with_copy_on_write(copy_on_write):
+    calendar = make_calendar(10)
+    store = FrameStore({'df_calendario': calendar})
+
+    # Without copy-on-write the frame itself is stored (no deep copy per store)
+    assert (store['df_calendario'] is calendar) is not copy_on_write
+    pd.testing.assert_frame_equal(store['df_calendario'], calendar)
+
+
+def test_shared_reads_do_not_change_the_store(copy_on_write):
+    store = FrameStore({'df_calendario': make_calendar(10)})
+    expected = store['df_calendario'].copy(deep=True)
+
+    variant = share(store['df_calendario'])
+    variant['HORARIO'] = -1
+    variant.loc[0, 'WDAY'] = 0
+
+    pd.testing.assert_frame_equal(store['df_calendario'], expected)
+
+
+def test_store_is_independent_of_the_caller_with_copy_on_write():
+    previous = pd.get_option('mode.copy_on_write')
+    enable_copy_on_write(True)
+    try:
+        calendar = make_calendar(10)
+        store = FrameStore()
+        store['df_calendario'] = calendar
+        calendar.loc[0, 'WDAY'] = 0
+        assert store['df_calendario'].loc[0, 'WDAY'] != 0
+    finally:
+        pd.set_option('mode.copy_on_write', previous)
+
+
+def test_frame_memory_shows_the_columns_shared_by_variants(copy_on_write):
+    # The func_inicializa pattern: a backup variant of a stored frame with one column rewritten
+    raw_data = FrameStore({'matriz2': make_calendar()})
+    matriz2_bk = share(raw_data['matriz2'])
+    matriz2_bk['HORARIO'] = matriz2_bk['HORARIO'] + 1
+    medium_data = FrameStore({'matriz2_bk': matriz2_bk})
+
+    report = log_frame_memory({'raw_data': raw_data, 'medium_data': medium_data}, 'posto 1')
+
+    nominal = report['nominal_mb'].sum()
+    stored = report['stored_mb'].sum()
+    assert report['nominal_mb'].tolist() == [pytest.approx(nominal / 2)] * 2
+    if copy_on_write:
+        # Only the rewritten int8 column (100 KB) is held twice
+        horario_mb = matriz2_bk['HORARIO'].memory_usage(index=False) / 1024 ** 2
+        assert stored == pytest.approx(nominal / 2 + horario_mb, abs=0.01)
+    else:
+        assert stored == pytest.approx(nominal)
@@ -0,0 +1,184 @@
+"""Tests for the func_inicializa step helpers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.func_inicializa_helpers import build_matriz2, compute_fest_h, rest_pattern_counts
+from src.schedule_matrix import ScheduleMatrix
+
+
+def make_calendar() -> pd.DataFrame:
+    """Wide calendar with 4 days and 2 employees, with MoT/P shifts and a holiday."""
+    dates = ['2025-01-04', '2025-01-05', '2025-01-06', '2025-01-07']
+    rows = [
+        ['Dia'] + [d for d in dates for _ in range(2)],
+        ['TURNO'] + ['M', 'T'] * len(dates),
+        ['TIPO_DIA'] + ['-', '-', 'F', 'F', '-', '-', '-', '-'],
+        ['0000000001'] + ['M', 'M', 'L', 'L', 'MoT', 'MoT', 'T', 'T'],
+        ['0000000002'] + ['P', 'P', 'F', 'F', 'M', 'M', '-', '-'],
+    ]
+    return pd.DataFrame(rows, columns=range(9))
+
+
+def make_colaboradores() -> pd.DataFrame:
+    return pd.DataFrame({
+        'emp': ['0000000001', '0000000002'],
+        'data_admissao': [pd.Timestamp('2024-01-01'), pd.Timestamp('2025-01-05')],
+        'data_demissao': [pd.NaT, pd.Timestamp('2025-01-06')],
+    })
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2025-01-04', '2025-01-07'),
+    ('2025-01-05', '2025-01-06'),
+])
+def test_melt_and_long_calendar_build_the_same_matriz2(start_date, end_date):
+    calendar = make_calendar()
+    melted = build_matriz2(calendar, None, make_colaboradores(), start_date, end_date)
+    native = build_matriz2(calendar, ScheduleMatrix.from_frame(calendar).to_long(),
+                           make_colaboradores(), start_date, end_date)
+
+    assert melted['tipos_de_turno'] == native['tipos_de_turno']
+    pd.testing.assert_frame_equal(melted['matriz2'].reset_index(drop=True),
+                                  native['matriz2'].reset_index(drop=True))
+    # The end date is included on both paths
+    assert melted['matriz2']['DATA'].max() == pd.Timestamp(end_date)
+
+
+def reference_rest_counts(matriz2: pd.DataFrame, matrizA_og: pd.DataFrame) -> pd.DataFrame:
+    """Rest counters computed per employee with row shifts, as count_rest_days did before rest_pattern_counts."""
+    df_cd = matriz2[matriz2['COLABORADOR'].isin(matrizA_og['matricula'])]
+    df_cd = df_cd.groupby(['COLABORADOR', 'DATA']).first().reset_index()
+    df_cd['HORARIO'] = df_cd['HORARIO'].astype(object)
+    by_colab = df_cd.groupby('COLABORADOR')
+    for name, periods in [('NEXT', -1), ('PREV', 1), ('NEXT2', -2)]:
+        df_cd[f'TIPO_TURNO_{name}'] = by_colab['HORARIO'].shift(periods).fillna('H')
+        df_cd[f'WDAY_{name}'] = by_colab['WDAY'].shift(periods)
+
+    def rest(column):
+        return df_cd[column].str.contains('^L', case=False, na=False)
+
+    not_dom_fes = df_cd['DIA_TIPO'] != 'domYf'
+    single = (df_cd['WDAY'].isin([2, 3, 4, 5, 6, 7]) & ~rest('TIPO_TURNO_NEXT') &
+              (df_cd['TIPO_TURNO_PREV'] != 'L'))
+    tue_sat = df_cd['WDAY'].isin([2, 3, 4, 5, 6])
+    sun_mon = (df_cd['WDAY'] == 7) & (df_cd['WDAY_NEXT'] == 1) & rest('TIPO_TURNO_NEXT') & (df_cd['WDAY_NEXT2'] == 2)
+    df_cd['LD'] = not_dom_fes & (df_cd['HORARIO'] != 'LQ') & rest('HORARIO') & single
+    df_cd['LQ'] = not_dom_fes & (df_cd['HORARIO'] != 'LD') & rest('HORARIO') & single
+    df_cd['LRES'] = not_dom_fes & rest('HORARIO') & tue_sat & ~rest('TIPO_TURNO_PREV') & ~rest('TIPO_TURNO_NEXT')
+    df_cd['CXX'] = not_dom_fes & rest('HORARIO') & tue_sat & rest('TIPO_TURNO_PREV')
+    df_cd['C3D'] = ((sun_mon & rest('HORARIO') & rest('TIPO_TURNO_NEXT2')).astype(int) +
+                    ((df_cd['WDAY_PREV'] == 6) & rest('TIPO_TURNO_PREV') & (df_cd['WDAY'] == 7) & rest('HORARIO') &
+                     (df_cd['WDAY_NEXT'] == 1) & rest('TIPO_TURNO_NEXT')).astype(int))
+    df_cd['C2D'] = ((sun_mon & rest('HORARIO') & ~rest('TIPO_TURNO_NEXT2') & (df_cd['WDAY_PREV'] == 6) &
+                     ~rest('TIPO_TURNO_PREV')).astype(int) +
+                    (sun_mon & ~rest('HORARIO') & rest('TIPO_TURNO_NEXT2')).astype(int))
+
+    rows = []
+    for tipos in ([4, 5], [6]):
+        for colab in matrizA_og[matrizA_og['tipo_contrato'].isin(tipos)]['matricula']:
+            colab_data = df_cd[df_cd['COLABORADOR'] == colab]
+            rows.append({
+                'COLABORADOR': colab,
+                'LD_at': int(colab_data['LD'].sum()) if tipos == [6] else 0,
+                'LQ_at': int(colab_data['LQ'].sum()),
+                'LRES_at': int(colab_data['LRES'].sum()) if tipos == [4, 5] else 0,
+                'CXX_at': int(colab_data['CXX'].sum()),
+                'C2D_at': float(colab_data['C2D'].sum()),
+                'C3D_at': float(colab_data['C3D'].sum()),
+            })
+    return pd.DataFrame(rows)
+
+
+def make_rest_calendar(seed: int) -> tuple:
+    """Long calendar of random rest/work codes (two rows per day, as the M/T slots) and its employees."""
+    rng = np.random.default_rng(seed)
+    employees = [f'{i:010d}' for i in range(1, 13)]
+    dates = pd.date_range('2025-01-01', '2025-03-31')
+    codes = np.array(['L', 'L', 'LD', 'LQ', 'M', 'T', 'V', 'L_', 'NL', '-', 'DFS'], dtype=object)
+    horario = rng.choice(codes, (len(employees), len(dates)))
+    matriz2 = pd.DataFrame({
+        'COLABORADOR': np.repeat(employees, 2 * len(dates)),
+        'DATA': np.tile(np.repeat(dates, 2), len(employees)),
+        'HORARIO': np.repeat(horario.ravel(), 2),
+    })
+    # Half-day variants in the second slot (the first row of the day counts)
+    second = (np.arange(len(matriz2)) % 2 == 1) & (rng.random(len(matriz2)) < 0.1)
+    matriz2.loc[second, 'HORARIO'] = 'M'
+    matriz2['WDAY'] = matriz2['DATA'].dt.dayofweek + 1
+    holidays = matriz2['DATA'].isin(pd.to_datetime(['2025-01-01', '2025-03-04']))
+    matriz2['DIA_TIPO'] = np.where(holidays | (matriz2['WDAY'] == 7), 'domYf', matriz2['DATA'].dt.day_name().str[:3])
+    # An employee missing the last weeks
+    matriz2 = matriz2[~((matriz2['COLABORADOR'] == employees[-1]) & (matriz2['DATA'] > '2025-03-10'))]
+
+    matrizA_og = pd.DataFrame({
+        'matricula': employees + ['0000000099'],
+        'tipo_contrato': list(rng.choice([2, 3, 4, 5, 6], len(employees))) + [6],
+    })
+    return matriz2.reset_index(drop=True), matrizA_og
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_rest_pattern_counts_match_the_per_employee_counts(seed):
+    matriz2, matrizA_og = make_rest_calendar(seed)
+    expected = reference_rest_counts(matriz2, matrizA_og)
+
+    pd.testing.assert_frame_equal(rest_pattern_counts(matriz2, matrizA_og), expected, check_dtype=False)
+    # Same counts with the encoded (categorical) HORARIO built by build_matriz2
+    matriz2['HORARIO'] = matriz2['HORARIO'].astype('category')
+    pd.testing.assert_frame_equal(rest_pattern_counts(matriz2, matrizA_og), expected, check_dtype=False)
+
+
+def make_fest_calendar(worked_holidays: dict) -> pd.DataFrame:
+    """
+    Long calendar (M and T rows per day) over Sundays/holidays, where each employee works the
+    given number of domYf days. Work on a domYf Monday or on a normal day must not count.
+    """
+    # 2025-01-05 to 2025-03-02: 9 Sundays, plus the domYf Monday 2025-01-06 and the normal Tuesday 2025-01-07
+    holidays = list(pd.date_range('2025-01-05', '2025-03-02', freq='W-SUN'))
+    work_codes = ['H', 'NL', 'OUT', 'DFS', 'H', 'NL', 'OUT', 'DFS', 'H']
+    rows = []
+    for colab, n_worked in worked_holidays.items():
+        for i, date in enumerate(holidays):
+            # Worked days have the work code in one slot only (counted once per day)
+            first = work_codes[i] if i < n_worked else 'L'
+            rows += [(colab, date, 7, 'domYf', first), (colab, date, 7, 'domYf', 'L' if i % 2 else 'V')]
+        rows += [(colab, pd.Timestamp('2025-01-06'), 1, 'domYf', 'H'),
+                 (colab, pd.Timestamp('2025-01-07'), 2, 'Tue', 'H')]
+    return pd.DataFrame(rows, columns=['COLABORADOR', 'DATA', 'WDAY', 'DIA_TIPO', 'HORARIO'])
+
+
+@pytest.mark.parametrize('dyf_max_t, worked, min_fest_h', [
+    (33, 5, 3),
+    (33, 4, 2),
+    (33, 9, 5),
+    (22, 5, 2),
+    (22, 7, 4),
+    (5, 5, 2),
+    (5, 9, 3),
+    (0, 5, 0),
+    (12, 9, 0),
+    (33, 0, 0),
+])
+def test_compute_fest_h_min_fest_h_is_the_dyf_max_t_share_of_fest_h(dyf_max_t, worked, min_fest_h):
+    colabs = ['0000000001', '0000000002']
+    matriz2_bk = make_fest_calendar({colabs[0]: worked, colabs[1]: 9})
+    # process_employees drops dyf_max_t from matrizA_bk; it is taken from matrizA_bk_og
+    matrizA_bk = pd.DataFrame({'matricula': colabs + ['0000000003'], 'l_total': [10, 10, 10]})
+    matrizA_bk_og = pd.DataFrame({'matricula': colabs + ['0000000003'], 'dyf_max_t': [dyf_max_t, 0, 33]})
+
+    result = compute_fest_h(matriz2_bk, matrizA_bk, matrizA_bk_og)['matrizA_bk']
+
+    # The second employee has no dyf_max_t share and the third no calendar rows
+    assert result['min_fest_h'].tolist() == [min_fest_h, 0, 0]
+    assert list(result.columns) == ['matricula', 'l_total', 'min_fest_h']
+
+
+def test_compute_fest_h_with_encoded_horario():
+    matriz2_bk = make_fest_calendar({'0000000001': 5})
+    matriz2_bk['HORARIO'] = matriz2_bk['HORARIO'].astype('category')
+    matrizA_bk = pd.DataFrame({'matricula': ['0000000001']})
+    matrizA_bk_og = pd.DataFrame({'matricula': ['0000000001'], 'dyf_max_t': [33]})
+
+    assert compute_fest_h(matriz2_bk, matrizA_bk, matrizA_bk_og)['matrizA_bk']['min_fest_h'].tolist() == [3]
@@ -0,0 +1,100 @@
+"""Tests for src.schedule_archive.ScheduleArchive (coverage, appends and expiry)."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.schedule_archive import ScheduleArchive, LOCK_FILE
+
+
+def schedule_rows(employees, start, end) -> pd.DataFrame:
+    """One schedule row per employee and day, as returned by queryGetCoreSchedule."""
+    days = pd.date_range(start, end, freq='D')
+    return pd.DataFrame({
+        'fk_colaborador': np.repeat(employees, len(days)),
+        'schedule_day': np.tile(days, len(employees)),
+        'sched_type': 'T',
+        'sched_subtype': np.tile(np.where(days.day % 3 == 0, None, 'M'), len(employees)),
+        'hours': 8.0,
+    })
+
+
+def test_empty_query_does_not_extend_coverage(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / 'archive'))
+
+    assert archive.append(pd.DataFrame(), [1, 2], '2025-01-01', '2025-01-31') == 0
+    assert archive.append(schedule_rows([], '2025-01-01', '2025-01-31'), [1, 2], '2025-01-01', '2025-01-31') == 0
+
+    reopened = ScheduleArchive(str(tmp_path / 'archive'))
+    assert reopened.coverage == {}
+    assert reopened.first_missing_date([1, 2], '2025-01-01', '2025-01-31') == pd.Timestamp('2025-01-01')
+
+
+def test_partial_query_only_covers_returned_employees(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / 'archive'))
+
+    archive.append(schedule_rows([1], '2025-01-01', '2025-01-31'), [1, 2], '2025-01-01', '2025-01-31')
+
+    reopened = ScheduleArchive(str(tmp_path / 'archive'))
+    assert set(reopened.coverage) == {1}
+    assert reopened.first_missing_date([1], '2025-01-01', '2025-01-31') == pd.Timestamp('2025-02-01')
+    assert reopened.first_missing_date([1, 2], '2025-01-01', '2025-01-31') == pd.Timestamp('2025-01-01')
+
+
+def test_append_twice_extends_coverage_without_duplicates(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / 'archive'))
+    employees = [1, 2]
+
+    first = schedule_rows(employees, '2025-01-01', '2025-01-20')
+    assert archive.append(first, employees, '2025-01-01', '2025-01-10') == 20
+
+    # Second run queries from the first missing day, with a result overlapping the archived days
+    query_start = archive.first_missing_date(employees, '2025-01-01', '2025-01-31')
+    assert query_start == pd.Timestamp('2025-01-11')
+    second = schedule_rows(employees, '2025-01-05', '2025-01-31')
+    assert archive.append(second, employees, query_start, '2025-01-20') == 20
+
+    reopened = ScheduleArchive(str(tmp_path / 'archive'))
+    assert reopened.coverage[1] == (np.datetime64('2025-01-01'), np.datetime64('2025-01-20'))
+    assert reopened.first_missing_date(employees, '2025-01-01', '2025-01-31') == pd.Timestamp('2025-01-21')
+
+    result = reopened.read(employees, '2025-01-01', '2025-01-31')
+    expected = schedule_rows(employees, '2025-01-01', '2025-01-20')
+    result = result.sort_values(['fk_colaborador', 'schedule_day'], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert not os.path.exists(tmp_path / 'archive' / LOCK_FILE)
+
+
+def test_two_archives_on_the_same_directory(tmp_path):
+    # Two runs (e.g. two postos) opened the archive before either appended
+    run_a = ScheduleArchive(str(tmp_path / 'archive'))
+    run_b = ScheduleArchive(str(tmp_path / 'archive'))
+
+    run_a.append(schedule_rows([1], '2025-01-01', '2025-01-10'), [1], '2025-01-01', '2025-01-10')
+    run_b.append(schedule_rows([1, 2], '2025-01-01', '2025-01-10'), [1, 2], '2025-01-01', '2025-01-10')
+
+    reopened = ScheduleArchive(str(tmp_path / 'archive'))
+    assert set(reopened.coverage) == {1, 2}
+    result = reopened.read([1, 2], '2025-01-01', '2025-01-10')
+    assert len(result) == 20
+    assert not result.duplicated(['fk_colaborador', 'schedule_day']).any()
+
+
+def test_expired_archive_is_cleared(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / 'archive'))
+    archive.append(schedule_rows([1], '2025-01-01', '2025-01-10'), [1], '2025-01-01', '2025-01-10')
+
+    assert set(ScheduleArchive(str(tmp_path / 'archive'), max_age_days=1).coverage) == {1}
+    expired = ScheduleArchive(str(tmp_path / 'archive'), max_age_days=0)
+    assert expired.coverage == {}
+    assert len(expired.read([1], '2025-01-01', '2025-01-10')) == 0
+
+
+def test_read_outside_coverage_is_empty(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / 'archive'))
+    archive.append(schedule_rows([1], '2025-01-01', '2025-01-10'), [1], '2025-01-01', '2025-01-10')
+
+    assert len(archive.read([1], '2025-02-01', '2025-02-10')) == 0
+    assert len(archive.read([3], '2025-01-01', '2025-01-10')) == 0
+    assert len(archive.read([1], '2025-01-05', '2025-01-06')) == 2
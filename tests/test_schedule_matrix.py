@@ -0,0 +1,84 @@
+"""Tests for src.schedule_matrix.ScheduleMatrix (round-trips and the date/employee indexes)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schedule_matrix import ScheduleMatrix
+
+
+def make_calendar(with_tipo_dia: bool = False) -> pd.DataFrame:
+    """Wide calendar with 3 days, 2 employees and integer 0 cells, as written by create_m0_0t."""
+    rows = [
+        ['Dia', '2025-01-01', '2025-01-01', '2025-01-02', '2025-01-02', '2025-01-03', '2025-01-03'],
+        ['TURNO', 'M', 'T', 'M', 'T', 'M', 'T'],
+    ]
+    if with_tipo_dia:
+        rows.append(['TIPO_DIA', '-', '-', 'F', 'F', '-', '-'])
+    rows += [
+        ['0000000001', 'M', 0, 'L', 'L', 0, 'T'],
+        ['0000000002', 'V', 'V', 'MoT', 'MoT', '-', '-'],
+    ]
+    return pd.DataFrame(rows, columns=range(7))
+
+
+@pytest.mark.parametrize('with_tipo_dia', [False, True])
+def test_frame_round_trip(with_tipo_dia):
+    calendar = make_calendar(with_tipo_dia)
+    matrix = ScheduleMatrix.from_frame(calendar)
+
+    assert list(matrix.headers) == (['Dia', 'TURNO', 'TIPO_DIA'] if with_tipo_dia else ['Dia', 'TURNO'])
+    assert matrix.employees == ['0000000001', '0000000002']
+    assert matrix.shape == (2, 6)
+    result = matrix.to_frame()
+    pd.testing.assert_frame_equal(result, calendar.astype(object))
+    # Integer cells keep their type
+    assert type(result.iloc[-2, 2]) is int
+
+
+def test_empty_frame_round_trip():
+    matrix = ScheduleMatrix.from_frame(pd.DataFrame(columns=range(3)))
+    assert matrix.employees == []
+    assert matrix.to_frame().shape == (0, 3)
+
+
+def test_indexes():
+    matrix = ScheduleMatrix.from_frame(make_calendar())
+
+    assert matrix.dates == ['2025-01-01', '2025-01-02', '2025-01-03']
+    assert matrix.slots_of('2025-01-02') == (2, 3)
+    assert matrix.slots_of(pd.Timestamp('2025-01-03')) == (4, 5)
+    assert matrix.slots_of('2025-02-01') is None
+    assert matrix.row_of('0000000002') == 1
+    assert matrix.row_of('missing') is None
+    np.testing.assert_array_equal(matrix.rows_of(['0000000002', 'missing']), [1, -1])
+    m_slots, t_slots = matrix.slot_pairs_of(['2025-01-01', '2025-01-05'])
+    np.testing.assert_array_equal(m_slots, [0, -1])
+    np.testing.assert_array_equal(t_slots, [1, -1])
+
+
+def test_set_day_and_append_rows():
+    matrix = ScheduleMatrix.from_frame(make_calendar())
+
+    assert matrix.set_day('0000000001', '2025-01-03', 'F')
+    assert not matrix.set_day('missing', '2025-01-03', 'F')
+    matrix.append_rows(['0000000003'], np.full((1, 6), '-', dtype=object))
+
+    assert matrix.row_of('0000000003') == 2
+    result = matrix.to_frame()
+    assert list(result.iloc[2, 5:7]) == ['F', 'F']
+    assert list(result.iloc[4, 1:]) == ['-'] * 6
+
+
+def test_to_long_matches_melt():
+    calendar = make_calendar(with_tipo_dia=True)
+    long = ScheduleMatrix.from_frame(calendar).to_long()
+
+    # Same rows as melting the wide frame without the Dia and TURNO header rows
+    body = calendar.iloc[2:]
+    expected = body.melt(id_vars=0, var_name='slot', value_name='TIPO_TURNO')
+    assert len(long) == len(expected)
+    assert long['COLABORADOR'].tolist() == expected[0].tolist()
+    assert long['TIPO_TURNO'].astype(object).tolist() == expected['TIPO_TURNO'].tolist()
+    assert long['DATA'].tolist() == pd.to_datetime(calendar.iloc[0, expected['slot']].to_numpy()).tolist()
+    assert long['TURNO'].astype(object).tolist() == calendar.iloc[1, expected['slot']].tolist()
@@ -0,0 +1,105 @@
+"""Tests for the StepPipeline cache (hits, and invalidation on input or code changes)."""
+
+import importlib
+import sys
+import textwrap
+
+import pandas as pd
+import pytest
+
+from src.step_pipeline import PipelineStep, StepPipeline
+
+
+STEPS_SOURCE = '''
+from steppkg.helpers import scale
+
+
+def double(frame):
+    return {'doubled': scale(frame, 2)}
+
+
+def total(doubled):
+    return {'total': int(doubled['x'].sum())}
+'''
+
+
+def helpers_source(offset: int) -> str:
+    return textwrap.dedent(f'''
+        def scale(frame, factor):
+            return frame.assign(x=frame['x'] * factor + {offset})
+    ''')
+
+
+@pytest.fixture
+def steppkg(tmp_path, monkeypatch):
+    """Package with a steps module calling a helper module, importable from tmp_path."""
+    package = tmp_path / 'steppkg'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'helpers.py').write_text(helpers_source(0))
+    (package / 'steps.py').write_text(STEPS_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in [name for name in sys.modules if name.split('.')[0] == 'steppkg']:
+        del sys.modules[name]
+
+
+def make_steps():
+    steps = importlib.import_module('steppkg.steps')
+    return [
+        PipelineStep('double', steps.double, inputs=['frame'], outputs=['doubled']),
+        PipelineStep('total', steps.total, inputs=['doubled'], outputs=['total']),
+    ]
+
+
+def sources(pipeline: StepPipeline) -> list:
+    return pipeline.report_frame()['source'].tolist()
+
+
+@pytest.mark.parametrize('cache_mode', ['memory', 'disk'])
+def test_rerun_with_same_inputs_is_served_from_cache(steppkg, tmp_path, cache_mode):
+    memory_cache = {}
+    frame = pd.DataFrame({'x': [1, 2, 3]})
+    results = []
+    for _ in range(2):
+        pipeline = StepPipeline('test', make_steps(), cache_mode=cache_mode,
+                                cache_dir=str(tmp_path / 'cache'), memory_cache=memory_cache)
+        results.append(pipeline.run({'frame': frame}))
+        assert results[-1]['total'] == 12
+
+    assert sources(pipeline) == [cache_mode, cache_mode]
+    pd.testing.assert_frame_equal(results[0]['doubled'], results[1]['doubled'])
+
+
+def test_changed_input_reruns_the_steps(steppkg):
+    memory_cache = {}
+    StepPipeline('test', make_steps(), cache_mode='memory', memory_cache=memory_cache).run(
+        {'frame': pd.DataFrame({'x': [1, 2, 3]})})
+
+    pipeline = StepPipeline('test', make_steps(), cache_mode='memory', memory_cache=memory_cache)
+    context = pipeline.run({'frame': pd.DataFrame({'x': [1, 2, 4]})})
+    assert sources(pipeline) == ['run', 'run']
+    assert context['total'] == 14
+
+
+def test_changed_helper_module_invalidates_the_disk_cache(steppkg, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    frame = pd.DataFrame({'x': [1, 2, 3]})
+    StepPipeline('test', make_steps(), cache_mode='disk', cache_dir=cache_dir).run({'frame': frame})
+
+    # Edit only the helper: the step functions keep the same source
+    (steppkg / 'helpers.py').write_text(helpers_source(10))
+    importlib.reload(sys.modules['steppkg.helpers'])
+    importlib.reload(sys.modules['steppkg.steps'])
+
+    pipeline = StepPipeline('test', make_steps(), cache_mode='disk', cache_dir=cache_dir)
+    context = pipeline.run({'frame': frame})
+    assert sources(pipeline) == ['run', 'run']
+    assert context['total'] == 42
+
+
+def test_code_fingerprint_covers_the_package_modules(steppkg):
+    step = make_steps()[0]
+    before = step.code_fingerprint()
+    (steppkg / 'helpers.py').write_text(helpers_source(1))
+    assert step.code_fingerprint() != before